@@ -1,20 +1,38 @@
 import streamlit as st
-import openai
 import os
 from dotenv import load_dotenv
-import json
 import time
-import PyPDF2
 import io
-import interview
-import role_playing
-import linkscraper
+import hashlib
+import uuid
+import metrics
+import recommender
+import warmup
+from recommender import CV_CHAR_LIMIT, INDEX, PARTIAL, recommendation_queue
+from page_jobs import JOB_POLL_INTERVAL, cancel_job, current_session_id, rate_limited
+from pdf_ingest import ingest_pdf
+from lazy import load_attr
+from job_queue import ACTIVE_STATUSES, CANCELLED, DONE
+from recommendation_cache import make_cache_key
+from recommendation_view import get_recommendation_view, render_card_html
+from session_store import (client_binding, client_info, persist_session_state, restore_session_state,
+                           sign_session_id, verify_session_token)
+from role_index import rank_roles
+from reports import (MIME_TYPES, REPORT_FORMATS, build_report, cached_report, collect_results, report_digest,
+                     report_queue)
 
 # Load environment variables
 load_dotenv()
 
-# Configure OpenAI
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Prometheus endpoint (only when ORACLE_METRICS=1)
+metrics.start_metrics_server()
+# Preload the rest of the process in the background unless warmup.py already did
+warmup.start()
+
+# Stream recommendation cards as they are generated
+STREAM_RECOMMENDATIONS = os.getenv("ORACLE_STREAM_RECOMMENDATIONS", "1") == "1"
+# Show a ranking from the local role index as soon as a CV is uploaded
+INSTANT_RECOMMENDATIONS = os.getenv("ORACLE_INSTANT_RECOMMENDATIONS", "1") == "1"
 
 # Page configuration
 st.set_page_config(
@@ -24,199 +42,65 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize session state for multi-page navigation
-if 'current_page' not in st.session_state:
-    st.session_state.current_page = 'main'
-if 'selected_role_index' not in st.session_state:
-    st.session_state.selected_role_index = None
-if 'game_data' not in st.session_state:
-    st.session_state.game_data = {}
-if 'interview_data' not in st.session_state:
-    st.session_state.interview_data = {}
+# Restore the persisted session (survives restarts and moves between replicas).
+# The trial pages' data is only loaded when one of them is opened.
+MAIN_PAGE_STATE_KEYS = (
+    'current_page', 'selected_role_index', 'personality_type', 'personality_selector',
+    'cv_text', 'cv_file_id', 'job_recommendations', 'recommendation_source', 'recommendation_job',
+    'game_completed_*', 'interview_completed_*'
+)
+
+def start_session():
+    """Resume the session of a signed ?sid= link (or start a new one) and set page defaults"""
+    if '_session_id' not in st.session_state:
+        headers, ip = client_info()
+        client = client_binding(headers, ip)
+        # Links signed for another browser start a new session instead of opening someone's CV
+        session_id = verify_session_token(st.query_params.get('sid'), client) or uuid.uuid4().hex
+        st.session_state['_session_id'] = session_id
+        st.query_params['sid'] = sign_session_id(session_id, client)
+    restore_session_state(st.session_state, st.session_state['_session_id'], MAIN_PAGE_STATE_KEYS)
+    
+    # Initialize session state for multi-page navigation
+    if 'current_page' not in st.session_state:
+        st.session_state.current_page = 'main'
+    if 'selected_role_index' not in st.session_state:
+        st.session_state.selected_role_index = None
+    if 'game_data' not in st.session_state:
+        st.session_state.game_data = {}
+    if 'interview_data' not in st.session_state:
+        st.session_state.interview_data = {}
 
-# Custom CSS for better styling
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 3rem;
-        font-weight: bold;
-        text-align: center;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-        margin-bottom: 1rem;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-    }
-    .oracle-logo {
-        text-align: center;
-        font-size: 4rem;
-        margin-bottom: 1rem;
-        animation: glow 2s ease-in-out infinite alternate;
-    }
-    @keyframes glow {
-        from { text-shadow: 0 0 5px #fff, 0 0 10px #fff, 0 0 15px #667eea, 0 0 20px #667eea; }
-        to { text-shadow: 0 0 10px #fff, 0 0 20px #fff, 0 0 30px #667eea, 0 0 40px #667eea; }
-    }
-    .subtitle {
-        text-align: center;
-        color: #6c757d;
-        font-size: 1.3rem;
-        font-style: italic;
-        margin-bottom: 2rem;
-        text-shadow: 1px 1px 2px rgba(0,0,0,0.1);
-    }
-    .job-card {
-        background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
-        border: 1px solid #dee2e6;
-        border-radius: 15px;
-        padding: 1.5rem;
-        margin: 1rem 0;
-        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-        transition: transform 0.3s ease, box-shadow 0.3s ease;
-    }
-    .job-card:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 6px 20px rgba(0,0,0,0.15);
-    }
-    .job-title {
-        font-size: 1.5rem;
-        font-weight: bold;
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-        margin-bottom: 0.5rem;
-    }
-    .job-description {
-        color: #6c757d;
-        margin-bottom: 1rem;
-    }
-    .experience-button {
-        background: linear-gradient(135deg, #28a745 0%, #20c997 100%);
-        color: white;
-        border: none;
-        padding: 0.5rem 1rem;
-        border-radius: 25px;
-        cursor: pointer;
-        font-weight: bold;
-        transition: all 0.3s ease;
-    }
-    .experience-button:hover {
-        transform: scale(1.05);
-        box-shadow: 0 4px 15px rgba(40, 167, 69, 0.3);
-    }
-    .personality-info {
-        background: linear-gradient(135deg, #e3f2fd 0%, #bbdefb 100%);
-        border-left: 4px solid #2196f3;
-        border-radius: 10px;
-        padding: 1rem;
-        margin: 1rem 0;
-        box-shadow: 0 2px 10px rgba(33, 150, 243, 0.1);
-    }
-    .upload-section {
-        background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
-        border: 2px dashed #dee2e6;
-        border-radius: 15px;
-        padding: 2rem;
-        text-align: center;
-        margin: 1rem 0;
-        transition: all 0.3s ease;
-    }
-    .upload-section:hover {
-        border-color: #667eea;
-        background: linear-gradient(135deg, #f0f2ff 0%, #e8eaff 100%);
-    }
-    .score-card {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        border-radius: 20px;
-        padding: 2rem;
-        margin: 1rem 0;
-        box-shadow: 0 8px 25px rgba(102, 126, 234, 0.3);
-    }
-    .score-item {
-        background-color: rgba(255,255,255,0.1);
-        border-radius: 15px;
-        padding: 1rem;
-        margin: 0.5rem 0;
-        backdrop-filter: blur(10px);
-        border: 1px solid rgba(255,255,255,0.2);
-    }
-    .score-bar {
-        background-color: rgba(255,255,255,0.2);
-        border-radius: 10px;
-        height: 20px;
-        margin: 0.5rem 0;
-        overflow: hidden;
-    }
-    .score-fill {
-        height: 100%;
-        background: linear-gradient(90deg, #4CAF50, #8BC34A);
-        border-radius: 10px;
-        transition: width 0.3s ease;
-    }
-    .overall-score {
-        font-size: 3rem;
-        font-weight: bold;
-        text-align: center;
-        margin: 1rem 0;
-        text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-    }
-    .strengths-section {
-        background: linear-gradient(135deg, #d4edda 0%, #c3e6cb 100%);
-        border: 1px solid #c3e6cb;
-        border-radius: 15px;
-        padding: 1rem;
-        margin: 1rem 0;
-        box-shadow: 0 2px 10px rgba(212, 237, 218, 0.3);
-    }
-    .considerations-section {
-        background: linear-gradient(135deg, #fff3cd 0%, #ffeaa7 100%);
-        border: 1px solid #ffeaa7;
-        border-radius: 15px;
-        padding: 1rem;
-        margin: 1rem 0;
-        box-shadow: 0 2px 10px rgba(255, 243, 205, 0.3);
-    }
-    .mystical-border {
-        border: 2px solid transparent;
-        background: linear-gradient(45deg, #667eea, #764ba2, #667eea) border-box;
-        border-radius: 15px;
-        background-clip: padding-box, border-box;
-        position: relative;
-    }
-    .mystical-border::before {
-        content: '';
-        position: absolute;
-        top: -2px;
-        left: -2px;
-        right: -2px;
-        bottom: -2px;
-        background: linear-gradient(45deg, #667eea, #764ba2, #667eea);
-        border-radius: 15px;
-        z-index: -1;
-        animation: borderGlow 3s ease-in-out infinite alternate;
-    }
-    @keyframes borderGlow {
-        from { opacity: 0.7; }
-        to { opacity: 1; }
-    }
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS for better styling, served once as a static asset
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "oracle.css")
+INLINE_CSS = os.getenv("ORACLE_INLINE_CSS", "0") == "1"
+
+# st.cache_resource, not functools.lru_cache: this script re-executes on every
+# rerun, so a cache defined in it would start out empty each time
+@st.cache_resource(show_spinner=False)
+def load_css():
+    """Read the stylesheet and a short content hash for cache busting"""
+    with open(CSS_PATH, encoding="utf-8") as css_file:
+        css = css_file.read()
+    return css, hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+
+def inject_css():
+    """Link the Oracle stylesheet (set ORACLE_INLINE_CSS=1 without static serving)"""
+    css, version = load_css()
+    if INLINE_CSS:
+        st.markdown(f"<style>{css}</style>", unsafe_allow_html=True)
+    else:
+        st.markdown(f'<link rel="stylesheet" href="app/static/oracle.css?v={version}">', unsafe_allow_html=True)
 
-def extract_text_from_pdf(pdf_file):
-    """Extract text from uploaded PDF file"""
+inject_css()
+
+def extract_text_from_pdf(pdf_file, char_limit=None):
+    """Extract text from uploaded PDF file (memoized by content hash)"""
     try:
-        # Create a PDF reader object
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        
-        # Extract text from all pages
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        
-        return text.strip()
+        with metrics.timer("pdf_extraction"):
+            if isinstance(pdf_file, (bytes, bytearray)):
+                pdf_file = io.BytesIO(pdf_file)
+            return ingest_pdf(pdf_file, char_limit=char_limit)
     
     except Exception as e:
         st.error(f"Error reading PDF file: {str(e)}")
@@ -224,85 +108,77 @@ def extract_text_from_pdf(pdf_file):
 
 def generate_job_recommendations(cv_text, personality_type):
     """Generate job recommendations based on CV and personality type"""
+    return recommender.generate_job_recommendations(cv_text, personality_type, session_id=current_session_id())
+
+def stream_job_recommendations(cv_text, personality_type):
+    """Yield job recommendations one by one as the Oracle streams them"""
+    return recommender.stream_job_recommendations(cv_text, personality_type, session_id=current_session_id())
+
+def submit_recommendation_job(cv_text, personality_type):
+    """Queue a recommendation job; identical requests share one job"""
+    dedup_key = make_cache_key(cv_text, personality_type, recommender.MODEL_NAME, recommender.PROMPT_VERSION)
+    return recommendation_queue().submit(
+        "recommendations",
+        {"cv_text": cv_text, "personality_type": personality_type,
+         "stream": STREAM_RECOMMENDATIONS, "session_id": current_session_id()},
+        dedup_key=dedup_key,
+        session_id=current_session_id()
+    )
+
+def render_report_downloads():
+    """Offer the session's results as HTML and PDF reports; returns the rendering job while it runs"""
+    results = collect_results(st.session_state)
+    digest = report_digest(results)
+    reports = {fmt: cached_report(digest, fmt) for fmt in REPORT_FORMATS}
+    if not all(reports.values()):
+        # Identical results share one rendering job (and one cached report) across
+        # sessions; the job's session_id only records who asked first
+        queue = report_queue()
+        job = queue.get(queue.submit("reports", {"results": results}, dedup_key=digest,
+                                     session_id=current_session_id()))
+        if job['status'] in ACTIVE_STATUSES:
+            st.caption("📜 The Oracle is writing your report...")
+            return job
+        if job['status'] != DONE:
+            st.caption("📜 The Oracle could not write your report.")
+            return None
+        # Rendered, or rendered earlier and since evicted from the cache
+        reports = {fmt: build_report(results, fmt, digest) for fmt in REPORT_FORMATS}
     
-    prompt = f"""
-    Analyze the following CV and personality type to generate 3-5 suitable job recommendations.
-    
-    CV Content: {cv_text[:2000]}  # Limit to first 2000 characters
-    
-    Personality Type: {personality_type}
-    
-    For each job recommendation, provide:
-    1. Job title
-    2. Brief description of the role
-    3. Suitability score (1-10)
-    4. Suitability level (Excellent/Good/Fair/Poor)
-    5. Estimated salary range
-    6. Growth potential (High/Medium/Low)
-    
-    Return as JSON:
-    {{
-        "recommendations": [
-            {{
-                "title": "Job Title",
-                "description": "Role description",
-                "score": 8.5,
-                "suitability": "Excellent",
-                "salary_range": "$60,000 - $80,000",
-                "growth_potential": "High"
-            }}
-        ]
-    }}
-    
-    Make recommendations specific to the CV content and personality type. Focus on roles where the candidate's background and personality would be a good fit.
-    """
-    
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a career advisor analyzing CVs and personality types to recommend suitable job roles."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=800,
-            temperature=0.7
-        )
-        
-        content = response.choices[0].message.content
-        start_idx = content.find('{')
-        end_idx = content.rfind('}') + 1
-        json_str = content[start_idx:end_idx]
-        
-        return json.loads(json_str)['recommendations']
+    columns = st.columns(len(REPORT_FORMATS))
+    for column, fmt in zip(columns, REPORT_FORMATS):
+        with column:
+            st.download_button(f"📜 Download Report ({fmt.upper()})", reports[fmt],
+                               file_name=f"oracle-report.{fmt}", mime=MIME_TYPES[fmt], key=f"download_report_{fmt}")
+    return None
+
+def render_job_card(job):
+    """Render a single recommendation card"""
+    st.markdown(render_card_html(job), unsafe_allow_html=True)
+
+def navigate(page, role_index):
+    """Button callback: switch page before the next run starts"""
+    st.session_state.current_page = page
+    st.session_state.selected_role_index = role_index
+
+def render_job_actions(job_view):
+    """Render the trial banners and buttons of one recommendation"""
+    for banner, action in job_view.completed_trials:
+        st.markdown(banner, unsafe_allow_html=True)
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col2:
+            st.button(action.label, key=f"{action.key}_{job_view.index}",
+                      on_click=navigate, args=(action.page, job_view.index))
     
-    except Exception as e:
-        # Fallback recommendations
-        return [
-            {
-                "title": "Software Developer",
-                "description": "Develop and maintain software applications using modern programming languages and frameworks.",
-                "score": 7.5,
-                "suitability": "Good",
-                "salary_range": "$70,000 - $100,000",
-                "growth_potential": "High"
-            },
-            {
-                "title": "Data Analyst",
-                "description": "Analyze data to help organizations make informed business decisions and improve processes.",
-                "score": 7.0,
-                "suitability": "Good",
-                "salary_range": "$60,000 - $85,000",
-                "growth_potential": "High"
-            },
-            {
-                "title": "Project Manager",
-                "description": "Lead and coordinate projects, ensuring they are completed on time and within budget.",
-                "score": 6.5,
-                "suitability": "Fair",
-                "salary_range": "$75,000 - $110,000",
-                "growth_potential": "Medium"
-            }
-        ]
+    actions = job_view.actions
+    if len(actions) == 1:
+        columns = [st.columns([1, 2, 1])[1]]
+    else:
+        columns = st.columns(len(actions))
+    for column, action in zip(columns, actions):
+        with column:
+            st.button(action.label, key=f"{action.key}_{job_view.index}",
+                      on_click=navigate, args=(action.page, job_view.index))
 
 def main_page():
     """Main page with job recommendations and results"""
@@ -317,6 +193,9 @@ def main_page():
     </div>
     """, unsafe_allow_html=True)
     
+    # Main-area slot for cards revealed while the Oracle is still streaming
+    prophecy_area = st.empty()
+    
     # Sidebar for inputs
     with st.sidebar:
         st.markdown("""
@@ -364,34 +243,78 @@ def main_page():
         )
         
         if uploaded_file is not None:
-            # Extract text from PDF
-            try:
-                pdf_reader = PyPDF2.PdfReader(uploaded_file)
-                cv_text = ""
-                for page in pdf_reader.pages:
-                    cv_text += page.extract_text()
-                
-                st.session_state.cv_text = cv_text
+            # Extract text from PDF only when a new file is uploaded
+            if st.session_state.get('cv_file_id') != uploaded_file.file_id:
+                cv_text = extract_text_from_pdf(uploaded_file, char_limit=CV_CHAR_LIMIT)
+                if cv_text is not None:
+                    st.session_state.cv_text = cv_text
+                    st.session_state.cv_file_id = uploaded_file.file_id
+                    st.session_state.pop('recommendation_source', None)
+            
+            if st.session_state.get('cv_file_id') == uploaded_file.file_id:
+                cv_text = st.session_state.cv_text
                 
                 # Show preview
                 with st.expander("📄 CV Preview"):
                     st.text_area("Extracted text:", cv_text[:500] + "..." if len(cv_text) > 500 else cv_text, height=200)
-                
-            except Exception as e:
-                st.error(f"Error reading PDF: {str(e)}")
+        
+        # Instant ranking from the local role index until the Oracle refines it
+        if INSTANT_RECOMMENDATIONS and 'cv_text' in st.session_state and 'personality_type' in st.session_state:
+            instant_key = (st.session_state.get('cv_file_id'), st.session_state.personality_type)
+            if st.session_state.get('recommendation_source') != 'oracle' and st.session_state.get('_instant_key') != instant_key:
+                st.session_state.job_recommendations = rank_roles(st.session_state.cv_text, st.session_state.personality_type)
+                st.session_state.recommendation_source = 'index'
+                st.session_state['_instant_key'] = instant_key
         
         # Generate recommendations button
         if st.button("🔮 Seek Oracle's Prophecy", type="primary"):
-            if 'cv_text' in st.session_state and 'personality_type' in st.session_state:
-                with st.spinner("🔮 The Oracle is reading your destiny..."):
-                    recommendations = generate_job_recommendations(
-                        st.session_state.cv_text,
-                        st.session_state.personality_type
-                    )
-                    st.session_state.job_recommendations = recommendations
-                st.success("Oracle's prophecies have been revealed!")
-            else:
+            if 'cv_text' not in st.session_state or 'personality_type' not in st.session_state:
                 st.error("Please upload your CV and select your personality type.")
+            elif not rate_limited():
+                # Runs in the job queue, so reruns neither interrupt nor repeat it
+                st.session_state.recommendation_job = submit_recommendation_job(
+                    st.session_state.cv_text,
+                    st.session_state.personality_type
+                )
+        
+        # Recruiters: several candidates against the same roles
+        st.markdown("---")
+        st.button("⚖️ Compare Candidates", on_click=navigate, args=('compare', None))
+    
+    # Follow the running recommendation job, revealing cards as they stream in
+    job = None
+    report_job = None
+    if st.session_state.get('recommendation_job'):
+        job = recommendation_queue().get(st.session_state.recommendation_job)
+        if job is None or job['status'] not in ACTIVE_STATUSES:
+            del st.session_state['recommendation_job']
+        if job and job['status'] == DONE and job['degraded'] == INDEX:
+            # The LLM was unavailable, so the reading came from the role index
+            st.session_state.job_recommendations = job['result']
+            st.session_state.recommendation_source = 'index'
+            st.warning("🌙 The Oracle's sight is clouded right now, so these paths come from its index. Please try again in a little while.")
+        elif job and job['status'] == DONE and job['degraded'] == PARTIAL:
+            # The LLM broke off mid-stream; the cards it revealed are kept
+            st.session_state.job_recommendations = job['result']
+            st.session_state.recommendation_source = 'oracle'
+            st.warning("🌙 The Oracle's vision faded before it had revealed every path. Please try again in a little while.")
+        elif job and job['status'] == DONE:
+            st.session_state.job_recommendations = job['result']
+            st.session_state.recommendation_source = 'oracle'
+            st.success("Oracle's prophecies have been revealed!")
+        elif job and job['status'] == CANCELLED:
+            st.info("The Oracle's reading was cancelled.")
+        elif job and job['status'] not in ACTIVE_STATUSES:
+            st.error("The Oracle could not complete its reading. Please try again.")
+        elif job:
+            with prophecy_area.container():
+                st.markdown("---")
+                st.info(job['message'] or "🔮 The Oracle is reading your destiny...")
+                st.progress(job['progress'])
+                for partial_job in job['partial'] or []:
+                    render_job_card(partial_job)
+                st.button("Cancel", key="cancel_recommendation_job", on_click=cancel_job,
+                          args=(recommendation_queue(), 'recommendation_job'))
     
     # Display job recommendations
     if 'job_recommendations' in st.session_state and st.session_state.job_recommendations:
@@ -405,125 +328,19 @@ def main_page():
         </div>
         """, unsafe_allow_html=True)
         
-        # Display each job recommendation
-        for i, job in enumerate(st.session_state.job_recommendations):
-            with st.container():
-                st.markdown(f"""
-                <div style="background: linear-gradient(135deg, #ffffff 0%, #f8f9fa 100%); border: 2px solid #e9ecef; border-radius: 15px; padding: 2rem; margin: 1rem 0; box-shadow: 0 4px 15px rgba(0,0,0,0.1);">
-                    <h3 style="color: #495057; margin-bottom: 1rem;">🌟 {job['title']}</h3>
-                    <p style="color: #6c757d; margin-bottom: 1rem;"><strong>Oracle's Vision:</strong> {job['description']}</p>
-                    <div style="display: flex; justify-content: space-between; align-items: center;">
-                        <div>
-                            <p style="color: #495057; margin: 0;"><strong>Destiny Score:</strong> {job['score']:.1f}/10</p>
-                            <p style="color: #6c757d; margin: 0;"><strong>Alignment Level:</strong> {job['suitability']}</p>
-                        </div>
-                        <div>
-                            <p style="color: #495057; margin: 0;"><strong>Salary Range:</strong> {job['salary_range']}</p>
-                            <p style="color: #6c757d; margin: 0;"><strong>Growth Potential:</strong> {job['growth_potential']}</p>
-                        </div>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Check if game has been completed for this role
-                game_key = f"game_completed_{i}"
-                interview_key = f"interview_completed_{i}"
-                
-                if game_key in st.session_state and st.session_state[game_key]:
-                    # Show completed game indicator
-                    st.markdown(f"""
-                    <div style="background: linear-gradient(135deg, #d4edda 0%, #c3e6cb 100%); border: 1px solid #c3e6cb; border-radius: 10px; padding: 1rem; margin: 1rem 0; text-align: center;">
-                        <h4 style="color: #155724; margin-bottom: 0.5rem;">✅ Oracle's Trial Completed</h4>
-                        <p style="color: #155724; margin: 0;">You have completed the mystical trials for this role. Click below to view your results.</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    col1, col2, col3 = st.columns([1, 2, 1])
-                    with col2:
-                        if st.button(f"🔮 View Oracle's Revelation for {job['title']}", key=f"view_results_{i}"):
-                            st.session_state.current_page = 'game'
-                            st.session_state.selected_role_index = i
-                            st.rerun()
-                
-                if interview_key in st.session_state and st.session_state[interview_key]:
-                    # Show completed interview indicator
-                    st.markdown(f"""
-                    <div style="background: linear-gradient(135deg, #d1ecf1 0%, #bee5eb 100%); border: 1px solid #bee5eb; border-radius: 10px; padding: 1rem; margin: 1rem 0; text-align: center;">
-                        <h4 style="color: #0c5460; margin-bottom: 0.5rem;">✅ Professional Interview Completed</h4>
-                        <p style="color: #0c5460; margin: 0;">You have completed the professional interview for this role. Click below to view your results.</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    col1, col2, col3 = st.columns([1, 2, 1])
-                    with col2:
-                        if st.button(f"🎤 View Interview Results for {job['title']}", key=f"view_interview_{i}"):
-                            st.session_state.current_page = 'interview'
-                            st.session_state.selected_role_index = i
-                            st.rerun()
-                
-                # Show action buttons
-                if (game_key not in st.session_state or not st.session_state[game_key]) and (interview_key not in st.session_state or not st.session_state[interview_key]):
-                    # All three options available
-                    col1, col2, col3 = st.columns(3)
-                    
-                    with col1:
-                        if st.button(f"🔮 Immersive Experience for {job['title']}", key=f"start_game_{i}"):
-                            st.session_state.current_page = 'game'
-                            st.session_state.selected_role_index = i
-                            st.rerun()
-                    
-                    with col2:
-                        if st.button(f"🎤 Mock Interview for {job['title']}", key=f"start_interview_{i}"):
-                            st.session_state.current_page = 'interview'
-                            st.session_state.selected_role_index = i
-                            st.rerun()
-                    
-                    with col3:
-                        if st.button(f"🔍 Real-time Jobs for {job['title']}", key=f"start_job_finder_{i}"):
-                            st.session_state.current_page = 'job_finder'
-                            st.session_state.selected_role_index = i
-                            st.rerun()
-                
-                elif game_key in st.session_state and st.session_state[game_key] and (interview_key not in st.session_state or not st.session_state[interview_key]):
-                    # Only interview and job finder available
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        if st.button(f"🎤 Mock Interview for {job['title']}", key=f"start_interview_{i}"):
-                            st.session_state.current_page = 'interview'
-                            st.session_state.selected_role_index = i
-                            st.rerun()
-                    
-                    with col2:
-                        if st.button(f"🔍 Real-time Jobs for {job['title']}", key=f"start_job_finder_{i}"):
-                            st.session_state.current_page = 'job_finder'
-                            st.session_state.selected_role_index = i
-                            st.rerun()
-                
-                elif interview_key in st.session_state and st.session_state[interview_key] and (game_key not in st.session_state or not st.session_state[game_key]):
-                    # Only Oracle's trial and job finder available
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        if st.button(f"🔮 Immersive Experience for {job['title']}", key=f"start_game_{i}"):
-                            st.session_state.current_page = 'game'
-                            st.session_state.selected_role_index = i
-                            st.rerun()
-                    
-                    with col2:
-                        if st.button(f"🔍 Real-time Jobs for {job['title']}", key=f"start_job_finder_{i}"):
-                            st.session_state.current_page = 'job_finder'
-                            st.session_state.selected_role_index = i
-                            st.rerun()
-                
-                else:
-                    # Only job finder available (both trials completed)
-                    col1, col2, col3 = st.columns([1, 2, 1])
-                    with col2:
-                        if st.button(f"🔍 Real-time Jobs for {job['title']}", key=f"start_job_finder_{i}"):
-                            st.session_state.current_page = 'job_finder'
-                            st.session_state.selected_role_index = i
-                            st.rerun()
+        if st.session_state.get('recommendation_source') == 'index':
+            st.info("✨ A first glimpse from the Oracle's index. Seek the Oracle's Prophecy for a reading of your whole CV.")
+        
+        # Display each job recommendation from the memoized view-model
+        with metrics.timer("html_render"):
+            for job_view in get_recommendation_view(st.session_state):
+                with st.container():
+                    st.markdown(job_view.card_html, unsafe_allow_html=True)
+                    render_job_actions(job_view)
+        
+        if not (job and job['status'] in ACTIVE_STATUSES):
+            st.markdown("---")
+            report_job = render_report_downloads()
     
     # Initial state or no recommendations yet
     elif 'cv_text' not in st.session_state:
@@ -538,18 +355,36 @@ def main_page():
             </p>
         </div>
         """, unsafe_allow_html=True)
+    
+    # Poll again shortly while a job is still running
+    if (job and job['status'] in ACTIVE_STATUSES) or report_job:
+        time.sleep(JOB_POLL_INTERVAL)
+        st.rerun()
 
 # Main app logic
+# Trial pages are imported on first visit, so sessions that never leave
+# the main page don't pay for their modules and SDK clients
+PAGES = {
+    'game': ('role_playing', 'game_page'),
+    'interview': ('interview', 'interview_page'),
+    'job_finder': ('linkscraper', 'job_finder_page'),
+    'compare': ('cv_comparison', 'comparison_page'),
+}
+
 def main():
+    start_session()
+    
     # Page navigation
-    if st.session_state.current_page == 'game':
-        role_playing.game_page()
-    elif st.session_state.current_page == 'interview':
-        interview.interview_page()
-    elif st.session_state.current_page == 'job_finder':
-        linkscraper.job_finder_page()
-    else:
-        main_page()
+    page = PAGES.get(st.session_state.current_page)
+    try:
+        if page:
+            restore_session_state(st.session_state, st.session_state['_session_id'])
+            load_attr(*page)()
+        else:
+            main_page()
+    finally:
+        # Also runs when a page calls st.rerun() or st.stop()
+        persist_session_state(st.session_state, st.session_state['_session_id'])
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,322 @@
+"""Headless batch mode for bulk CV screening
+
+Usage:
+    python batch.py --input cvs/ --personality "INTJ - The Architect" --output results.jsonl
+    python batch.py --input manifest.jsonl --output results.parquet --concurrency 16
+    python batch.py --input manifest.jsonl --openai-batch requests.jsonl
+    python batch.py --input manifest.jsonl --batch-results batch_output.jsonl --output results.jsonl
+
+A manifest is a JSONL file with one {"path": ..., "personality_type": ..., "id": ...}
+object per line; "id" defaults to the path. Each PDF is parsed like an upload,
+within pdf_ingest's budgets and in its own child process. Results are
+appended as they complete, so rerunning the same command resumes where it
+stopped.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import recommender
+from pdf_extraction import hash_pdf_bytes
+from pdf_ingest import ingest_pdf
+from recommendation_schema import parse_recommendations
+
+# Batch configuration
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_EXTRACT_WORKERS = int(os.getenv("BATCH_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+
+
+def load_jobs(input_path, personality_type=None):
+    """Load batch jobs from a directory of PDFs or a JSONL manifest"""
+    jobs = []
+    if os.path.isdir(input_path):
+        if not personality_type:
+            raise ValueError("--personality is required when the input is a directory")
+        for name in sorted(os.listdir(input_path)):
+            if name.lower().endswith(".pdf"):
+                path = os.path.join(input_path, name)
+                jobs.append({"id": name, "path": path, "personality_type": personality_type})
+        return jobs
+
+    base_dir = os.path.dirname(os.path.abspath(input_path))
+    with open(input_path, encoding="utf-8") as manifest:
+        for line_number, line in enumerate(manifest, 1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if "path" not in entry:
+                raise ValueError(f"Manifest line {line_number} has no 'path'")
+            path = entry["path"]
+            if not os.path.isabs(path):
+                path = os.path.join(base_dir, path)
+            personality = entry.get("personality_type") or personality_type
+            if not personality:
+                raise ValueError(f"Manifest line {line_number} has no 'personality_type'")
+            jobs.append({"id": str(entry.get("id", entry["path"])), "path": path, "personality_type": personality})
+    return jobs
+
+
+def load_checkpoint(path):
+    """Return the ids that already completed successfully in a results file"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as results:
+        for line in results:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A partially written last line from an interrupted run
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def _extract(path, char_limit):
+    # Batch inputs get the same byte, page, time and memory budgets as uploads;
+    # a PDF that breaks one raises PDFRejected and fails only its own record
+    started = time.perf_counter()
+    with open(path, "rb") as handle:
+        text = ingest_pdf(handle, char_limit=char_limit)
+        handle.seek(0)
+        digest = hash_pdf_bytes(handle.read())
+    return text, digest, time.perf_counter() - started
+
+
+def _recommend(cv_text, personality_type):
+    started = time.perf_counter()
+    recommendations = recommender.request_job_recommendations(cv_text, personality_type, session_id="batch")
+    return recommendations, time.perf_counter() - started
+
+
+def _summarize(durations):
+    if not durations:
+        return {"count": 0}
+    ordered = sorted(durations)
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": ordered[int(0.50 * (len(ordered) - 1))],
+        "p95": ordered[int(0.95 * (len(ordered) - 1))],
+        "max": ordered[-1],
+    }
+
+
+class BatchReport:
+    """Throughput and per-stage latency of a batch run"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {"extract": [], "llm": []}
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def as_dict(self):
+        elapsed = time.perf_counter() - self.started
+        processed = self.succeeded + self.failed
+        return {
+            "processed": processed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "elapsed_seconds": elapsed,
+            "cvs_per_minute": processed / elapsed * 60 if elapsed > 0 else 0.0,
+            "stages": {name: _summarize(values) for name, values in self.stages.items()},
+        }
+
+
+def run_batch(jobs, results_path, concurrency=BATCH_CONCURRENCY, extract_workers=BATCH_EXTRACT_WORKERS,
+              char_limit=recommender.CV_CHAR_LIMIT, progress=None):
+    """Extract and score every job, appending one JSON record per CV to results_path
+
+    Jobs whose id already has an "ok" record in results_path are skipped.
+    Returns a BatchReport.
+    """
+    report = BatchReport()
+    done = load_checkpoint(results_path)
+    pending_jobs = [job for job in jobs if job["id"] not in done]
+    report.skipped = len(jobs) - len(pending_jobs)
+
+    directory = os.path.dirname(os.path.abspath(results_path))
+    os.makedirs(directory, exist_ok=True)
+
+    with open(results_path, "a", encoding="utf-8") as results, \
+            ThreadPoolExecutor(max_workers=extract_workers) as extract_pool, \
+            ThreadPoolExecutor(max_workers=concurrency) as llm_pool:
+
+        def write(record):
+            results.write(json.dumps(record, ensure_ascii=False) + "\n")
+            results.flush()
+            if record["status"] == "ok":
+                report.succeeded += 1
+            else:
+                report.failed += 1
+            if progress:
+                progress(record, report)
+
+        # Each extraction waits on its own parser process, so threads are enough
+        in_flight = {}
+        for job in pending_jobs:
+            in_flight[extract_pool.submit(_extract, job["path"], char_limit)] = ("extract", job, None)
+
+        # Extraction and LLM calls are pipelined: each CV is scored as soon as its text is ready
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage, job, extracted = in_flight.pop(future)
+                record = {"id": job["id"], "path": job["path"], "personality_type": job["personality_type"]}
+                try:
+                    if stage == "extract":
+                        text, digest, seconds = future.result()
+                        report.stages["extract"].append(seconds)
+                        if not text:
+                            raise ValueError("No text could be extracted from the PDF")
+                        llm_future = llm_pool.submit(_recommend, text, job["personality_type"])
+                        in_flight[llm_future] = ("llm", job, {"cv_sha256": digest, "extract_seconds": seconds})
+                        continue
+
+                    recommendations, seconds = future.result()
+                    report.stages["llm"].append(seconds)
+                    record.update(extracted)
+                    record.update({"status": "ok", "llm_seconds": seconds, "recommendations": recommendations})
+                except Exception as e:
+                    record.update(extracted or {})
+                    record.update({"status": "error", "stage": stage, "error": str(e)})
+                write(record)
+
+    return report
+
+
+def write_openai_batch_requests(jobs, requests_path, extract_workers=BATCH_EXTRACT_WORKERS,
+                                char_limit=recommender.CV_CHAR_LIMIT):
+    """Write an OpenAI Batch API input file instead of calling the API directly"""
+    report = BatchReport()
+    with open(requests_path, "w", encoding="utf-8") as requests_file, \
+            ThreadPoolExecutor(max_workers=extract_workers) as extract_pool:
+        futures = [(job, extract_pool.submit(_extract, job["path"], char_limit)) for job in jobs]
+        for job, future in futures:
+            try:
+                text, _, seconds = future.result()
+            except Exception:
+                report.failed += 1
+                continue
+            report.stages["extract"].append(seconds)
+            cv_excerpt = recommender.prepare_cv_excerpt(text)
+            request = {
+                "custom_id": job["id"],
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": dict(
+                    recommender.request_params(),
+                    messages=recommender.build_recommendation_messages(cv_excerpt, job["personality_type"])
+                ),
+            }
+            requests_file.write(json.dumps(request, ensure_ascii=False) + "\n")
+            report.succeeded += 1
+    return report
+
+
+def import_openai_batch_results(jobs, batch_output_path, results_path):
+    """Convert an OpenAI Batch API output file into batch result records"""
+    report = BatchReport()
+    jobs_by_id = {job["id"]: job for job in jobs}
+    with open(batch_output_path, encoding="utf-8") as batch_output, \
+            open(results_path, "a", encoding="utf-8") as results:
+        for line in batch_output:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            job = jobs_by_id.get(entry["custom_id"], {"path": None, "personality_type": None})
+            record = {"id": entry["custom_id"], "path": job["path"], "personality_type": job["personality_type"]}
+            try:
+                if entry.get("error"):
+                    raise ValueError(entry["error"].get("message", "Batch request failed"))
+                content = entry["response"]["body"]["choices"][0]["message"]["content"]
+                recommendations, _ = parse_recommendations(content)
+                record.update({"status": "ok", "recommendations": recommendations})
+                report.succeeded += 1
+            except Exception as e:
+                record.update({"status": "error", "stage": "llm", "error": str(e)})
+                report.failed += 1
+            results.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return report
+
+
+def write_parquet(results_path, parquet_path):
+    """Convert a JSONL results file to Parquet (requires pyarrow or fastparquet)"""
+    import pandas as pd
+
+    records = {}
+    with open(results_path, encoding="utf-8") as results:
+        for line in results:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            # Later records win, so retried failures are replaced by their successes
+            records[record["id"]] = record
+
+    frame = pd.DataFrame(list(records.values()))
+    if "recommendations" in frame:
+        frame["recommendations"] = frame["recommendations"].map(
+            lambda value: json.dumps(value, ensure_ascii=False) if isinstance(value, list) else None
+        )
+    frame.to_parquet(parquet_path, index=False)
+
+
+def _print_progress(record, report):
+    status = "✅" if record["status"] == "ok" else "❌"
+    print(f"{status} {record['id']} ({report.succeeded} ok, {report.failed} failed)", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run CareerOracle recommendations over many CVs.")
+    parser.add_argument("--input", required=True, help="Directory of PDFs or JSONL manifest")
+    parser.add_argument("--personality", help="Personality type for every CV (directory input or manifest default)")
+    parser.add_argument("--output", help="Results file (.jsonl or .parquet)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Concurrent LLM requests")
+    parser.add_argument("--extract-workers", type=int, default=BATCH_EXTRACT_WORKERS, help="Concurrent PDF extractions")
+    parser.add_argument("--openai-batch", help="Write an OpenAI Batch API request file instead of calling the API")
+    parser.add_argument("--batch-results", help="Import an OpenAI Batch API output file into --output")
+    parser.add_argument("--quiet", action="store_true", help="Do not print per-CV progress")
+    args = parser.parse_args(argv)
+
+    jobs = load_jobs(args.input, args.personality)
+
+    if args.openai_batch:
+        report = write_openai_batch_requests(jobs, args.openai_batch, args.extract_workers)
+        print(json.dumps(report.as_dict(), indent=2))
+        return 0
+
+    if not args.output:
+        parser.error("--output is required")
+
+    parquet = args.output.endswith(".parquet")
+    results_path = args.output + ".partial.jsonl" if parquet else args.output
+
+    if args.batch_results:
+        report = import_openai_batch_results(jobs, args.batch_results, results_path)
+    else:
+        report = run_batch(
+            jobs, results_path,
+            concurrency=args.concurrency,
+            extract_workers=args.extract_workers,
+            progress=None if args.quiet else _print_progress
+        )
+
+    if parquet:
+        write_parquet(results_path, args.output)
+
+    print(json.dumps(report.as_dict(), indent=2))
+    return 0 if report.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""CV comparison benchmark: wall time of extracting and scoring N candidates
+
+Usage:
+    python benchmarks/comparison.py [--counts 5 20 50] [--concurrency 1 8] [--duplicates 0.2]
+
+Builds synthetic PDF CVs (a --duplicates share of them repeated uploads),
+runs them through cv_comparison.extract_candidates() and score_candidates()
+against benchmarks/fake_llm.py, and reports the wall time of each stage
+per LLM concurrency. With bounded concurrency the scoring time should grow
+in steps of one LLM round trip per `concurrency` CVs, not one per CV.
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_llm import FakeLLM  # noqa: E402
+from benchmarks.synthetic_cvs import make_cv_pdf  # noqa: E402
+
+TITLES = ["Software Engineer", "Data Analyst", "Product Manager", "Registered Nurse"]
+
+
+class Upload(io.BytesIO):
+    """Stand-in for a Streamlit UploadedFile"""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+def make_uploads(count, duplicates, seed):
+    unique = max(1, round(count * (1 - duplicates)))
+    pdfs = [make_cv_pdf(seed + index)[0] for index in range(unique)]
+    return [Upload(pdfs[index % unique], f"cv{index}.pdf") for index in range(count)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Wall time of multi-CV comparison per number of CVs.")
+    parser.add_argument("--counts", nargs="+", type=int, default=[5, 20, 50])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8])
+    parser.add_argument("--duplicates", type=float, default=0.2, help="Share of uploads that repeat another CV")
+    parser.add_argument("--latency", default="fixed:0.4", help="Latency spec of the fake LLM")
+    args = parser.parse_args(argv)
+
+    fake = FakeLLM(latency=args.latency).start()
+    os.environ["OPENAI_BASE_URL"] = fake.base_url
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    # Every case scores from scratch
+    os.environ["RECOMMENDATION_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", str(max(args.concurrency)))
+    import cv_comparison
+
+    print(f"{'cvs':>5} {'unique':>7} {'extract s':>10} {'workers':>8} {'score s':>8} {'llm calls':>10}")
+    try:
+        seed = 0
+        for count in args.counts:
+            for concurrency in args.concurrency:
+                # Fresh CVs per case, so neither extraction nor scoring is cached
+                uploads = make_uploads(count, args.duplicates, seed)
+                seed += count
+                started = time.perf_counter()
+                candidates, _ = cv_comparison.extract_candidates(uploads)
+                extract_seconds = time.perf_counter() - started
+                calls = fake.requests
+                started = time.perf_counter()
+                cv_comparison.score_candidates(candidates, "INTJ - The Architect", TITLES, concurrency=concurrency)
+                score_seconds = time.perf_counter() - started
+                print(f"{count:>5} {len(candidates):>7} {extract_seconds:>10.2f} {concurrency:>8} "
+                      f"{score_seconds:>8.2f} {fake.requests - calls:>10}")
+    finally:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Token benchmark for CV compaction
+
+Usage:
+    python benchmarks/cv_tokens.py [--count 200] [--budget 320] [--pdf-dir cvs/]
+
+Compares the old blind 2000-character truncation with cv_compaction on
+synthetic CVs (or real PDFs) and reports prompt tokens, tokens saved,
+whether the experience and skills sections survive, and compaction time.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic_cvs import make_cv_text  # noqa: E402
+from cv_compaction import CV_TOKEN_BUDGET, clean_cv_text, compact_cv, count_tokens, split_sections  # noqa: E402
+
+LEGACY_CHAR_LIMIT = 2000
+
+
+def load_texts(count, pdf_dir=None):
+    if pdf_dir:
+        from pdf_extraction import extract_pdf_text, read_pdf_bytes
+        names = sorted(name for name in os.listdir(pdf_dir) if name.lower().endswith(".pdf"))[:count]
+        return [extract_pdf_text(read_pdf_bytes(os.path.join(pdf_dir, name))) for name in names]
+    return [make_cv_text(seed)[0] for seed in range(count)]
+
+
+def section_names(text):
+    return {name for name, _ in split_sections(clean_cv_text(text))}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure prompt tokens saved by CV compaction.")
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--budget", type=int, default=CV_TOKEN_BUDGET, help="Token budget for compaction")
+    parser.add_argument("--pdf-dir", help="Use PDFs from this directory instead of synthetic CVs")
+    args = parser.parse_args(argv)
+
+    texts = load_texts(args.count, args.pdf_dir)
+    full, legacy, compacted, seconds = [], [], [], []
+    legacy_coverage = {"experience": 0, "skills": 0}
+    compact_coverage = {"experience": 0, "skills": 0}
+
+    for text in texts:
+        truncated = text[:LEGACY_CHAR_LIMIT]
+        started = time.perf_counter()
+        result = compact_cv(text, args.budget)
+        seconds.append(time.perf_counter() - started)
+
+        full.append(count_tokens(text))
+        legacy.append(count_tokens(truncated))
+        compacted.append(result.tokens)
+        truncated_sections = section_names(truncated)
+        for name in legacy_coverage:
+            legacy_coverage[name] += name in truncated_sections
+            compact_coverage[name] += name in result.sections
+
+    total = len(texts)
+    print(f"CVs: {total}, token budget: {args.budget}")
+    print(f"{'':24}{'mean tokens':>12}{'total tokens':>14}{'has experience':>16}{'has skills':>12}")
+    print(f"{'full text':24}{statistics.fmean(full):>12.0f}{sum(full):>14}{'':>16}{'':>12}")
+    print(f"{'2000-char truncation':24}{statistics.fmean(legacy):>12.0f}{sum(legacy):>14}"
+          f"{legacy_coverage['experience'] / total:>16.0%}{legacy_coverage['skills'] / total:>12.0%}")
+    print(f"{'compacted':24}{statistics.fmean(compacted):>12.0f}{sum(compacted):>14}"
+          f"{compact_coverage['experience'] / total:>16.0%}{compact_coverage['skills'] / total:>12.0%}")
+    print(f"\nTokens saved vs full text: {sum(full) - sum(compacted)} "
+          f"({1 - sum(compacted) / sum(full):.0%})")
+    print(f"Tokens saved vs 2000-char truncation: {sum(legacy) - sum(compacted)} "
+          f"({1 - sum(compacted) / sum(legacy):.0%})")
+    print(f"Compaction time: median {statistics.median(seconds) * 1000:.2f} ms, max {max(seconds) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
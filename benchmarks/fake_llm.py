@@ -0,0 +1,285 @@
+"""Local stand-in for the OpenAI chat completions API
+
+Usage:
+    python benchmarks/fake_llm.py --port 8765 --latency lognormal:-0.5:0.4
+    python benchmarks/fake_llm.py --replay recordings.jsonl --latency uniform:0.2:1.5
+
+Then point the app at it:
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake streamlit run app.py
+
+Serves GET /v1/models and POST /v1/chat/completions (plain and streamed
+SSE), replaying recorded completions round-robin. A replay file is JSONL
+with either a {"content": "..."} object or a full chat.completion response
+per line. Without one, synthetic recommendation JSON is served.
+Role-scoring requests (json_schema "role_scores") always get synthetic
+scores for their roles. Latency specs:
+
+    fixed:SECONDS
+    uniform:LOW:HIGH
+    lognormal:MU:SIGMA          (seconds = exp(normal(MU, SIGMA)))
+
+Prompts get provider-style prefix caching: once a prompt is at least
+--cache-min-tokens long, its leading blocks of --cache-block tokens that an
+earlier prompt already sent are reported as usage.prompt_tokens_details
+.cached_tokens (tokens are whitespace-separated words here). With
+--prefill-per-token, each uncached prompt token adds that many seconds.
+
+--model-latency MODEL=SPEC gives one model its own latency, so routing
+between a fast and a slow model can be exercised against one server.
+--error-rate makes that share of requests fail with 429/500 so retries and
+fallbacks can be exercised.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SYNTHETIC_TITLES = ["Data Analyst", "Product Manager", "Software Engineer", "UX Researcher", "Operations Lead",
+                    "Business Analyst", "Technical Writer", "Solutions Architect"]
+
+
+def parse_latency(spec):
+    """Turn a latency spec into a zero-argument sampler returning seconds"""
+    kind, *args = spec.split(":")
+    args = [float(arg) for arg in args]
+    if kind == "fixed":
+        return lambda: args[0]
+    if kind == "uniform":
+        return lambda: random.uniform(args[0], args[1])
+    if kind == "lognormal":
+        return lambda: math.exp(random.gauss(args[0], args[1]))
+    raise ValueError(f"Unknown latency distribution '{spec}'")
+
+
+def synthetic_completion(seed):
+    rng = random.Random(seed)
+    return json.dumps({"recommendations": [
+        {
+            "title": title,
+            "description": f"Apply your strengths as a {title.lower()} in a growing, collaborative team.",
+            "score": round(rng.uniform(6, 9.5), 1),
+            "suitability": rng.choice(["Excellent", "Good", "Fair"]),
+            "salary_range": f"${rng.randint(50, 80)},000 - ${rng.randint(90, 140)},000",
+            "growth_potential": rng.choice(["High", "Medium"])
+        }
+        for title in rng.sample(SYNTHETIC_TITLES, rng.randint(3, 5))
+    ]})
+
+
+def synthetic_role_scores(titles, seed):
+    rng = random.Random(seed)
+    return json.dumps({"scores": [{"title": title, "score": round(rng.uniform(3, 9.5), 1)} for title in titles]})
+
+
+def _schema_titles(request):
+    # Role-scoring requests list their roles as the enum of the title field
+    json_schema = (request.get("response_format") or {}).get("json_schema") or {}
+    if json_schema.get("name") != "role_scores":
+        return None
+    return json_schema["schema"]["properties"]["scores"]["items"]["properties"]["title"]["enum"]
+
+
+def load_recordings(path):
+    recordings = []
+    with open(path, encoding="utf-8") as replay:
+        for line in replay:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "choices" in entry:
+                recordings.append(entry["choices"][0]["message"]["content"])
+            else:
+                recordings.append(entry["content"])
+    if not recordings:
+        raise ValueError(f"No recordings in {path}")
+    return recordings
+
+
+class FakeLLM:
+    """Replaying OpenAI-compatible server running on a background thread"""
+
+    def __init__(self, host="127.0.0.1", port=0, recordings=None, latency="fixed:0.5",
+                 chunk_chars=24, chunk_delay=0.01, error_rate=0.0, model_latency=None,
+                 cache_min_tokens=1024, cache_block=128, prefill_per_token=0.0):
+        self.recordings = recordings or [synthetic_completion(seed) for seed in range(32)]
+        self.sample_latency = parse_latency(latency)
+        self.model_latency = {model: parse_latency(spec) for model, spec in (model_latency or {}).items()}
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.cache_min_tokens = cache_min_tokens
+        self.cache_block = cache_block
+        self.prefill_per_token = prefill_per_token
+        self._cached_prefixes = set()
+        self._next = itertools.cycle(range(len(self.recordings)))
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="fake-llm", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _take(self):
+        with self._lock:
+            self.requests += 1
+            return self.recordings[next(self._next)]
+
+    def _cached_tokens(self, words):
+        """Prefix-cache the prompt's blocks and return how many tokens were already cached"""
+        if len(words) < self.cache_min_tokens:
+            return 0
+        digest = hashlib.blake2b()
+        cached = 0
+        hit = True
+        with self._lock:
+            for end in range(self.cache_block, len(words) + 1, self.cache_block):
+                digest.update(" ".join(words[end - self.cache_block:end]).encode("utf-8") + b"\x00")
+                key = digest.copy().digest()
+                if hit and key in self._cached_prefixes:
+                    cached = end
+                else:
+                    hit = False
+                    self._cached_prefixes.add(key)
+        return cached
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up, e.g. a hedged request that lost the race
+                    pass
+
+            def _json(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if not self.path.endswith("/models"):
+                    self._json(404, {"error": {"message": "Not found"}})
+                    return
+                models = sorted(set(fake.model_latency) | {"fake-model"})
+                self._json(200, {"object": "list", "data": [
+                    {"id": model, "object": "model", "created": 0, "owned_by": "fake"} for model in models
+                ]})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    self._json(404, {"error": {"message": "Not found"}})
+                    return
+
+                if fake.error_rate and random.random() < fake.error_rate:
+                    status = random.choice([429, 500])
+                    self._json(status, {"error": {"message": "Injected failure", "type": "fake", "code": status}})
+                    return
+
+                content = fake._take()
+                titles = _schema_titles(request)
+                if titles:
+                    content = synthetic_role_scores(titles, len(content))
+                model = request.get("model", "fake-model")
+                words = [word for message in request.get("messages", []) for word in str(message.get("content", "")).split()]
+                prompt_tokens = len(words)
+                cached_tokens = fake._cached_tokens(words)
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                         "total_tokens": prompt_tokens + len(content) // 4,
+                         "prompt_tokens_details": {"cached_tokens": cached_tokens}}
+
+                # Latency before the first byte, like a real model's queue + prefill time
+                time.sleep(fake.model_latency.get(model, fake.sample_latency)()
+                           + (prompt_tokens - cached_tokens) * fake.prefill_per_token)
+
+                if request.get("stream"):
+                    self._stream(content, model, usage, request.get("stream_options", {}).get("include_usage"))
+                    return
+
+                self._json(200, {
+                    "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": usage
+                })
+
+            def _stream(self, content, model, usage, include_usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+
+                def send(payload):
+                    self.wfile.write(b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n")
+                    self.wfile.flush()
+
+                base = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+                for start in range(0, len(content), fake.chunk_chars):
+                    send(dict(base, choices=[{"index": 0, "delta": {"content": content[start:start + fake.chunk_chars]},
+                                              "finish_reason": None}]))
+                    time.sleep(fake.chunk_delay)
+                send(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+                if include_usage:
+                    send(dict(base, choices=[], usage=usage))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve recorded chat completions with configurable latency.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--replay", help="JSONL file of recorded completions")
+    parser.add_argument("--latency", default="fixed:0.5", help="fixed:S | uniform:LO:HI | lognormal:MU:SIGMA")
+    parser.add_argument("--chunk-chars", type=int, default=24, help="Characters per streamed delta")
+    parser.add_argument("--chunk-delay", type=float, default=0.01, help="Seconds between streamed deltas")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 429/500")
+    parser.add_argument("--model-latency", action="append", default=[], metavar="MODEL=SPEC",
+                        help="Latency spec for one model (repeatable)")
+    parser.add_argument("--cache-min-tokens", type=int, default=1024, help="Shortest prompt that is prefix-cached")
+    parser.add_argument("--cache-block", type=int, default=128, help="Prefix cache granularity in tokens")
+    parser.add_argument("--prefill-per-token", type=float, default=0.0, help="Seconds per uncached prompt token")
+    args = parser.parse_args(argv)
+
+    fake = FakeLLM(args.host, args.port, load_recordings(args.replay) if args.replay else None,
+                   args.latency, args.chunk_chars, args.chunk_delay, args.error_rate,
+                   dict(entry.split("=", 1) for entry in args.model_latency),
+                   args.cache_min_tokens, args.cache_block, args.prefill_per_token)
+    print(f"Fake LLM listening on {fake.base_url}")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""Load test: throughput, latency percentiles and peak RSS under concurrent sessions
+
+Usage:
+    python benchmarks/load_test.py extract --sessions 8 --requests 200
+    python benchmarks/load_test.py recommend --sessions 16 --requests 200 --latency lognormal:-0.7:0.5
+    python benchmarks/load_test.py page --sessions 4 --requests 40
+    python benchmarks/load_test.py all --history bench_history.jsonl
+
+Scenarios:
+
+* extract   - app.extract_text_from_pdf on synthetic PDF CVs (one new PDF per request)
+* recommend - app.generate_job_recommendations on synthetic CV text
+* page      - full main_page reruns through AppTest, one process per session:
+              each request sets a new CV and clicks "Seek Oracle's Prophecy"
+* all       - every scenario, each in a fresh interpreter so peak RSS is per scenario
+
+By default LLM calls go to benchmarks/fake_llm.py started in-process
+(--backend fake), so no OpenAI credit is spent; --replay feeds it recorded
+completions. --backend env uses OPENAI_BASE_URL / OPENAI_API_KEY as configured.
+Each scenario starts with an empty recommendation cache, and every request
+uses a different CV, so requests are cache misses.
+
+With --history, the report is appended to a JSONL file and compared with the
+previous run of the same scenario and session count.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_llm import FakeLLM, load_recordings  # noqa: E402
+from benchmarks.synthetic_cvs import make_cv_pdf, make_cv_text  # noqa: E402
+
+SCENARIOS = ("extract", "recommend", "page")
+PERSONALITIES = ["INTJ - The Architect", "ENFP - The Campaigner", "ISTJ - The Logistician", "ESFJ - The Consul"]
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_sessions(sessions, requests, work):
+    """Run requests calls of work(session, index) spread over sessions threads
+
+    work returns True for a normal result and False for a degraded one
+    (fallback recommendations); exceptions count as errors.
+    Returns (latencies, degraded, errors, elapsed_seconds).
+    """
+    latencies = []
+    degraded = []
+    errors = []
+    lock = threading.Lock()
+
+    def session(number):
+        for index in range(number, requests, sessions):
+            started = time.perf_counter()
+            try:
+                ok = work(number, index)
+            except Exception as e:
+                with lock:
+                    errors.append(f"{type(e).__name__}: {e}")
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if not ok:
+                    degraded.append(index)
+
+    threads = [threading.Thread(target=session, args=(number,), name=f"session-{number}") for number in range(sessions)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, degraded, errors, time.perf_counter() - started
+
+
+def extract_work(args):
+    import app
+
+    # Build the corpus up front so PDF generation isn't measured
+    corpus = [make_cv_pdf(args.seed + index, pages=args.pages)[0] for index in range(args.requests)]
+
+    def work(session, index):
+        text = app.extract_text_from_pdf(corpus[index], char_limit=app.CV_CHAR_LIMIT)
+        if not text:
+            raise ValueError("No text extracted")
+        return True
+
+    return work
+
+
+def recommend_work(args):
+    import app
+    import recommender
+
+    texts = [make_cv_text(args.seed + index, pages=args.pages)[0] for index in range(args.requests)]
+
+    def work(session, index):
+        result = app.generate_job_recommendations(texts[index], PERSONALITIES[index % len(PERSONALITIES)])
+        return result is not recommender.FALLBACK_RECOMMENDATIONS
+
+    return work
+
+
+def page_session(session, indices, seed, pages):
+    """Run one AppTest session in its own process (AppTest isn't thread-safe)
+
+    Returns (results, started, finished) where results holds
+    (index, seconds, ok, error) tuples and the wall-clock bounds exclude the
+    first, unmeasured run.
+    """
+    import recommender
+    from streamlit.testing.v1 import AppTest
+
+    os.chdir(ROOT)
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+    results = []
+    started_at = time.time()
+    for index in indices:
+        at.session_state["cv_text"] = make_cv_text(seed + index, pages=pages)[0]
+        started = time.perf_counter()
+        at.sidebar.button[0].click().run()
+        seconds = time.perf_counter() - started
+        if at.exception:
+            results.append((index, seconds, False, f"RuntimeError: {at.exception[0].message}"))
+            continue
+        ok = at.session_state["job_recommendations"] != recommender.FALLBACK_RECOMMENDATIONS
+        results.append((index, seconds, ok, None))
+    return results, started_at, time.time()
+
+
+def run_page_sessions(args):
+    """Like run_sessions, with one process per session"""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    latencies = []
+    degraded = []
+    errors = []
+    bounds = []
+    with ProcessPoolExecutor(max_workers=args.sessions, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [
+            pool.submit(page_session, number, list(range(number, args.requests, args.sessions)), args.seed, args.pages)
+            for number in range(args.sessions)
+        ]
+        for future in futures:
+            try:
+                results, started, finished = future.result()
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            bounds.append((started, finished))
+            for index, seconds, ok, error in results:
+                if error:
+                    errors.append(error)
+                    continue
+                latencies.append(seconds)
+                if not ok:
+                    degraded.append(index)
+    elapsed = max(end for _, end in bounds) - min(start for start, _ in bounds) if bounds else 0.0
+    return latencies, degraded, errors, elapsed
+
+
+def configure_backend(args):
+    """Start the fake LLM (unless --backend env) and isolate caches; returns the server or None"""
+    directory = tempfile.mkdtemp(prefix="oracle-load-")
+    os.environ["RECOMMENDATION_CACHE_PATH"] = os.path.join(directory, "cache.sqlite3")
+    os.environ["RATE_LIMIT_PATH"] = os.path.join(directory, "rate_limits.sqlite3")
+    if args.backend != "fake":
+        return None
+    # The fake backend has no API limits to stay under
+    os.environ.setdefault("ORACLE_GLOBAL_RPM", "0")
+    os.environ.setdefault("ORACLE_GLOBAL_TPM", "0")
+    fake = FakeLLM(recordings=load_recordings(args.replay) if args.replay else None, latency=args.latency,
+                   error_rate=args.error_rate).start()
+    os.environ["OPENAI_BASE_URL"] = fake.base_url
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    return fake
+
+
+def run_scenario(args):
+    fake = configure_backend(args)
+    os.chdir(ROOT)
+    if args.scenario == "page":
+        latencies, degraded, errors, elapsed = run_page_sessions(args)
+    else:
+        work = {"extract": extract_work, "recommend": recommend_work}[args.scenario](args)
+        latencies, degraded, errors, elapsed = run_sessions(args.sessions, args.requests, work)
+    ordered = sorted(latencies)
+    report = {
+        "scenario": args.scenario,
+        "sessions": args.sessions,
+        "requests": args.requests,
+        "backend": args.backend if args.backend != "fake" else f"fake {args.latency}",
+        "completed": len(latencies),
+        "degraded": len(degraded),
+        "errors": len(errors),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            name: round(value * 1000, 1) if value is not None else None
+            for name, value in (
+                ("p50", percentile(ordered, 0.50)),
+                ("p90", percentile(ordered, 0.90)),
+                ("p95", percentile(ordered, 0.95)),
+                ("p99", percentile(ordered, 0.99)),
+                ("max", ordered[-1] if ordered else None),
+            )
+        },
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "children_peak_rss_mb": round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+        "llm_upstream_requests": fake.requests if fake else None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    if errors:
+        report["first_error"] = errors[0]
+    if fake:
+        fake.stop()
+    return report
+
+
+def run_all(args):
+    """Run every scenario in its own interpreter and collect the reports"""
+    reports = []
+    for scenario in SCENARIOS:
+        command = [sys.executable, os.path.abspath(__file__), scenario, "--json",
+                   "--sessions", str(args.sessions), "--requests", str(args.requests), "--seed", str(args.seed),
+                   "--backend", args.backend, "--latency", args.latency, "--error-rate", str(args.error_rate)]
+        if args.pages:
+            command += ["--pages", str(args.pages)]
+        if args.replay:
+            command += ["--replay", os.path.abspath(args.replay)]
+        result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"{scenario} failed:\n{result.stderr[-2000:]}")
+        reports.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return reports
+
+
+def previous_run(history_path, report):
+    if not os.path.exists(history_path):
+        return None
+    previous = None
+    with open(history_path, encoding="utf-8") as history:
+        for line in history:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if (entry.get("scenario"), entry.get("sessions")) == (report["scenario"], report["sessions"]):
+                previous = entry
+    return previous
+
+
+def _change(current, previous):
+    if current is None or not previous:
+        return ""
+    return f" ({(current - previous) / previous * 100:+.1f}%)"
+
+
+def print_report(report, previous=None):
+    latency = report["latency_ms"]
+    before = previous["latency_ms"] if previous else {}
+    print(f"\n{report['scenario']}: {report['sessions']} sessions, {report['requests']} requests, backend {report['backend']}")
+    print(f"  completed {report['completed']}, degraded {report['degraded']}, errors {report['errors']}"
+          f" in {report['elapsed_seconds']:.2f}s")
+    print(f"  throughput   {report['throughput_rps']:.2f} req/s"
+          f"{_change(report['throughput_rps'], previous and previous['throughput_rps'])}")
+    for name in ("p50", "p90", "p95", "p99", "max"):
+        if latency[name] is not None:
+            print(f"  {name:<12} {latency[name]:.1f} ms{_change(latency[name], before.get(name))}")
+    print(f"  peak RSS     {report['peak_rss_mb']:.1f} MB{_change(report['peak_rss_mb'], previous and previous['peak_rss_mb'])}"
+          f" (children {report['children_peak_rss_mb']:.1f} MB)")
+    if report.get("first_error"):
+        print(f"  first error: {report['first_error']}")
+    if previous:
+        print(f"  compared with {previous['timestamp']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test CareerOracle with concurrent sessions.")
+    parser.add_argument("scenario", choices=SCENARIOS + ("all",))
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent sessions")
+    parser.add_argument("--requests", type=int, default=100, help="Total requests across all sessions")
+    parser.add_argument("--pages", type=int, help="Pages per synthetic CV (random by default)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", choices=("fake", "env"), default="fake",
+                        help="fake: local replay server; env: OPENAI_BASE_URL/OPENAI_API_KEY as configured")
+    parser.add_argument("--replay", help="JSONL of recorded completions for the fake backend")
+    parser.add_argument("--latency", default="lognormal:-0.7:0.5", help="Fake backend latency distribution")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of fake backend requests that fail")
+    parser.add_argument("--history", help="Append reports to this JSONL file and compare with the previous run")
+    parser.add_argument("--json", action="store_true", help="Print the report as one JSON line")
+    args = parser.parse_args(argv)
+
+    reports = run_all(args) if args.scenario == "all" else [run_scenario(args)]
+
+    for report in reports:
+        if args.json:
+            print(json.dumps(report))
+            continue
+        print_report(report, previous_run(args.history, report) if args.history else None)
+
+    if args.history:
+        with open(args.history, "a", encoding="utf-8") as history:
+            for report in reports:
+                history.write(json.dumps(report) + "\n")
+    return 0 if all(report["errors"] == 0 for report in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
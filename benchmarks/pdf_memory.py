@@ -0,0 +1,126 @@
+"""Memory benchmark: peak RSS per upload size, in-process vs guarded ingestion
+
+Usage:
+    python benchmarks/pdf_memory.py [--cases 1:0 5:0 30:0 4:1 4:2 8:2 bomb:300]
+
+A case is PAGES:IMAGE_MB_PER_PAGE; image pages stand in for scanned CVs.
+bomb:MB is a hostile one-page PDF whose small compressed content stream
+inflates to MB megabytes when parsed.
+Every case runs in a fresh interpreter so ru_maxrss belongs to that upload
+alone, and reports:
+
+* in-process - PyPDF2 parse inside the worker (pdf_extraction.extract_pdf_text)
+* guarded    - pdf_ingest.ingest_pdf: worker peak plus the parser child's own
+               peak (VmHWM, Linux only; a killed child reports none)
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASE_SCRIPT = r"""
+import io, json, resource, sys, time, zlib
+sys.path.insert(0, {root!r})
+sys.path.insert(0, {benchmarks!r})
+from synthetic_cvs import make_cv_pdf
+import pdf_extraction, pdf_ingest
+
+def make_bomb_pdf(megabytes):
+    # Compressed a megabyte at a time so building the bomb doesn't inflate the baseline
+    compressor = zlib.compressobj(9)
+    content = compressor.compress(b"BT /F1 10 Tf 50 750 Td (CV) Tj ET\n")
+    filler = b" " * (1024 * 1024)
+    for _ in range(int(megabytes)):
+        content += compressor.compress(filler)
+    content += compressor.flush()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content) + content + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 6\n0000000000 65535 f \n" + b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    return out + b"trailer\n<< /Size 6 /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % xref
+
+mode, pages, image_mb = sys.argv[1], sys.argv[2], float(sys.argv[3])
+if pages == "bomb":
+    data = make_bomb_pdf(image_mb)
+else:
+    pages = int(pages)
+    data = make_cv_pdf(0, jobs=max(2, pages * 2), pages=pages, image_bytes=int(image_mb * 1024 * 1024))[0]
+# Imports and the upload itself are the baseline; Streamlit holds uploads in memory too
+import PyPDF2
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+started = time.perf_counter()
+outcome = "ok"
+child_peak = None
+if mode == "in-process":
+    try:
+        pdf_extraction.extract_pdf_text(data)
+    except Exception as e:
+        outcome = "error: " + type(e).__name__
+else:
+    # ingest_pdf without the memo cache, keeping the child's own peak RSS
+    try:
+        spool, _ = pdf_ingest.spool_upload(io.BytesIO(data))
+        status, value, child_peak = pdf_ingest._parse_isolated(
+            spool, None, pdf_ingest.PDF_MAX_PAGES, pdf_ingest.PDF_PARSE_TIMEOUT, pdf_ingest.PDF_PARSE_MEMORY_MB)
+        spool.close()
+        if status != "ok":
+            outcome = "rejected: " + value[0]
+    except pdf_ingest.PDFRejected as e:
+        outcome = "rejected: " + e.reason
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    "bytes": len(data),
+    "outcome": outcome,
+    "seconds": elapsed,
+    "baseline_kb": baseline,
+    "peak_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "child_peak_kb": child_peak,
+}}))
+"""
+
+
+def measure(mode, pages, image_mb):
+    script = CASE_SCRIPT.format(root=ROOT, benchmarks=os.path.join(ROOT, "benchmarks"))
+    # PDF_EXTRACTION_WORKERS=1 keeps the in-process path in one process, as in a busy worker
+    env = dict(os.environ, PDF_EXTRACTION_WORKERS="1")
+    result = subprocess.run([sys.executable, "-c", script, mode, str(pages), str(image_mb)],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Peak RSS per upload size for in-process and guarded PDF parsing.")
+    parser.add_argument("--cases", nargs="+", default=["1:0", "5:0", "30:0", "4:1", "4:2", "8:2", "bomb:300"],
+                        help="PAGES:IMAGE_MB_PER_PAGE or bomb:MB")
+    args = parser.parse_args(argv)
+
+    print(f"{'case':>8} {'size MB':>8} {'mode':>10} {'worker MB':>10} {'+MB':>7} {'child MB':>9} {'ms':>8}  outcome")
+    for case in args.cases:
+        pages, image_mb = case.split(":")
+        for mode in ("in-process", "guarded"):
+            report = measure(mode, pages, float(image_mb))
+            peak = report["peak_kb"] / 1024
+            growth = (report["peak_kb"] - report["baseline_kb"]) / 1024
+            child = (report["child_peak_kb"] or 0) / 1024
+            print(f"{case:>8} {report['bytes'] / (1024 * 1024):>8.2f} {mode:>10} {peak:>10.1f} {growth:>7.1f} "
+                  f"{child:>9.1f} {report['seconds'] * 1000:>8.1f}  {report['outcome']}")
+
+
+if __name__ == "__main__":
+    main()
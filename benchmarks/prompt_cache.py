@@ -0,0 +1,101 @@
+"""Prompt layout benchmark: provider prefix-cache hits, cost and latency per prompt version
+
+Usage:
+    python benchmarks/prompt_cache.py [--requests 200] [--versions 3 4]
+
+Sends the same synthetic CVs through each version of the recommendation
+prompt to benchmarks/fake_llm.py, which simulates provider-side prefix
+caching under two policies:
+
+* openai - prompts of 1024+ tokens, cached in 128-token blocks
+* vllm   - any prompt, cached in 16-token blocks (automatic prefix caching)
+
+and charges --prefill-per-token seconds for every uncached prompt token.
+Costs use gpt-4o-mini prices with cached input at half price. "render us"
+is the local cost of building the messages and counting their tokens.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_llm import FakeLLM  # noqa: E402
+from benchmarks.synthetic_cvs import make_cv_text  # noqa: E402
+
+CACHE_POLICIES = {"openai": (1024, 128), "vllm": (0, 16)}
+PERSONALITIES = ["INTJ - The Architect", "ENFP - The Campaigner", "ISTJ - The Logistician", "ESFJ - The Consul"]
+MODEL = {"name": "gpt-4o-mini", "input_cost": 0.15, "cached_input_cost": 0.075, "output_cost": 0.6}
+
+
+def measure_render(template, excerpts, repeats=20):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for index, excerpt in enumerate(excerpts):
+            template.render(cv_excerpt=excerpt, personality_type=PERSONALITIES[index % len(PERSONALITIES)])
+    return (time.perf_counter() - started) / (repeats * len(excerpts)) * 1e6
+
+
+def run_case(policy, template, excerpts, args):
+    from model_router import ModelRouter, ModelSpec
+    import recommender
+
+    cache_min_tokens, cache_block = CACHE_POLICIES[policy]
+    fake = FakeLLM(latency=f"fixed:{args.base_latency}", chunk_delay=0, cache_min_tokens=cache_min_tokens,
+                   cache_block=cache_block, prefill_per_token=args.prefill_per_token).start()
+    # Each case gets its own endpoint, so nothing is cached from an earlier case
+    os.environ["OPENAI_BASE_URL"] = fake.base_url
+    from llm_pool import LLMPool
+    router = ModelRouter([ModelSpec.from_config(MODEL)], pool=LLMPool())
+    params = recommender.request_params()
+
+    def request(index):
+        prompt = template.render(cv_excerpt=excerpts[index], personality_type=PERSONALITIES[index % len(PERSONALITIES)])
+        route = router.route(0)
+        started = time.perf_counter()
+        router.complete(prompt.messages, route, params, prompt_tokens=prompt.tokens)
+        return time.perf_counter() - started
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.sessions) as executor:
+            latencies = list(executor.map(request, range(len(excerpts))))
+    finally:
+        fake.stop()
+    stats = router.stats()[MODEL["name"]]
+    return {
+        "prompt_tokens": stats["prompt_tokens"] / len(excerpts),
+        "cached_share": stats["cached_prompt_tokens"] / max(stats["prompt_tokens"], 1),
+        "cost_per_1k": 1000 * stats["cost_usd"] / len(excerpts),
+        "mean_latency": sum(latencies) / len(latencies),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prefix-cache hits, cost and latency per prompt version.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--versions", nargs="+", default=["3", "4"])
+    parser.add_argument("--base-latency", type=float, default=0.05)
+    parser.add_argument("--prefill-per-token", type=float, default=0.0005)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    import prompts
+    import recommender
+
+    excerpts = [recommender.prepare_cv_excerpt(make_cv_text(seed)[0]) for seed in range(args.requests)]
+    print(f"{'version':>8} {'cache':>7} {'render us':>10} {'prompt tok':>11} {'cached':>7} {'$/1k req':>9} {'mean s':>7}")
+    for version in args.versions:
+        template = prompts.get_prompt("recommendations", version)
+        render_us = measure_render(template, excerpts)
+        for policy in CACHE_POLICIES:
+            report = run_case(policy, template, excerpts, args)
+            print(f"{version:>8} {policy:>7} {render_us:>10.1f} {report['prompt_tokens']:>11.0f} "
+                  f"{report['cached_share']:>7.0%} {report['cost_per_1k']:>9.4f} {report['mean_latency']:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Rate limit benchmark: upstream budget shared by worker processes
+
+Usage:
+    python benchmarks/rate_limit.py [--processes 3] [--rpm 120] [--seconds 20]
+
+Starts --processes worker processes on one rate limit store. Each runs one
+session that calls rate_limit.RateLimiter.acquire() in a loop: the first
+("spammer") from --spammer-threads threads at once, the others from one
+thread each. Reports the admitted calls per second against the --rpm
+budget, and each session's share and p95 wait. With turn-based admission
+every session should get about the same share, however many calls the
+spammer keeps queued.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.load_test import percentile  # noqa: E402
+
+
+def run_session(path, rpm, session_id, threads, seconds, results):
+    from rate_limit import RateLimited, RateLimiter
+
+    limiter = RateLimiter(path=path, rpm=rpm, tpm=0, max_wait=seconds)
+    deadline = time.monotonic() + seconds
+    waits, rejected = [], []
+
+    def loop():
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            try:
+                limiter.acquire(500, session_id, max_wait=max(deadline - started, 0.01))
+            except RateLimited:
+                rejected.append(1)
+                continue
+            waits.append(time.monotonic() - started)
+
+    workers = [threading.Thread(target=loop) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put((session_id, threads, len(waits), percentile(sorted(waits), 0.95) if waits else 0.0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput and fairness of the shared upstream budget.")
+    parser.add_argument("--processes", type=int, default=3, help="Worker processes, one session each")
+    parser.add_argument("--spammer-threads", type=int, default=8, help="Concurrent calls of the first session")
+    parser.add_argument("--rpm", type=int, default=120, help="Upstream requests per minute")
+    parser.add_argument("--seconds", type=float, default=20)
+    args = parser.parse_args(argv)
+
+    path = os.path.join(tempfile.mkdtemp(), "rate_limits.sqlite3")
+    from rate_limit import RateLimiter
+
+    # Spend the initial burst first, so the run measures the refill rate
+    limiter = RateLimiter(path=path, rpm=args.rpm, tpm=0)
+    for _ in range(args.rpm):
+        limiter.acquire(500)
+
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=run_session, args=(
+            path, args.rpm, f"session{index}", args.spammer_threads if index == 0 else 1, args.seconds, results
+        ))
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    rows = sorted(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+
+    admitted = sum(row[2] for row in rows)
+    print(f"budget {args.rpm / 60:.2f}/s  admitted {admitted / args.seconds:.2f}/s over {args.seconds:g}s")
+    print(f"{'session':>10} {'threads':>8} {'admitted':>9} {'share':>6} {'p95 wait s':>11}")
+    for session_id, threads, count, p95 in rows:
+        print(f"{session_id:>10} {threads:>8} {count:>9} {count / max(admitted, 1):>6.0%} {p95:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Render benchmark for the recommendations view in main_page
+
+Usage:
+    python benchmarks/render.py [--sizes 1 5 10 25 50] [--reruns 20]
+
+For each number of recommendations, runs app.py under Streamlit's AppTest
+with recommendations already in session state and reports:
+
+* median wall time of a script rerun (after the first, warm run)
+* payload size: number of elements and bytes of markdown sent per rerun
+* cold vs memoized cost of building the recommendation view-model
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from recommendation_view import get_recommendation_view  # noqa: E402
+
+
+def make_recommendations(count):
+    return [
+        {
+            "title": f"Oracle Role {i}",
+            "description": "Guide teams through uncertain futures with data, empathy and a crystal ball. " * 2,
+            "score": 5 + (i % 50) / 10,
+            "suitability": "Good",
+            "salary_range": "$60,000 - $90,000",
+            "growth_potential": "High"
+        }
+        for i in range(count)
+    ]
+
+
+def measure_reruns(count, reruns):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+    at.session_state["cv_text"] = "Synthetic CV"
+    at.session_state["job_recommendations"] = make_recommendations(count)
+    at.session_state["recommendation_source"] = "oracle"
+    for i in range(0, count, 3):
+        at.session_state[f"game_completed_{i}"] = True
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception)
+
+    times = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - started)
+
+    markdown_bytes = sum(len(element.value.encode("utf-8")) for element in at.markdown)
+    elements = len(at.markdown) + len(at.button) + len(at.columns)
+    return statistics.median(times), elements, markdown_bytes
+
+
+def measure_view_model(count, repeats=200):
+    state = {"job_recommendations": make_recommendations(count)}
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        state.pop("_recommendation_view", None)
+        get_recommendation_view(state)
+    cold = (time.perf_counter() - started) / repeats
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        get_recommendation_view(state)
+    warm = (time.perf_counter() - started) / repeats
+    return cold, warm
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure main_page rerun cost as recommendations grow.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 10, 25, 50])
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    print(f"{'recs':>5} {'rerun ms':>10} {'elements':>9} {'markdown KB':>12} {'view cold us':>13} {'view memo us':>13}")
+    for count in args.sizes:
+        rerun, elements, markdown_bytes = measure_reruns(count, args.reruns)
+        cold, warm = measure_view_model(count)
+        print(f"{count:>5} {rerun * 1000:>10.1f} {elements:>9} {markdown_bytes / 1024:>12.1f} "
+              f"{cold * 1e6:>13.1f} {warm * 1e6:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Routing benchmark: tail latency and cost per routing policy
+
+Usage:
+    python benchmarks/routing.py [--requests 1000] [--sessions 16] [--stream]
+
+Runs the same recommendation prompts through model_router.ModelRouter
+against benchmarks/fake_llm.py, where the cheap model has a long latency
+tail and the pricier model is steadier, and compares:
+
+* cheap        - every request on the cheap model
+* cheap+hedge  - cheap model, hedged to itself after its recent p95
+* cheap>prem   - cheap model, hedged to the pricier model after its recent p95
+* premium      - every request on the pricier model
+* slo          - cheapest model whose p95 meets --slo, hedged to itself
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_llm import FakeLLM  # noqa: E402
+from benchmarks.load_test import percentile  # noqa: E402
+from benchmarks.synthetic_cvs import make_cv_text  # noqa: E402
+
+CHEAP = {"name": "cheap-model", "input_cost": 0.15, "output_cost": 0.6}
+PREMIUM = {"name": "premium-model", "input_cost": 2.5, "output_cost": 10}
+
+
+def policies(slo):
+    from model_router import ModelSpec
+
+    cheap, premium = ModelSpec.from_config(CHEAP), ModelSpec.from_config(PREMIUM)
+    cheap_to_premium = ModelSpec.from_config(dict(CHEAP, hedge_model=PREMIUM["name"]))
+    return {
+        "cheap": ([cheap], {}),
+        "cheap+hedge": ([cheap], {"hedge": True}),
+        "cheap>prem": ([cheap_to_premium, premium], {"hedge": True}),
+        "premium": ([premium], {}),
+        "slo": ([cheap, premium], {"hedge": True, "latency_slo": slo}),
+    }
+
+
+def run_policy(models, options, args):
+    import recommender
+    from cv_compaction import count_tokens
+    from model_router import ModelRouter
+
+    router = ModelRouter(models, hedge_delay=args.hedge_delay, min_samples=args.min_samples, **options)
+    params = recommender.request_params()
+
+    def request(index):
+        cv_excerpt = recommender.prepare_cv_excerpt(make_cv_text(index)[0])
+        messages = recommender.build_recommendation_messages(cv_excerpt, "INTJ - The Architect")
+        route = router.route(count_tokens(cv_excerpt))
+        started = time.perf_counter()
+        if args.stream:
+            for _ in router.stream(messages, route, params):
+                pass
+        else:
+            router.complete(messages, route, params)
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=args.sessions) as executor:
+        latencies = sorted(executor.map(request, range(args.requests)))
+    stats = router.stats()
+    return {
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "calls": sum(model["calls"] for model in stats.values()),
+        "cost_per_1k": 1000 * sum(model["cost_usd"] for model in stats.values()) / args.requests,
+        "share": {name: model["wins"] / args.requests for name, model in stats.items() if model["wins"]},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tail latency and cost of routing policies against a fake LLM.")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--stream", action="store_true", help="Stream completions (hedges race on the first delta)")
+    parser.add_argument("--cheap-latency", default="lognormal:-1.2:0.9", help="Latency spec of the cheap model")
+    parser.add_argument("--premium-latency", default="lognormal:-1.0:0.3", help="Latency spec of the pricier model")
+    parser.add_argument("--slo", type=float, default=1.5, help="Latency SLO in seconds for the slo policy")
+    parser.add_argument("--hedge-delay", type=float, default=0.8, help="Hedge deadline before enough samples")
+    parser.add_argument("--min-samples", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    fake = FakeLLM(chunk_delay=0.002, model_latency={
+        CHEAP["name"]: args.cheap_latency, PREMIUM["name"]: args.premium_latency
+    }).start()
+    os.environ["OPENAI_BASE_URL"] = fake.base_url
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    # Leave room for hedges so the pool limit doesn't shape the tail
+    os.environ.setdefault("LLM_MAX_CONCURRENCY", str(args.sessions * 2))
+
+    print(f"{'policy':>12} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'calls':>6} {'$/1k req':>9}  model share")
+    try:
+        for name, (models, options) in policies(args.slo).items():
+            report = run_policy(models, options, args)
+            share = ", ".join(f"{model} {value:.0%}" for model, value in report["share"].items())
+            print(f"{name:>12} {report['p50']:>7.3f} {report['p95']:>7.3f} {report['p99']:>7.3f} "
+                  f"{report['calls']:>6} {report['cost_per_1k']:>9.3f}  {share}")
+    finally:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
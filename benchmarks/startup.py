@@ -0,0 +1,171 @@
+"""Startup benchmark: import-time profile, cold first-paint time and time to ready
+
+Usage:
+    python benchmarks/startup.py [--top 25] [--runs 3] [--ready-runs 3]
+
+Runs every measurement in a fresh interpreter so module caches don't hide
+cold-start costs:
+
+* ``python -X importtime -c "import app"`` parsed into a per-package report
+* wall time of a cold AppTest run of app.py (first paint of main_page)
+* for ``python warmup.py run``, the time until Streamlit answers its health
+  check and until /readyz reports the worker warm (against benchmarks/fake_llm.py)
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIRST_PAINT_SCRIPT = """
+import time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=60).run()
+elapsed = time.perf_counter() - started
+assert not at.exception, at.exception
+print(elapsed)
+"""
+
+
+def _run_python(args, env_overrides=None):
+    env = dict(os.environ, PYTHONPATH=ROOT, **(env_overrides or {}))
+    return subprocess.run([sys.executable] + args, cwd=ROOT, env=env, capture_output=True, text=True)
+
+
+def import_profile(module="app"):
+    """Return (total_seconds, rows) from -X importtime for a cold import of module
+
+    rows are (cumulative_us, self_us, depth, name) tuples.
+    """
+    started = time.perf_counter()
+    result = _run_python(["-X", "importtime", "-c", f"import {module}"])
+    total = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(cumulative_us), int(self_us), depth, name.strip()))
+    return total, rows
+
+
+def first_paint(runs):
+    """Return cold first-paint times of main_page in seconds"""
+    times = []
+    for _ in range(runs):
+        result = _run_python(["-c", FIRST_PAINT_SCRIPT])
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr[-2000:])
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+    return times
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _answers(url):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status == 200
+    except OSError:
+        # Not listening yet, or 503 while warming up
+        return False
+
+
+def time_to_ready(runs, timeout=120):
+    """Return [(server_up_seconds, ready_seconds)] for cold `python warmup.py run` workers"""
+    from benchmarks.fake_llm import FakeLLM
+
+    # Warm-up opens its LLM connections to the fake server
+    fake = FakeLLM().start()
+    results = []
+    try:
+        for _ in range(runs):
+            app_port, metrics_port = _free_port(), _free_port()
+            env = dict(os.environ, PYTHONPATH=ROOT, ORACLE_METRICS_HOST="127.0.0.1",
+                       ORACLE_METRICS_PORT=str(metrics_port), OPENAI_BASE_URL=fake.base_url,
+                       OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "fake"))
+            started = time.perf_counter()
+            process = subprocess.Popen(
+                [sys.executable, "warmup.py", "run", "--server.headless", "true", "--server.port", str(app_port),
+                 "--browser.gatherUsageStats", "false"],
+                cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            server_up = ready = None
+            try:
+                while (server_up is None or ready is None) and time.perf_counter() - started < timeout:
+                    if process.poll() is not None:
+                        raise RuntimeError(f"warmup.py run exited with {process.returncode}")
+                    if server_up is None and _answers(f"http://127.0.0.1:{app_port}/_stcore/health"):
+                        server_up = time.perf_counter() - started
+                    if ready is None and _answers(f"http://127.0.0.1:{metrics_port}/readyz"):
+                        ready = time.perf_counter() - started
+                    time.sleep(0.01)
+            finally:
+                process.terminate()
+                process.wait()
+            if server_up is None or ready is None:
+                raise RuntimeError(f"worker not ready within {timeout}s")
+            results.append((server_up, ready))
+    finally:
+        fake.stop()
+    return results
+
+
+def print_import_report(rows, top):
+    top_level = defaultdict(int)
+    for cumulative_us, self_us, depth, name in rows:
+        top_level[name.split(".")[0]] += self_us
+
+    print(f"\nSlowest imports (cumulative, top {top}):")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, depth, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {'  ' * depth}{name}")
+
+    print(f"\nSelf time by top-level package (top {top}):")
+    for package, self_us in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"{self_us / 1000:14.1f} ms  {package}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure CareerOracle cold-start cost.")
+    parser.add_argument("--module", default="app", help="Module to profile with -X importtime")
+    parser.add_argument("--top", type=int, default=25, help="Rows to show per report")
+    parser.add_argument("--runs", type=int, default=3, help="Cold first-paint runs")
+    parser.add_argument("--ready-runs", type=int, default=3, help="Cold time-to-ready runs (0 skips them)")
+    args = parser.parse_args(argv)
+
+    total, rows = import_profile(args.module)
+    imported = sum(cumulative_us for cumulative_us, _, depth, _ in rows if depth == 0)
+    print(f"import {args.module}: {imported / 1000:.1f} ms in imports, {total * 1000:.1f} ms process wall time")
+    print_import_report(rows, args.top)
+
+    times = first_paint(args.runs)
+    print(f"\nCold first paint of main_page over {args.runs} runs: "
+          f"median {statistics.median(times) * 1000:.1f} ms, min {min(times) * 1000:.1f} ms, max {max(times) * 1000:.1f} ms")
+
+    if args.ready_runs:
+        results = time_to_ready(args.ready_runs)
+        server_up, ready = [run[0] for run in results], [run[1] for run in results]
+        print(f"\nCold `warmup.py run` over {args.ready_runs} runs: server up median "
+              f"{statistics.median(server_up) * 1000:.1f} ms, ready (warm) median {statistics.median(ready) * 1000:.1f} ms, "
+              f"max {max(ready) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
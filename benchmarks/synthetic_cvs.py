@@ -0,0 +1,168 @@
+"""Synthetic CV text for benchmarks
+
+Generates deterministic, realistic-looking CVs of varying length, including
+the PyPDF2 noise (page footers, hyphenated line breaks, bullet glyphs) that
+real extractions contain, and writes them out as minimal PDFs so the real
+extraction path can be benchmarked.
+
+Usage:
+    python benchmarks/synthetic_cvs.py --out bench_corpus --count 50
+"""
+import argparse
+import os
+import random
+
+FIRST_NAMES = ["Alex", "Sam", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Jamie", "Avery", "Quinn"]
+LAST_NAMES = ["Smith", "Garcia", "Chen", "Okafor", "Novak", "Haddad", "Silva", "Kowalski", "Ito", "Brown"]
+ROLES = ["Software Engineer", "Data Analyst", "Product Manager", "UX Designer", "Marketing Specialist",
+         "Financial Analyst", "Nurse", "Teacher", "Mechanical Engineer", "Sales Manager"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Health", "Stark Industries", "Wayne Enterprises",
+             "Hooli", "Vandelay Imports", "Soylent Ltd", "Tyrell Systems"]
+SKILLS = ["Python", "SQL", "Project management", "Stakeholder communication", "Tableau", "Figma", "Excel",
+          "Machine learning", "Customer research", "Budgeting", "Public speaking", "JavaScript", "AWS",
+          "Negotiation", "Team leadership", "Data visualization", "A/B testing", "Agile delivery"]
+ACHIEVEMENTS = [
+    "Led a cross-functional team of {n} people to deliver the {thing} two weeks ahead of schedule",
+    "Reduced {thing} costs by {n}% through process automation and vendor consolidation",
+    "Designed and launched the {thing}, used by more than {n},000 customers in the first quarter",
+    "Mentored {n} junior colleagues and introduced a structured onboarding programme for the {thing}",
+    "Improved {thing} reliability from 97% to 99.{n}% by introducing monitoring and on-call rotations",
+]
+THINGS = ["billing platform", "analytics dashboard", "mobile app", "customer portal", "supply chain pipeline",
+          "reporting suite", "recommendation engine", "training curriculum", "patient intake process"]
+
+
+def make_cv_text(seed, jobs=None, pages=None):
+    """Return (text, metadata) for a synthetic CV; seed makes it deterministic"""
+    rng = random.Random(seed)
+    jobs = jobs or rng.randint(2, 8)
+    pages = pages or max(1, jobs // 2)
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    role = rng.choice(ROLES)
+
+    lines = [name, role, f"{name.split()[0].lower()}@example.com | +1 555 {rng.randint(1000, 9999)}", ""]
+    lines += ["PROFESSIONAL SUMMARY",
+              f"{role} with {jobs * 2} years of experience delivering measurable results in fast-paced "
+              f"organisations. Known for clear communication, ownership and a bias for action.", ""]
+    lines.append("WORK EXPERIENCE")
+    for job in range(jobs):
+        lines.append(f"{rng.choice(ROLES)} - {rng.choice(COMPANIES)} ({2024 - 2 * job - 2} - {2024 - 2 * job})")
+        for _ in range(rng.randint(3, 6)):
+            achievement = rng.choice(ACHIEVEMENTS).format(n=rng.randint(2, 40), thing=rng.choice(THINGS))
+            # PyPDF2 frequently splits long bullets with a hyphenated line break
+            if rng.random() < 0.2:
+                cut = len(achievement) // 2
+                achievement = achievement[:cut] + "-\n" + achievement[cut:]
+            lines.append(f"•  {achievement}")
+        lines.append("")
+    lines += ["SKILLS", ", ".join(rng.sample(SKILLS, 8)), ""]
+    lines += ["EDUCATION", f"BSc in {rng.choice(['Computer Science', 'Economics', 'Biology', 'Design'])}, "
+              f"University of {rng.choice(['Leeds', 'Toronto', 'Sydney', 'Lagos', 'Warsaw'])}", ""]
+    lines += ["INTERESTS", "Hiking, chess, volunteering at the local food bank, photography", ""]
+    lines += ["REFERENCES", "Available on request"]
+
+    # Spread the lines over pages with a running footer, as PDF extraction does
+    per_page = max(1, len(lines) // pages)
+    text_pages = []
+    for page in range(pages):
+        chunk = lines[page * per_page:(page + 1) * per_page] if page < pages - 1 else lines[page * per_page:]
+        text_pages.append("\n".join(chunk + [f"{name} - Curriculum Vitae", f"Page {page + 1} of {pages}"]))
+    return "\n".join(text_pages), {"name": name, "role": role, "jobs": jobs, "pages": pages}
+
+
+def _pdf_string(line):
+    # Standard 14 fonts only cover Latin-1; escape the PDF string delimiters
+    line = line.replace("•", "-").encode("latin-1", "replace").decode("latin-1")
+    return "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def make_pdf(pages, lines_per_page=50, image_bytes=0):
+    """Return bytes of a minimal text PDF with one list of lines per page
+
+    Pages longer than lines_per_page continue on extra PDF pages. With
+    image_bytes, every page also draws an uncompressed grayscale image of
+    about that size, like a scanned CV.
+    """
+    split_pages = []
+    for lines in pages:
+        lines = lines or [""]
+        split_pages += [lines[start:start + lines_per_page] for start in range(0, len(lines), lines_per_page)]
+
+    count = len(split_pages)
+    font = 3 + 2 * count
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{3 + 2 * i} 0 R' for i in range(count))}] /Count {count} >>".encode(),
+    ]
+    for index, lines in enumerate(split_pages):
+        image = f"/XObject << /Im1 {font + 1 + index} 0 R >> " if image_bytes else ""
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * index} 0 R "
+                       f"/Resources << /Font << /F1 {font} 0 R >> {image}>> >>".encode())
+        operators = ["q 612 0 0 792 0 0 cm /Im1 Do Q"] if image_bytes else []
+        operators += ["BT /F1 10 Tf 14 TL 50 750 Td"] + [f"{_pdf_string(line)} Tj T*" for line in lines] + ["ET"]
+        content = "\n".join(operators).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    if image_bytes:
+        width = 1000
+        height = max(1, image_bytes // width)
+        for index in range(count):
+            pixels = random.Random(index).randbytes(width * height)
+            objects.append(b"<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceGray "
+                           b"/BitsPerComponent 8 /Length %d >>\nstream\n" % (width, height, len(pixels))
+                           + pixels + b"\nendstream")
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return out
+
+
+def make_cv_pdf(seed, jobs=None, pages=None, image_bytes=0):
+    """Return (pdf_bytes, metadata) for a synthetic CV"""
+    text, metadata = make_cv_text(seed, jobs, pages)
+    pages = metadata["pages"]
+    # make_cv_text already appends a footer per page; drop it, the page text is split evenly instead
+    lines = [line for line in text.split("\n") if not line.startswith("Page ") and not line.endswith("Curriculum Vitae")]
+    per_page = max(1, -(-len(lines) // pages))
+    pdf_pages = [
+        lines[start:start + per_page] + [f"{metadata['name']} - Curriculum Vitae", f"Page {number} of {pages}"]
+        for number, start in enumerate(range(0, len(lines), per_page), 1)
+    ]
+    return make_pdf(pdf_pages, image_bytes=image_bytes), metadata
+
+
+def write_corpus(directory, count, seed=0, jobs=None, pages=None):
+    """Write count synthetic CV PDFs to directory and return their paths"""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(count):
+        data, _ = make_cv_pdf(seed + index, jobs, pages)
+        path = os.path.join(directory, f"cv_{seed + index:05d}.pdf")
+        with open(path, "wb") as pdf_file:
+            pdf_file.write(data)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a corpus of synthetic CV PDFs.")
+    parser.add_argument("--out", default="bench_corpus", help="Output directory")
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jobs", type=int, help="Jobs per CV (random 2-8 by default)")
+    parser.add_argument("--pages", type=int, help="Pages per CV (jobs/2 by default)")
+    args = parser.parse_args(argv)
+
+    paths = write_corpus(args.out, args.count, args.seed, args.jobs, args.pages)
+    print(f"Wrote {len(paths)} CVs to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
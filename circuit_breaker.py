@@ -0,0 +1,128 @@
+"""Circuit breaker for the LLM backend
+
+While the backend answers, the circuit is closed and calls go through.
+After ORACLE_BREAKER_FAILURES consecutive upstream failures (timeouts,
+missed deadlines, connection errors, 429s and 5xx; a rejected request
+says nothing about the backend's health) the circuit opens: calls fail at
+once with CircuitOpenError, so callers can degrade instead of queueing
+behind a dead upstream. After ORACLE_BREAKER_RESET seconds the circuit is
+half-open and lets ORACLE_BREAKER_PROBES calls through; a success closes
+it, a failure opens it again.
+
+The state is per process, like the LLM pool it protects.
+"""
+import logging
+import os
+import threading
+import time
+
+import metrics
+from lazy import singleton
+from llm_pool import is_upstream_error
+
+logger = logging.getLogger(__name__)
+
+# Breaker configuration
+BREAKER_FAILURES = int(os.getenv("ORACLE_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("ORACLE_BREAKER_RESET", "30"))
+BREAKER_PROBES = int(os.getenv("ORACLE_BREAKER_PROBES", "1"))
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+# Gauge values of the states
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """The circuit is open; the call was not attempted"""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker: call before() before a call and success() or failure(error) after it
+
+    A call that ends without an outcome (the caller gave up) must call release().
+    """
+
+    def __init__(self, name, failures=BREAKER_FAILURES, reset_seconds=BREAKER_RESET_SECONDS,
+                 probes=BREAKER_PROBES):
+        self.name = name
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.probes = probes
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.in_flight_probes = 0
+        self.counters = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        if state != self.state:
+            logger.warning("Circuit %s is now %s", self.name, state)
+            metrics.increment("circuit_transitions_total", circuit=self.name, state=state)
+        self.state = state
+
+    def _reject(self, retry_in):
+        self.counters["rejected"] += 1
+        metrics.increment("circuit_rejected_total", circuit=self.name)
+        raise CircuitOpenError(f"Circuit {self.name} is open, retry in {max(retry_in, 0):.0f}s")
+
+    def before(self):
+        """Admit a call or raise CircuitOpenError"""
+        with self._lock:
+            if self.state == OPEN:
+                waited = time.monotonic() - self.opened_at
+                if waited < self.reset_seconds:
+                    self._reject(self.reset_seconds - waited)
+                self._set_state(HALF_OPEN)
+                self.in_flight_probes = 0
+            if self.state == HALF_OPEN:
+                if self.in_flight_probes >= self.probes:
+                    self._reject(0)
+                self.in_flight_probes += 1
+            self.counters["calls"] += 1
+
+    def success(self):
+        """Record an admitted call that reached the backend"""
+        with self._lock:
+            self.consecutive_failures = 0
+            if self.state == HALF_OPEN:
+                self.in_flight_probes = 0
+                self._set_state(CLOSED)
+
+    def failure(self, error):
+        """Record an admitted call that failed; only upstream errors count against the backend"""
+        if not is_upstream_error(error):
+            self.success()
+            return
+        with self._lock:
+            self.counters["failures"] += 1
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failures:
+                if self.state != OPEN:
+                    self.counters["opened"] += 1
+                self.opened_at = time.monotonic()
+                self.in_flight_probes = 0
+                self._set_state(OPEN)
+
+    def release(self):
+        """Give back the probe of an admitted call that ended without an outcome"""
+        with self._lock:
+            if self.state == HALF_OPEN and self.in_flight_probes:
+                self.in_flight_probes -= 1
+
+    def stats(self):
+        """Return the state and counters"""
+        with self._lock:
+            return dict(self.counters, state=self.state, consecutive_failures=self.consecutive_failures)
+
+
+@singleton
+def get_breaker():
+    """Return the process-wide breaker of the LLM backend"""
+    breaker = CircuitBreaker("llm")
+    metrics.register_collector(lambda: [
+        ("circuit_state", "gauge", {"circuit": breaker.name}, STATE_VALUES[breaker.stats()["state"]])
+    ])
+    return breaker
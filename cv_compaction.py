@@ -0,0 +1,214 @@
+import hashlib
+import os
+import re
+import threading
+from collections import Counter, OrderedDict, namedtuple
+
+# Compaction configuration
+CV_TOKEN_BUDGET = int(os.getenv("CV_TOKEN_BUDGET", "320"))
+TOKENIZER_ENCODING = os.getenv("CV_TOKENIZER_ENCODING", "o200k_base")
+CACHE_SIZE = int(os.getenv("CV_COMPACTION_CACHE_SIZE", "256"))
+
+CompactCV = namedtuple("CompactCV", ["text", "original_tokens", "tokens", "sections"])
+
+# Section name -> heading keywords, in priority order for the token budget
+SECTION_PRIORITY = (
+    ("experience", ("experience", "work experience", "professional experience", "employment",
+                    "employment history", "work history", "career history")),
+    ("skills", ("skills", "technical skills", "core skills", "key skills", "competencies",
+                "core competencies", "technologies", "tools")),
+    ("summary", ("summary", "profile", "professional summary", "about me", "objective", "career objective")),
+    ("projects", ("projects", "key projects", "selected projects")),
+    ("education", ("education", "academic background", "qualifications")),
+    ("certifications", ("certifications", "certificates", "licenses", "courses", "training")),
+    ("achievements", ("achievements", "awards", "honors", "honours", "publications")),
+    ("languages", ("languages",)),
+    ("volunteering", ("volunteering", "volunteer experience", "leadership")),
+    ("interests", ("interests", "hobbies")),
+    ("references", ("references", "referees")),
+)
+# Ranked below unrecognized sections
+LOW_VALUE_SECTIONS = {"interests", "references"}
+
+_HEADINGS = {keyword: name for name, keywords in SECTION_PRIORITY for keyword in keywords}
+_SECTION_RANK = {
+    name: len(SECTION_PRIORITY) + 1 if name in LOW_VALUE_SECTIONS else rank
+    for rank, (name, _) in enumerate(SECTION_PRIORITY)
+}
+
+_PAGE_NUMBER = re.compile(r"^\s*(page\s*)?\d+\s*(of\s*\d+)?\s*$", re.IGNORECASE)
+_HYPHEN_BREAK = re.compile(r"(\w)-\n(\w)")
+_SPACES = re.compile(r"[ \t ]+")
+_BULLETS = re.compile(r"^\s*[•●▪◦■□➢►\-\*·]+\s*")
+_WORD_TOKENS = re.compile(r"\w+|[^\w\s]")
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_encoding = None
+
+
+def count_tokens(text):
+    """Count tokens with tiktoken when installed, otherwise approximate"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    # Words and punctuation marks are a close stand-in for BPE tokens on English CVs
+    return len(_WORD_TOKENS.findall(text))
+
+
+def clean_cv_text(text):
+    """Remove PyPDF2 extraction noise: page numbers, repeated headers/footers,
+    hyphenated line breaks, bullet glyphs and duplicated whitespace"""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = _HYPHEN_BREAK.sub(r"\1\2", text)
+
+    lines = [_SPACES.sub(" ", line).strip() for line in text.split("\n")]
+    lines = [line for line in lines if line and not _PAGE_NUMBER.match(line)]
+
+    # Short lines repeated on several pages are running headers or footers
+    counts = Counter(line for line in lines if len(line) < 80)
+    repeated = {line for line, count in counts.items() if count >= 3}
+
+    cleaned = []
+    seen_header = set()
+    previous = None
+    for line in lines:
+        if line in repeated:
+            if line in seen_header:
+                continue
+            seen_header.add(line)
+        line = _BULLETS.sub("- ", line) if _BULLETS.match(line) else line
+        if line == previous:
+            continue
+        cleaned.append(line)
+        previous = line
+    return "\n".join(cleaned)
+
+
+def _heading_name(line):
+    candidate = line.strip().rstrip(":").strip().lower()
+    if len(candidate) > 40:
+        return None
+    return _HEADINGS.get(candidate)
+
+
+def split_sections(text):
+    """Split cleaned CV text into [(section_name, lines)] in document order
+
+    Text before the first recognized heading is the "header" section
+    (name, contact details, headline).
+    """
+    sections = [("header", [])]
+    for line in text.split("\n"):
+        name = _heading_name(line)
+        if name:
+            sections.append((name, [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(name, lines) for name, lines in sections if lines]
+
+
+def _truncate_words(line, budget):
+    # Longest word prefix of line that fits in budget tokens (binary search)
+    words = line.split(" ")
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle])) + 1 <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return " ".join(words[:low])
+
+
+def _fit_lines(lines, budget, allow_partial=True):
+    kept = []
+    used = 0
+    for line in lines:
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            # PyPDF2 often returns a whole paragraph as one line, so cut it at a word
+            partial = _truncate_words(line, budget - used) if allow_partial else ""
+            if partial:
+                kept.append(partial)
+                used += count_tokens(partial) + 1
+            break
+        kept.append(line)
+        used += cost
+    return kept, used
+
+
+def compact_cv(text, token_budget=CV_TOKEN_BUDGET):
+    """Compact extracted CV text into at most token_budget tokens
+
+    Sections are admitted in SECTION_PRIORITY order (experience and skills
+    first), each capped at a third of the budget before leftovers are
+    shared out; a section that does not fit is cut to the remaining budget. The kept
+    sections are emitted in their original document order. Results are
+    cached per CV hash and budget.
+    """
+    key = (hashlib.sha256(text.encode("utf-8")).hexdigest(), token_budget)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+
+    original_tokens = count_tokens(text)
+    cleaned = clean_cv_text(text)
+    sections = split_sections(cleaned)
+
+    # Header first (who the candidate is), then by priority, unknown sections last
+    order = sorted(
+        range(len(sections)),
+        key=lambda index: -1 if sections[index][0] == "header" else _SECTION_RANK.get(sections[index][0], len(SECTION_PRIORITY))
+    )
+
+    # First pass caps every section at a share of the budget so that a long
+    # experience section cannot crowd out skills; the second pass hands the
+    # leftover budget back out in priority order.
+    remaining = token_budget
+    kept = {}
+    share = max(token_budget // 3, 1)
+    # Without recognized headings the whole CV is "header" and gets the full budget
+    header_share = token_budget // 8 if len(sections) > 1 else token_budget
+    for cap in (share, None):
+        for index in order:
+            name, lines = sections[index]
+            if remaining <= 0:
+                break
+            if cap is not None:
+                # Low-value sections only get what is left after everything else
+                if name in LOW_VALUE_SECTIONS:
+                    continue
+                budget = min(remaining, header_share if name == "header" else cap)
+            elif name == "header":
+                continue
+            else:
+                budget = remaining
+            already = kept.get(index, [])
+            # Only whole lines in the first pass, so the second pass can continue after them
+            fitted, used = _fit_lines(lines[len(already):], budget, cap is None)
+            if fitted:
+                kept[index] = already + fitted
+                remaining -= used
+
+    compacted = "\n".join(line for index in sorted(kept) for line in kept[index])
+    result = CompactCV(
+        compacted,
+        original_tokens,
+        count_tokens(compacted),
+        tuple(sections[index][0] for index in sorted(kept))
+    )
+
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
@@ -0,0 +1,333 @@
+"""Multi-CV comparison: many candidates scored against the same target roles
+
+A recruiter uploads a set of CVs and picks the roles to compare them for.
+Uploads are hashed first, so identical files are extracted and scored
+once, and the unique ones are extracted in parallel, each in its own
+guarded parser process (see pdf_ingest.py). Scoring runs in the job queue:
+one LLM call per CV rates every target role at once, with at most
+COMPARE_CONCURRENCY calls in flight, so a few dozen CVs cost a few LLM
+round trips of wall time rather than dozens. The role index scores all the
+CVs in one batch up front; a CV the LLM can't score (for example while its
+circuit is open) keeps those scores. Index scores are on a different scale
+from the LLM's, so the table ranks only candidates the LLM scored for every
+role and lists the others after them, unranked and marked with their
+source. LLM scores are cached like recommendations.
+"""
+import functools
+import io
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+import streamlit as st
+
+import metrics
+import recommender
+from circuit_breaker import CircuitOpenError
+from cv_compaction import count_tokens
+from job_queue import ACTIVE_STATUSES, CANCELLED, DONE, get_queue
+from lazy import singleton
+from model_router import get_router
+from page_jobs import JOB_POLL_INTERVAL, cancel_job, current_session_id, rate_limited
+from pdf_extraction import hash_pdf_bytes
+from pdf_ingest import PDFRejected, ingest_pdf
+from prompts import get_prompt, record_usage
+from rate_limit import RateLimited
+from recommendation_cache import make_cache_key
+from recommendation_schema import parse_role_scores, response_format, role_score_schema
+from role_index import MBTI_TYPES, ROLE_TITLES, score_roles
+
+logger = logging.getLogger(__name__)
+
+# Comparison configuration
+COMPARE_MAX_FILES = int(os.getenv("COMPARE_MAX_FILES", "50"))
+COMPARE_MAX_ROLES = int(os.getenv("COMPARE_MAX_ROLES", "8"))
+COMPARE_CONCURRENCY = int(os.getenv("COMPARE_CONCURRENCY", "8"))
+COMPARE_EXTRACT_WORKERS = int(os.getenv("COMPARE_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+
+# Roles preselected on the page
+DEFAULT_ROLES = ("Software Engineer", "Data Analyst", "Product Manager")
+# Candidates' personality types are usually unknown
+ANY_PERSONALITY = "Not specified"
+
+SCORE_PROMPT = get_prompt("role_scores")
+
+
+def read_uploads(uploads):
+    """Group uploaded files by content hash: {digest: (file names, bytes)}, in upload order"""
+    groups = {}
+    for upload in uploads:
+        data = upload.getvalue()
+        names, _ = groups.setdefault(hash_pdf_bytes(data), ([], data))
+        names.append(upload.name)
+    metrics.increment("comparison_duplicate_cvs_total", len(uploads) - len(groups))
+    return groups
+
+
+def extract_candidates(uploads, char_limit=recommender.CV_CHAR_LIMIT, workers=COMPARE_EXTRACT_WORKERS):
+    """Extract the unique CVs of a multi-file upload in parallel
+
+    Returns (candidates, rejected): candidates are {"id", "names", "cv_text"}
+    dicts in upload order, rejected are (file names, message) pairs.
+    """
+    return extract_groups(read_uploads(uploads), char_limit, workers)
+
+
+def extract_groups(groups, char_limit=recommender.CV_CHAR_LIMIT, workers=COMPARE_EXTRACT_WORKERS):
+    """extract_candidates() for uploads already grouped by read_uploads()"""
+    with metrics.timer("comparison_extract"), ThreadPoolExecutor(max_workers=workers) as executor:
+        # Each extraction waits on its own parser process, so threads are enough
+        futures = {
+            digest: executor.submit(ingest_pdf, io.BytesIO(data), char_limit=char_limit)
+            for digest, (_, data) in groups.items()
+        }
+        candidates = []
+        rejected = []
+        for digest, future in futures.items():
+            names = groups[digest][0]
+            try:
+                candidates.append({"id": digest[:12], "names": names, "cv_text": future.result()})
+            except PDFRejected as e:
+                rejected.append((names, str(e)))
+    return candidates, rejected
+
+
+def score_params(titles, model=recommender.MODEL_NAME):
+    """Return the chat completion parameters for scoring titles"""
+    # Temperature 0 so candidates are scored alike
+    params = {"model": model, "max_tokens": 40 + 20 * len(titles), "temperature": 0}
+    format_param = response_format(recommender.RESPONSE_FORMAT, "role_scores", role_score_schema(titles))
+    if format_param:
+        params["response_format"] = format_param
+    return params
+
+
+def score_candidate(cv_text, personality_type, titles, session_id=None):
+    """Ask the Oracle to score one CV for every title: returns {title: score}, raising on any failure"""
+    cv_excerpt = recommender.prepare_cv_excerpt(cv_text)
+    prompt = SCORE_PROMPT.render(
+        cv_excerpt=cv_excerpt,
+        personality_type=personality_type,
+        roles="\n".join(f"- {title}" for title in titles)
+    )
+    cache_key = make_cache_key(cv_excerpt, personality_type, recommender.MODEL_NAME,
+                               f"{SCORE_PROMPT.key}:{json.dumps(titles)}")
+    cached = recommender.recommendation_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    router = get_router()
+    response = router.complete(
+        prompt.messages, router.route(count_tokens(cv_excerpt), prompt.tokens), score_params(titles),
+        session_id=session_id, prompt_tokens=prompt.tokens, on_usage=functools.partial(record_usage, SCORE_PROMPT)
+    )
+    scores = parse_role_scores(response.choices[0].message.content, titles)
+    recommender.recommendation_cache.set(cache_key, scores)
+    return scores
+
+
+def score_candidates(candidates, personality_type, titles, session_id=None, concurrency=COMPARE_CONCURRENCY,
+                     on_row=None):
+    """Score every candidate for every title; returns one row per candidate, in order
+
+    At most concurrency LLM calls run at once. on_row(rows) is called as rows
+    finish (unfinished ones are None) and may raise to stop the run.
+    """
+    # One batched pass over the role index, for CVs the LLM can't score
+    fallback = score_roles([candidate["cv_text"] for candidate in candidates], personality_type, titles)
+    rows = [None] * len(candidates)
+
+    def score(index):
+        candidate = candidates[index]
+        try:
+            scores = score_candidate(candidate["cv_text"], personality_type, titles, session_id)
+            # Roles the LLM skipped stay blank rather than borrowing index scores
+            source = "oracle" if len(scores) == len(titles) else "partial"
+        except Exception as e:
+            if isinstance(e, (CircuitOpenError, RateLimited)):
+                logger.debug("Scoring %s from the role index: %s", candidate["id"], e)
+            else:
+                logger.warning("Scoring %s from the role index: %s", candidate["id"], e)
+            scores, source = fallback[index], "index"
+        metrics.increment("comparison_scores_total", source=source)
+        return {"id": candidate["id"], "names": candidate["names"], "scores": scores, "source": source}
+
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="comparison")
+    try:
+        pending = {executor.submit(score, index): index for index in range(len(candidates))}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                rows[pending.pop(future)] = future.result()
+            if on_row:
+                on_row(rows)
+    finally:
+        # Calls not started yet are dropped when the run stops early
+        executor.shutdown(wait=True, cancel_futures=True)
+    return rows
+
+
+def run_comparison_job(payload, job):
+    """Job queue handler: score the candidates, publishing finished rows as progress"""
+    candidates = payload["candidates"]
+
+    def on_row(rows):
+        finished = [row for row in rows if row is not None]
+        job.progress(
+            min(len(finished) / len(candidates), 0.95),
+            f"The Oracle has weighed {len(finished)} of {len(candidates)} candidates...",
+            partial=finished
+        )
+        job.check_cancelled()
+
+    with metrics.timer("comparison_score"):
+        return score_candidates(candidates, payload["personality_type"], payload["titles"],
+                                payload.get("session_id"), on_row=on_row)
+
+
+# "Scored by" label of each row source
+SOURCE_LABELS = {"oracle": "Oracle", "partial": "Oracle (some roles)", "index": "Index"}
+
+
+def comparison_table(rows, titles):
+    """Return a DataFrame with one row per candidate and one score column per role
+
+    Only candidates the Oracle scored for every role are ranked, best average
+    first. The others follow in upload order with no rank: index scores and
+    averages over fewer roles don't compare with full Oracle scores.
+    """
+    records = []
+    for row in rows:
+        scores = [row["scores"].get(title) for title in titles]
+        known = [score for score in scores if score is not None]
+        record = {"Rank": None, "Candidate": ", ".join(row["names"])}
+        record.update(zip(titles, scores))
+        record["Best fit"] = titles[max(range(len(titles)), key=lambda index: scores[index] or 0)]
+        record["Average"] = round(sum(known) / len(known), 1) if known else None
+        record["Scored by"] = SOURCE_LABELS[row["source"]]
+        records.append(record)
+    ranked = sorted((record for record in records if record["Scored by"] == SOURCE_LABELS["oracle"]),
+                    key=lambda record: -record["Average"])
+    for rank, record in enumerate(ranked, 1):
+        record["Rank"] = rank
+    unranked = [record for record in records if record["Rank"] is None]
+    frame = pd.DataFrame.from_records(ranked + unranked,
+                                      columns=["Rank", "Candidate", *titles, "Best fit", "Average", "Scored by"])
+    return frame.astype({"Rank": "Int64"})
+
+
+@singleton
+def comparison_queue():
+    """Job queue that scores comparisons off the script thread"""
+    queue = get_queue()
+    queue.register("comparison", run_comparison_job)
+    return queue
+
+
+def submit_comparison_job(candidates, personality_type, titles):
+    """Queue a comparison job; identical comparisons share one job"""
+    dedup_key = make_cache_key(
+        [candidate["id"] for candidate in candidates], personality_type, recommender.MODEL_NAME,
+        f"{SCORE_PROMPT.key}:{json.dumps(titles)}"
+    )
+    return comparison_queue().submit(
+        "comparison",
+        {"candidates": candidates, "personality_type": personality_type, "titles": titles,
+         "session_id": current_session_id()},
+        dedup_key=dedup_key,
+        session_id=current_session_id()
+    )
+
+
+def back_to_main():
+    """Button callback: return to the main page"""
+    st.session_state.current_page = 'main'
+
+
+def render_table(rows, titles):
+    """Show the sortable comparison table and its CSV download"""
+    frame = comparison_table(rows, titles)
+    st.dataframe(
+        frame,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "Rank": st.column_config.NumberColumn("Rank", format="%d"),
+            **{title: st.column_config.NumberColumn(title, format="%.1f") for title in titles + ["Average"]},
+        }
+    )
+    st.download_button("📥 Download Comparison (CSV)", frame.to_csv(index=False), file_name="oracle-comparison.csv",
+                       mime="text/csv", key="download_comparison")
+
+
+def comparison_page():
+    """Compare several candidates' CVs against the same target roles"""
+    st.button("⬅️ Back to the Oracle", on_click=back_to_main)
+    st.markdown("""
+    <div style="text-align: center; margin-bottom: 2rem;">
+        <h1 style="color: #495057; margin-bottom: 0.5rem;">⚖️ Compare Candidates</h1>
+        <p style="color: #6c757d; font-size: 1.1rem;">Upload several CVs and let the Oracle weigh them for the same roles.</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    titles = st.multiselect("Target roles:", ROLE_TITLES, default=list(DEFAULT_ROLES),
+                            max_selections=COMPARE_MAX_ROLES, key="compare_roles")
+    personality_type = st.selectbox("Personality type of the candidates:", (ANY_PERSONALITY,) + MBTI_TYPES,
+                                    key="compare_personality")
+    uploads = st.file_uploader(f"Candidate CVs (up to {COMPARE_MAX_FILES} PDFs):", type=['pdf'],
+                               accept_multiple_files=True, key="compare_uploader")
+
+    if st.button("⚖️ Compare Candidates", type="primary"):
+        if not uploads or not titles:
+            st.error("Please upload at least one CV and choose at least one role.")
+        elif len(uploads) > COMPARE_MAX_FILES:
+            st.error(f"Please upload at most {COMPARE_MAX_FILES} CVs at a time.")
+        else:
+            groups = read_uploads(uploads)
+            # Each distinct CV is an LLM call, so each one costs a reading
+            if not rate_limited(len(groups)):
+                with st.spinner("📄 Reading the CVs..."):
+                    candidates, rejected = extract_groups(groups)
+                for names, message in rejected:
+                    st.warning(f"{', '.join(names)}: {message}")
+                if candidates:
+                    st.session_state.comparison_job = submit_comparison_job(candidates, personality_type, titles)
+                    st.session_state.comparison_titles = titles
+
+    # Follow the running comparison, showing candidates as they are scored
+    job = None
+    if st.session_state.get('comparison_job'):
+        job = comparison_queue().get(st.session_state.comparison_job)
+        if job is None or job['status'] not in ACTIVE_STATUSES:
+            del st.session_state['comparison_job']
+        if job and job['status'] == DONE:
+            st.session_state.comparison_rows = job['result']
+        elif job and job['status'] == CANCELLED:
+            st.info("The comparison was cancelled.")
+        elif job and job['status'] not in ACTIVE_STATUSES:
+            st.error("The Oracle could not complete the comparison. Please try again.")
+        elif job:
+            st.info(job['message'] or "⚖️ The Oracle is weighing the candidates...")
+            st.progress(job['progress'])
+            if job['partial']:
+                render_table(job['partial'], st.session_state.comparison_titles)
+            st.button("Cancel", key="cancel_comparison_job", on_click=cancel_job,
+                      args=(comparison_queue(), 'comparison_job'))
+
+    if st.session_state.get('comparison_rows') and not (job and job['status'] in ACTIVE_STATUSES):
+        rows = st.session_state.comparison_rows
+        if any(row['source'] == 'index' for row in rows):
+            st.info("✨ Candidates marked \"Index\" were scored from the Oracle's index, on a different "
+                    "scale. They are listed after the ranked candidates, without a rank.")
+        if any(row['source'] == 'partial' for row in rows):
+            st.info("✨ The Oracle skipped some roles for candidates marked \"Oracle (some roles)\". "
+                    "They are listed after the ranked candidates, without a rank.")
+        render_table(rows, st.session_state.comparison_titles)
+
+    # Poll again shortly while the comparison is still running
+    if job and job['status'] in ACTIVE_STATUSES:
+        time.sleep(JOB_POLL_INTERVAL)
+        st.rerun()
@@ -0,0 +1,333 @@
+"""Background job queue for work that must outlive a Streamlit rerun
+
+Jobs are rows in a SQLite file (JOB_QUEUE_PATH) and run on a thread pool.
+The script thread submits a job, stores its id in session state and polls
+it on later runs, so reruns neither interrupt nor repeat the work:
+
+    queue = get_queue()
+    queue.register("recommendations", handler)      # handler(payload, job) -> result
+    job_id = queue.submit("recommendations", payload, dedup_key=key)
+    queue.get(job_id)  # {"status": "running", "progress": 0.4, "partial": [...], ...}
+
+Identical submissions (same dedup_key) share one job, and every session
+that submitted it is attached to it: cancel(job_id, session_id) detaches
+one session and only cancels the job once no other session waits on it.
+Handlers report
+progress and partial results through job.progress() and stop early when
+job.cancelled() turns true. Results are kept for JOB_RESULT_TTL seconds;
+a job whose handler called job.mark_degraded() (a fallback result) is
+never shared with later submissions, so they try again.
+Jobs orphaned by a crashed process are picked up again once their lease
+expires.
+
+    python job_queue.py stats|purge
+"""
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from lazy import singleton
+
+logger = logging.getLogger(__name__)
+
+# Queue configuration
+JOB_QUEUE_PATH = os.getenv(
+    "JOB_QUEUE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "jobs.sqlite3")
+)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", str(24 * 3600)))
+# A running job whose owner hasn't reported for this long is considered orphaned
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+
+class JobCancelled(Exception):
+    """Raised by a handler (or job.check_cancelled()) to stop a cancelled job"""
+
+
+class Job:
+    """Handle passed to a running handler"""
+
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.id = job_id
+
+    def progress(self, fraction, message=None, partial=None):
+        """Record progress in [0, 1], a status message and optional partial results"""
+        self.queue._update(self.id, progress=fraction, message=message, partial=partial)
+
+    def mark_degraded(self, reason="degraded"):
+        """Flag the result as a fallback: it is still returned, but not reused for identical submissions"""
+        self.queue._update(self.id, degraded=reason)
+
+    def cancelled(self):
+        return self.queue._status(self.id) == CANCELLED
+
+    def check_cancelled(self):
+        if self.cancelled():
+            raise JobCancelled(self.id)
+
+
+class JobQueue:
+    """Durable SQLite-backed queue executed by a thread pool"""
+
+    def __init__(self, path=JOB_QUEUE_PATH, workers=JOB_WORKERS, result_ttl=JOB_RESULT_TTL,
+                 lease_seconds=JOB_LEASE_SECONDS):
+        self.path = path
+        self.result_ttl = result_ttl
+        self.lease_seconds = lease_seconds
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handlers = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job-worker")
+        self._local = threading.local()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS jobs (
+                            id TEXT PRIMARY KEY,
+                            kind TEXT NOT NULL,
+                            dedup_key TEXT,
+                            session_id TEXT,
+                            status TEXT NOT NULL,
+                            progress REAL NOT NULL DEFAULT 0,
+                            message TEXT,
+                            payload TEXT NOT NULL,
+                            partial TEXT,
+                            result TEXT,
+                            error TEXT,
+                            degraded TEXT,
+                            owner TEXT,
+                            created_at REAL NOT NULL,
+                            updated_at REAL NOT NULL
+                        )
+                    """)
+                    columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+                    if "degraded" not in columns:
+                        # Queues created before fallback results were flagged
+                        conn.execute("ALTER TABLE jobs ADD COLUMN degraded TEXT")
+                    # Sessions waiting on each job (a shared job has several)
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS job_sessions (
+                            job_id TEXT NOT NULL,
+                            session_id TEXT NOT NULL,
+                            PRIMARY KEY (job_id, session_id)
+                        )
+                    """)
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_dedup ON jobs(kind, dedup_key, status)")
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, updated_at)")
+                    self._initialized = True
+        return conn
+
+    def register(self, kind, handler):
+        """Register handler(payload, job) for a job kind and resume its orphaned jobs"""
+        self._handlers[kind] = handler
+        self.recover(kind)
+
+    def submit(self, kind, payload, dedup_key=None, session_id=None):
+        """Queue a job and return its id (or the id of an identical active/finished job)"""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if dedup_key is not None:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE kind = ? AND dedup_key = ? AND status IN (?, ?, ?) "
+                    "AND degraded IS NULL AND updated_at >= ? ORDER BY created_at DESC LIMIT 1",
+                    (kind, dedup_key, QUEUED, RUNNING, DONE, now - self.result_ttl)
+                ).fetchone()
+                if row is not None:
+                    self._attach(conn, row["id"], session_id)
+                    conn.execute("COMMIT")
+                    metrics.increment("jobs_deduplicated_total", kind=kind)
+                    return row["id"]
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, kind, dedup_key, session_id, status, payload, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, dedup_key, session_id, QUEUED, json.dumps(payload, ensure_ascii=False), now, now)
+            )
+            self._attach(conn, job_id, session_id)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        metrics.increment("jobs_submitted_total", kind=kind)
+        self._executor.submit(self._run, job_id)
+        self._maybe_purge()
+        return job_id
+
+    def get(self, job_id):
+        """Return the job as a dict (payload, partial and result decoded), or None"""
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for field in ("payload", "partial", "result"):
+            job[field] = json.loads(job[field]) if job[field] is not None else None
+        return job
+
+    def _attach(self, conn, job_id, session_id):
+        # Submitters without a session hold the job as "", so a session's cancel can't take it from them
+        conn.execute("INSERT OR IGNORE INTO job_sessions (job_id, session_id) VALUES (?, ?)",
+                     (job_id, session_id or ""))
+
+    def cancel(self, job_id, session_id=None):
+        """Cancel a queued or running job; returns True if it was cancelled
+
+        With session_id, that session stops waiting on the job, which is only
+        cancelled when no other session is attached to it.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if session_id is not None:
+                conn.execute("DELETE FROM job_sessions WHERE job_id = ? AND session_id = ?", (job_id, session_id))
+                if conn.execute("SELECT 1 FROM job_sessions WHERE job_id = ? LIMIT 1", (job_id,)).fetchone():
+                    conn.execute("COMMIT")
+                    metrics.increment("jobs_detached_total")
+                    return False
+            cancelled = conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status IN (?, ?)",
+                (CANCELLED, time.time(), job_id, QUEUED, RUNNING)
+            ).rowcount == 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cancelled
+
+    def recover(self, kind):
+        """Resubmit jobs of kind left queued or running by a process that went away"""
+        now = time.time()
+        rows = self._connect().execute(
+            "SELECT id FROM jobs WHERE kind = ? AND status IN (?, ?) AND updated_at < ?",
+            (kind, QUEUED, RUNNING, now - self.lease_seconds)
+        ).fetchall()
+        for row in rows:
+            self._connect().execute(
+                "UPDATE jobs SET status = ?, owner = NULL, updated_at = ? WHERE id = ? AND status IN (?, ?)",
+                (QUEUED, now, row["id"], QUEUED, RUNNING)
+            )
+            self._executor.submit(self._run, row["id"])
+        return len(rows)
+
+    def stats(self):
+        """Return the number of jobs per status"""
+        rows = self._connect().execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["count"] for row in rows}
+
+    def purge(self):
+        """Delete finished jobs older than the result TTL"""
+        conn = self._connect()
+        purged = conn.execute(
+            "DELETE FROM jobs WHERE status NOT IN (?, ?) AND updated_at < ?",
+            (QUEUED, RUNNING, time.time() - self.result_ttl)
+        ).rowcount
+        conn.execute("DELETE FROM job_sessions WHERE job_id NOT IN (SELECT id FROM jobs)")
+        return purged
+
+    def _maybe_purge(self):
+        now = time.time()
+        if now - self._last_purge > 3600:
+            self._last_purge = now
+            try:
+                self.purge()
+            except sqlite3.Error as e:
+                logger.warning("Job purge failed: %s", e)
+
+    def _status(self, job_id):
+        row = self._connect().execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["status"] if row else None
+
+    def _update(self, job_id, **fields):
+        fields = {name: value for name, value in fields.items() if value is not None}
+        if "partial" in fields:
+            fields["partial"] = json.dumps(fields["partial"], ensure_ascii=False)
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._connect().execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ? AND status = ?",
+            list(fields.values()) + [job_id, RUNNING]
+        )
+
+    def _run(self, job_id):
+        conn = self._connect()
+        # Claim the job; another process (or a duplicate recovery) may have taken it
+        claimed = conn.execute(
+            "UPDATE jobs SET status = ?, owner = ?, updated_at = ? WHERE id = ? AND status = ?",
+            (RUNNING, self.owner, time.time(), job_id, QUEUED)
+        ).rowcount
+        if not claimed:
+            return
+        row = conn.execute("SELECT kind, payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        kind = row["kind"]
+        job = Job(self, job_id)
+        started = time.perf_counter()
+        try:
+            result = self._handlers[kind](json.loads(row["payload"]), job)
+            status, fields = DONE, {"result": json.dumps(result, ensure_ascii=False), "progress": 1.0, "error": None}
+        except JobCancelled:
+            status, fields = CANCELLED, {}
+        except Exception as e:
+            logger.warning("Job %s (%s) failed: %s", job_id, kind, e)
+            status, fields = FAILED, {"error": str(e)}
+        fields.update(status=status, updated_at=time.time())
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        # A job cancelled while running stays cancelled
+        conn.execute(
+            f"UPDATE jobs SET {assignments} WHERE id = ? AND status = ?",
+            list(fields.values()) + [job_id, RUNNING]
+        )
+        metrics.increment("jobs_finished_total", kind=kind, status=status)
+        metrics.observe("job_duration_seconds", time.perf_counter() - started, kind=kind)
+
+
+@singleton
+def get_queue():
+    """Return the process-wide job queue"""
+    queue = JobQueue()
+    metrics.register_collector(lambda: [
+        ("jobs", "gauge", {"status": status}, count) for status, count in queue.stats().items()
+    ])
+    return queue
+
+
+if __name__ == "__main__":
+    # python job_queue.py [stats|purge]
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    queue = JobQueue(workers=1)
+    if command == "purge":
+        print(json.dumps({"purged": queue.purge()}))
+    print(json.dumps(queue.stats(), indent=2))
@@ -0,0 +1,30 @@
+import functools
+import importlib
+import threading
+
+
+def load_attr(module_name, attr_name):
+    """Import a module on first use and return one of its attributes"""
+    return getattr(importlib.import_module(module_name), attr_name)
+
+
+def singleton(factory):
+    """Decorator that builds an object on first call and reuses it afterwards
+
+    Use it for heavy SDK clients (OpenAI, Google Cloud speech/TTS) so that
+    neither the import nor the client construction happens until a page
+    actually needs it.
+    """
+    lock = threading.Lock()
+    instance = []
+
+    @functools.wraps(factory)
+    def get():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    get.is_initialized = lambda: bool(instance)
+    return get
@@ -0,0 +1,492 @@
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+
+import metrics
+from lazy import singleton
+
+# Pool configuration
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8.0"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+
+class FairLimiter:
+    """Concurrency limiter that hands free slots to waiting sessions round-robin
+
+    A session that queues many requests cannot starve other sessions: each
+    released slot goes to the next session in line, not the next request.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.active = 0
+        self._waiters = OrderedDict()
+
+    @property
+    def queued(self):
+        return sum(len(waiters) for waiters in self._waiters.values())
+
+    async def acquire(self, session_id):
+        if self.active < self.capacity and not self._waiters:
+            self.active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(session_id, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            waiters = self._waiters.get(session_id)
+            if waiters and future in waiters:
+                waiters.remove(future)
+                if not waiters:
+                    del self._waiters[session_id]
+            elif future.done() and not future.cancelled():
+                # The slot was handed over just before cancellation
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            session_id, waiters = self._waiters.popitem(last=False)
+            future = waiters.popleft()
+            if waiters:
+                self._waiters[session_id] = waiters
+            if not future.done():
+                # Hand the slot over directly; active count stays the same
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+def _is_retryable(error):
+    import openai
+
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+class DeadlineExceeded(TimeoutError):
+    """A blocking call gave up waiting on the pool (the upstream call is cancelled)"""
+
+
+def is_upstream_error(error):
+    """True for errors that say the LLM backend is down or overloaded, not that the request was bad"""
+    if isinstance(error, (DeadlineExceeded, asyncio.TimeoutError, concurrent.futures.TimeoutError)):
+        return True
+    return _is_retryable(error)
+
+
+def _field(value, name):
+    # Older SDKs keep fields they don't know about (such as the usage of a
+    # streamed chunk) as plain dicts
+    if isinstance(value, dict):
+        return value.get(name)
+    return getattr(value, name, None)
+
+
+def usage_tokens(usage):
+    """Return (prompt, cached prompt, completion) tokens of a reported usage"""
+    return (
+        _field(usage, "prompt_tokens") or 0,
+        _field(_field(usage, "prompt_tokens_details"), "cached_tokens") or 0,
+        _field(usage, "completion_tokens") or 0,
+    )
+
+
+def _record_usage(usage, model):
+    # Token usage as reported by the API (streams only report it when asked to)
+    if usage is None:
+        return
+    prompt_tokens, cached_tokens, completion_tokens = usage_tokens(usage)
+    metrics.increment("llm_tokens_total", prompt_tokens, model=model, type="prompt")
+    metrics.increment("llm_tokens_total", cached_tokens, model=model, type="cached_prompt")
+    metrics.increment("llm_tokens_total", completion_tokens, model=model, type="completion")
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMPool:
+    """Shared async OpenAI client with bounded concurrency
+
+    Runs one event loop on a background thread for the whole process, so the
+    HTTP connection pool is shared by every Streamlit session. Synchronous
+    callers use complete() and stream(); identical in-flight completions are
+    coalesced into a single upstream call.
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, max_retries=LLM_MAX_RETRIES,
+                 backoff_base=LLM_BACKOFF_BASE, backoff_max=LLM_BACKOFF_MAX, timeout=LLM_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self._loop = None
+        self._client = None
+        self._limiter = None
+        self._inflight = {}
+        self._start_lock = threading.Lock()
+        self.counters = {"requests": 0, "upstream_calls": 0, "coalesced": 0, "retries": 0, "errors": 0, "hedges": 0}
+
+    def _ensure_loop(self):
+        if self._loop is None:
+            with self._start_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    ready = threading.Event()
+
+                    def run():
+                        # The SDK is imported here so that importing this module stays cheap
+                        import httpx
+                        import openai
+
+                        asyncio.set_event_loop(loop)
+                        self._client = openai.AsyncOpenAI(
+                            api_key=os.getenv("OPENAI_API_KEY"),
+                            base_url=os.getenv("OPENAI_BASE_URL") or None,
+                            max_retries=0,
+                            timeout=self.timeout,
+                            http_client=httpx.AsyncClient(
+                                timeout=self.timeout,
+                                limits=httpx.Limits(
+                                    max_connections=LLM_MAX_CONNECTIONS,
+                                    max_keepalive_connections=LLM_MAX_CONNECTIONS
+                                )
+                            )
+                        )
+                        self._limiter = FairLimiter(self.max_concurrency)
+                        ready.set()
+                        loop.run_forever()
+
+                    threading.Thread(target=run, name="llm-pool", daemon=True).start()
+                    ready.wait()
+                    self._loop = loop
+        return self._loop
+
+    async def _backoff(self, attempt, error):
+        delay = _retry_after(error)
+        if delay is None:
+            # Full jitter exponential backoff
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        self.counters["retries"] += 1
+        await asyncio.sleep(delay)
+
+    async def _create(self, session_id, params):
+        await self._limiter.acquire(session_id)
+        try:
+            attempt = 0
+            while True:
+                try:
+                    self.counters["upstream_calls"] += 1
+                    with metrics.timer("llm_call", model=params.get("model", "")):
+                        response = await self._client.chat.completions.create(**params)
+                    _record_usage(getattr(response, "usage", None), params.get("model", ""))
+                    return response
+                except Exception as error:
+                    metrics.increment("llm_errors_total", type=type(error).__name__)
+                    if attempt >= self.max_retries or not _is_retryable(error):
+                        self.counters["errors"] += 1
+                        raise
+                    await self._backoff(attempt, error)
+                    attempt += 1
+        finally:
+            self._limiter.release()
+
+    async def acomplete(self, messages, session_id=None, **params):
+        """Run a chat completion, sharing the call with identical in-flight requests"""
+        self.counters["requests"] += 1
+        params = dict(params, messages=messages)
+        key = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+        # [shared call, callers still waiting for it]
+        entry = self._inflight.get(key)
+        if entry is not None:
+            self.counters["coalesced"] += 1
+        else:
+            entry = self._inflight[key] = [asyncio.ensure_future(self._create(session_id, params)), 0]
+            entry[0].add_done_callback(lambda _: self._forget(key, entry))
+        task = entry[0]
+        entry[1] += 1
+        try:
+            # Shielded so one caller giving up doesn't cancel the call for the others
+            return await asyncio.shield(task)
+        finally:
+            entry[1] -= 1
+            if not entry[1] and not task.done():
+                # The last caller gave up: stop the upstream call and free its slot
+                self._forget(key, entry)
+                task.cancel()
+
+    def _forget(self, key, entry):
+        # A cancelled call stays in flight until it unwinds; later requests start a new one
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
+
+    async def astream(self, messages, session_id=None, on_usage=None, **params):
+        """Yield content deltas of a streamed chat completion
+
+        on_usage(usage) is called with the token usage the API reports at the end.
+        """
+        self.counters["requests"] += 1
+        async for delta in self._stream(session_id, messages, params, on_usage):
+            yield delta
+
+    async def _stream(self, session_id, messages, params, on_usage=None):
+        extra_body = dict(params.pop("extra_body", None) or {}, stream_options={"include_usage": True})
+        params = dict(params, messages=messages, stream=True, extra_body=extra_body)
+        model = params.get("model", "")
+        await self._limiter.acquire(session_id)
+        try:
+            attempt = 0
+            while True:
+                started = False
+                try:
+                    self.counters["upstream_calls"] += 1
+                    with metrics.timer("llm_call", model=model):
+                        call_started = time.perf_counter()
+                        stream = await self._client.chat.completions.create(**params)
+                        async for chunk in stream:
+                            if getattr(chunk, "usage", None) is not None:
+                                _record_usage(chunk.usage, model)
+                                if on_usage:
+                                    on_usage(chunk.usage)
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                if not started:
+                                    started = True
+                                    metrics.observe("llm_time_to_first_token_seconds",
+                                                    time.perf_counter() - call_started, model=model)
+                                yield chunk.choices[0].delta.content
+                    return
+                except Exception as error:
+                    metrics.increment("llm_errors_total", type=type(error).__name__)
+                    # Partial output cannot be replayed, so only retry before the first delta
+                    if started or attempt >= self.max_retries or not _is_retryable(error):
+                        self.counters["errors"] += 1
+                        raise
+                    await self._backoff(attempt, error)
+                    attempt += 1
+        finally:
+            self._limiter.release()
+
+    async def arace(self, messages, candidates, delay, session_id=None, on_launch=None):
+        """Run a hedged completion and return (index, response) of the first call to succeed
+
+        candidates is a list of request params. The first is called at once;
+        each next one only when no call has succeeded within delay seconds
+        (or a call failed). Calls still running when one succeeds are
+        cancelled. Hedged calls are never coalesced with other requests.
+        """
+        self.counters["requests"] += 1
+        pending = {}
+        launched = 0
+        error = None
+
+        def launch():
+            nonlocal launched
+            if launched:
+                self.counters["hedges"] += 1
+            task = asyncio.ensure_future(self._create(session_id, dict(candidates[launched], messages=messages)))
+            pending[task] = launched
+            if on_launch:
+                on_launch(launched)
+            launched += 1
+
+        try:
+            launch()
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, timeout=delay if launched < len(candidates) else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    index = pending.pop(task)
+                    if task.exception() is None:
+                        return index, task.result()
+                    error = task.exception()
+                if launched < len(candidates):
+                    launch()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def arace_stream(self, messages, candidates, delay, session_id=None, on_launch=None, on_usage=None):
+        """Streamed arace(): yield (index, delta), the first call to produce a delta wins"""
+        self.counters["requests"] += 1
+        streams = []
+        pending = {}
+        error = None
+        winner = None
+
+        def launch():
+            index = len(streams)
+            if index:
+                self.counters["hedges"] += 1
+            streams.append(self._stream(session_id, messages, dict(candidates[index]), on_usage))
+            pending[asyncio.ensure_future(streams[index].__anext__())] = index
+            if on_launch:
+                on_launch(index)
+
+        try:
+            launch()
+            while pending and winner is None:
+                done, _ = await asyncio.wait(
+                    pending, timeout=delay if len(streams) < len(candidates) else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    index = pending.pop(task)
+                    if isinstance(task.exception(), StopAsyncIteration):
+                        # An empty completion still answers the request
+                        return
+                    if task.exception() is None:
+                        winner, first = index, task.result()
+                        break
+                    error = task.exception()
+                if winner is None and len(streams) < len(candidates):
+                    launch()
+            if winner is None:
+                raise error
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            pending.clear()
+            yield winner, first
+            async for delta in streams[winner]:
+                yield winner, delta
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for stream in streams:
+                await stream.aclose()
+
+    async def _open_connections(self, connections):
+        import openai
+
+        # Listing models costs no tokens; any HTTP answer, even an error status, leaves a pooled connection
+        results = await asyncio.gather(
+            *(self._client.models.list() for _ in range(connections)), return_exceptions=True
+        )
+        return sum(not isinstance(result, openai.APIConnectionError) for result in results)
+
+    def connect(self, connections=2, deadline=None):
+        """Open up to connections pooled HTTP connections before the first request; returns how many opened"""
+        return self._wait(self._open_connections(connections), deadline)
+
+    def complete(self, messages, session_id=None, deadline=None, **params):
+        """Blocking wrapper around acomplete() for script threads
+
+        With a deadline (seconds, including queueing and retries) the call is
+        cancelled and DeadlineExceeded raised once it runs out.
+        """
+        return self._wait(self.acomplete(messages, session_id, **params), deadline)
+
+    def race(self, messages, candidates, delay, session_id=None, on_launch=None, deadline=None):
+        """Blocking wrapper around arace() for script threads"""
+        return self._wait(self.arace(messages, candidates, delay, session_id, on_launch), deadline)
+
+    def stream(self, messages, session_id=None, on_usage=None, deadline=None, first_deadline=None, **params):
+        """Blocking generator around astream() for script threads
+
+        With a deadline, DeadlineExceeded is raised when the first delta, or
+        any next one, takes longer than that. first_deadline, when given,
+        replaces it for the first delta (for a caller that already spent part
+        of it waiting).
+        """
+        return self._iterate(self.astream(messages, session_id, on_usage, **params), deadline, first_deadline)
+
+    def race_stream(self, messages, candidates, delay, session_id=None, on_launch=None, on_usage=None,
+                    deadline=None, first_deadline=None):
+        """Blocking generator around arace_stream() for script threads"""
+        return self._iterate(
+            self.arace_stream(messages, candidates, delay, session_id, on_launch, on_usage), deadline,
+            first_deadline
+        )
+
+    def _wait(self, coroutine, deadline=None):
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+        try:
+            return future.result(timeout=deadline)
+        except concurrent.futures.TimeoutError:
+            if future.done():
+                # The call itself timed out
+                raise
+            metrics.increment("llm_deadline_exceeded_total")
+            raise DeadlineExceeded(f"LLM call exceeded its {deadline:g}s deadline") from None
+        finally:
+            future.cancel()
+
+    def _iterate(self, generator, deadline=None, first_deadline=None):
+        loop = self._ensure_loop()
+        items = queue.Queue()
+
+        async def pump():
+            try:
+                async for item in generator:
+                    items.put(("item", item))
+                items.put(("done", None))
+            except BaseException as error:
+                items.put(("error", error))
+                raise
+
+        future = asyncio.run_coroutine_threadsafe(pump(), loop)
+        timeout = deadline if first_deadline is None else first_deadline
+        try:
+            while True:
+                try:
+                    kind, value = items.get(timeout=timeout)
+                except queue.Empty:
+                    metrics.increment("llm_deadline_exceeded_total")
+                    raise DeadlineExceeded(f"LLM stream stalled for its {timeout:g}s deadline") from None
+                timeout = deadline
+                if kind == "done":
+                    return
+                if kind == "error":
+                    raise value
+                yield value
+        finally:
+            # Stops the upstream stream if the caller gives up early
+            future.cancel()
+
+    def stats(self):
+        """Return pool counters and current load"""
+        stats = dict(self.counters)
+        stats["in_flight"] = self._limiter.active if self._limiter else 0
+        stats["queued"] = self._limiter.queued if self._limiter else 0
+        return stats
+
+
+@singleton
+def get_pool():
+    """Return the process-wide LLM pool"""
+    pool = LLMPool()
+    metrics.register_collector(lambda: [
+        ("llm_pool_in_flight", "gauge", {}, pool.stats()["in_flight"]),
+        ("llm_pool_queued", "gauge", {}, pool.stats()["queued"]),
+    ] + [
+        (f"llm_pool_{name}_total", "counter", {}, value) for name, value in pool.counters.items()
+    ])
+    return pool
@@ -0,0 +1,212 @@
+import bisect
+import contextlib
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Metrics configuration (ORACLE_METRICS=1 turns recording and /metrics on)
+ENABLED = os.getenv("ORACLE_METRICS", "0") == "1"
+# /healthz and /readyz are served on the same port either way; ORACLE_PROBES=0 turns them off
+PROBES = os.getenv("ORACLE_PROBES", "1") == "1"
+# Loopback only unless ORACLE_METRICS_HOST opts in, e.g. 0.0.0.0 for a scraper or load balancer on another host
+METRICS_HOST = os.getenv("ORACLE_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("ORACLE_METRICS_PORT", "9464"))
+PREFIX = "oracle_"
+
+# Latency buckets in seconds, from a cached page rerun up to a slow LLM call
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_histograms = {}
+_collectors = []
+_readiness_checks = []
+_server = None
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def increment(name, amount=1, **labels):
+    """Add amount to a process-wide counter"""
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[_key(name, labels)] += amount
+
+
+def counter_value(name, **labels):
+    """Return the current value of a counter"""
+    with _lock:
+        return _counters.get(_key(name, labels), 0)
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    """Record value in a histogram"""
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": buckets, "counts": [0] * (len(buckets) + 1), "sum": 0.0}
+        histogram["counts"][bisect.bisect_left(histogram["buckets"], value)] += 1
+        histogram["sum"] += value
+
+
+@contextlib.contextmanager
+def timer(stage, **labels):
+    """Time a block as oracle_stage_duration_seconds{stage=...}"""
+    if not ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("stage_duration_seconds", time.perf_counter() - started, stage=stage, **labels)
+
+
+def register_collector(collect):
+    """Register a callable returning [(name, type, labels, value)] read at export time"""
+    with _lock:
+        _collectors.append(collect)
+
+
+def register_readiness_check(check):
+    """Register a callable returning True once the process is ready to serve (see /readyz)"""
+    with _lock:
+        _readiness_checks.append(check)
+
+
+def is_ready():
+    """True when every readiness check passes"""
+    with _lock:
+        checks = list(_readiness_checks)
+    return all(check() for check in checks)
+
+
+def snapshot():
+    """Return {(name, labels): value} for every counter"""
+    with _lock:
+        return dict(_counters)
+
+
+def reset():
+    """Clear all counters and histograms"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def render_prometheus():
+    """Render all metrics in the Prometheus text exposition format"""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: {"buckets": h["buckets"], "counts": list(h["counts"]), "sum": h["sum"]}
+                      for key, h in _histograms.items()}
+        collectors = list(_collectors)
+
+    lines = []
+    typed = set()
+
+    def declare(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in sorted(counters.items()):
+        metric = PREFIX + name
+        declare(metric, "counter")
+        lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+    for (name, labels), histogram in sorted(histograms.items()):
+        metric = PREFIX + name
+        declare(metric, "histogram")
+        cumulative = 0
+        bounds = list(histogram["buckets"]) + [float("inf")]
+        for bound, count in zip(bounds, histogram["counts"]):
+            cumulative += count
+            lines.append(f"{metric}_bucket{_format_labels(labels, [('le', _format_bound(bound))])} {cumulative}")
+        lines.append(f"{metric}_sum{_format_labels(labels)} {histogram['sum']}")
+        lines.append(f"{metric}_count{_format_labels(labels)} {cumulative}")
+
+    for collect in collectors:
+        try:
+            samples = collect()
+        except Exception as e:
+            logger.warning("Metrics collector failed: %s", e)
+            continue
+        for name, kind, labels, value in samples:
+            metric = PREFIX + name
+            declare(metric, kind)
+            lines.append(f"{metric}{_format_labels(sorted(labels.items()))} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/metrics" and ENABLED:
+            self._send(200, render_prometheus(), "text/plain; version=0.0.4; charset=utf-8")
+        elif path == "/healthz":
+            # Liveness: the process is up and serving
+            self._send(200, "ok\n")
+        elif path == "/readyz":
+            if is_ready():
+                self._send(200, "ready\n")
+            else:
+                self._send(503, "not ready\n")
+        else:
+            self.send_error(404)
+
+    def _send(self, status, text, content_type="text/plain; charset=utf-8"):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Serve /healthz, /readyz and (when enabled) /metrics on a background thread, once per process"""
+    global _server
+    if not (ENABLED or PROBES) or _server is not None:
+        return _server or None
+    with _lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                # Another worker process on this host already owns the port; don't retry every run
+                logger.warning("Metrics endpoint not started on %s:%s: %s", host, port, e)
+                _server = False
+                return None
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
@@ -0,0 +1,415 @@
+"""Per-request model routing with latency tracking and hedged requests
+
+ORACLE_MODELS lists the models a recommendation may go to, as JSON inline or
+in a file. Costs are USD per million tokens (cached_input_cost, for prompt
+tokens served from the provider's prompt cache, defaults to input_cost); a
+model only takes CVs whose prompt excerpt is within [min_cv_tokens, max_cv_tokens]:
+
+    ORACLE_MODELS='[{"name": "gpt-4o-mini", "input_cost": 0.15, "output_cost": 0.6},
+                    {"name": "gpt-4o", "input_cost": 2.5, "output_cost": 10, "min_cv_tokens": 250}]'
+
+Each request goes to the cheapest eligible model. With a latency SLO
+(ORACLE_LATENCY_SLO seconds) a model whose recent p95 misses the SLO is
+skipped for the next cheapest one, and when none meets it the fastest one
+is used. Latencies age out of the window (ORACLE_ROUTER_WINDOW), so a
+skipped model is tried again later.
+
+With ORACLE_HEDGE=1 a second request (to the model's hedge_model, by
+default the same model) starts when the first hasn't answered by the
+model's recent p95 (its time to first token when streaming), and the
+first to answer wins. Until a model has ORACLE_ROUTER_MIN_SAMPLES
+samples ORACLE_HEDGE_DELAY is used as that deadline.
+
+Every call has a deadline (ORACLE_LLM_DEADLINE seconds, including queueing,
+retries and hedges; for a stream, the longest wait for a delta) and goes
+through the circuit breaker of the backend (see circuit_breaker.py), which
+raises CircuitOpenError instead of calling a backend that keeps failing.
+It then waits for the shared upstream budget (see rate_limit.py): one
+request and the prompt plus max_tokens, settled with the reported usage.
+That wait counts against the deadline too.
+
+    python model_router.py     # print the configured models
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import metrics
+from circuit_breaker import get_breaker
+from cv_compaction import count_tokens
+from lazy import singleton
+from llm_pool import get_pool, usage_tokens
+from rate_limit import get_limiter
+
+logger = logging.getLogger(__name__)
+
+# Router configuration
+ORACLE_MODELS = os.getenv("ORACLE_MODELS", "")
+LATENCY_SLO = float(os.getenv("ORACLE_LATENCY_SLO", "0"))
+HEDGE = os.getenv("ORACLE_HEDGE", "0") == "1"
+HEDGE_DELAY = float(os.getenv("ORACLE_HEDGE_DELAY", "10"))
+HEDGE_PERCENTILE = float(os.getenv("ORACLE_HEDGE_PERCENTILE", "95"))
+ROUTER_WINDOW_SECONDS = int(os.getenv("ORACLE_ROUTER_WINDOW", "600"))
+ROUTER_MIN_SAMPLES = int(os.getenv("ORACLE_ROUTER_MIN_SAMPLES", "20"))
+LLM_DEADLINE = float(os.getenv("ORACLE_LLM_DEADLINE", "20"))
+
+# Used when ORACLE_MODELS is empty: today's single model
+DEFAULT_MODELS = [{"name": "gpt-4o-mini", "input_cost": 0.15, "output_cost": 0.6}]
+
+TOTAL = "total"
+FIRST_TOKEN = "first_token"
+
+
+class ModelSpec:
+    """One routable model and its prices"""
+
+    FIELDS = ("name", "input_cost", "cached_input_cost", "output_cost", "max_tokens", "min_cv_tokens",
+              "max_cv_tokens", "hedge_model")
+
+    def __init__(self, name, input_cost=0.0, output_cost=0.0, max_tokens=800, min_cv_tokens=0,
+                 max_cv_tokens=None, hedge_model=None, cached_input_cost=None):
+        self.name = name
+        self.input_cost = float(input_cost)
+        self.cached_input_cost = self.input_cost if cached_input_cost is None else float(cached_input_cost)
+        self.output_cost = float(output_cost)
+        self.max_tokens = int(max_tokens)
+        self.min_cv_tokens = int(min_cv_tokens)
+        self.max_cv_tokens = None if max_cv_tokens is None else int(max_cv_tokens)
+        self.hedge_model = hedge_model or name
+
+    @classmethod
+    def from_config(cls, entry):
+        unknown = set(entry) - set(cls.FIELDS)
+        if unknown or "name" not in entry:
+            raise ValueError(f"Invalid model entry {entry!r}: needs 'name', allows {', '.join(cls.FIELDS)}")
+        return cls(**entry)
+
+    def accepts(self, cv_tokens):
+        return cv_tokens >= self.min_cv_tokens and (self.max_cv_tokens is None or cv_tokens <= self.max_cv_tokens)
+
+    def cost(self, prompt_tokens, completion_tokens, cached_tokens=0):
+        """Return the USD cost of a call; cached_tokens are part of prompt_tokens"""
+        return ((prompt_tokens - cached_tokens) * self.input_cost + cached_tokens * self.cached_input_cost
+                + completion_tokens * self.output_cost) / 1_000_000
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+def load_models(config=ORACLE_MODELS):
+    """Parse a model list from JSON text or a JSON file path"""
+    if not config.strip():
+        entries = DEFAULT_MODELS
+    elif config.lstrip().startswith("["):
+        entries = json.loads(config)
+    else:
+        with open(config, encoding="utf-8") as models_file:
+            entries = json.load(models_file)
+    models = [ModelSpec.from_config(entry) for entry in entries]
+    if not models:
+        raise ValueError("ORACLE_MODELS lists no models")
+    return models
+
+
+class ModelStats:
+    """Recent latencies plus call, token and cost totals for one model"""
+
+    def __init__(self, window_seconds=ROUTER_WINDOW_SECONDS, max_samples=1000):
+        self.window_seconds = window_seconds
+        self.latencies = {TOTAL: deque(maxlen=max_samples), FIRST_TOKEN: deque(maxlen=max_samples)}
+        self.calls = 0
+        self.wins = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, kind, seconds):
+        with self._lock:
+            self.latencies[kind].append((time.monotonic(), seconds))
+
+    def charge(self, prompt_tokens, completion_tokens, cached_tokens, cost):
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+            self.completion_tokens += completion_tokens
+            self.cost += cost
+
+    def percentile(self, q, kind=TOTAL, min_samples=ROUTER_MIN_SAMPLES):
+        """Return the q-th percentile latency of the window, or None with too few samples"""
+        with self._lock:
+            samples = self.latencies[kind]
+            cutoff = time.monotonic() - self.window_seconds
+            while samples and samples[0][0] < cutoff:
+                samples.popleft()
+            values = sorted(seconds for _, seconds in samples)
+        if not values or len(values) < min_samples:
+            return None
+        return values[min(len(values) - 1, int(len(values) * q / 100))]
+
+
+class Route:
+    """The model chosen for a request, why, and the model to hedge to (or None)"""
+
+    def __init__(self, model, reason, hedge=None):
+        self.model = model
+        self.reason = reason
+        self.hedge = hedge
+
+    def __repr__(self):
+        return f"Route({self.model.name!r}, {self.reason!r}, hedge={self.hedge and self.hedge.name!r})"
+
+
+class ModelRouter:
+    """Chooses a model per request and runs the (optionally hedged) call on the LLM pool"""
+
+    def __init__(self, models, latency_slo=LATENCY_SLO, hedge=HEDGE, hedge_delay=HEDGE_DELAY,
+                 hedge_percentile=HEDGE_PERCENTILE, window_seconds=ROUTER_WINDOW_SECONDS,
+                 min_samples=ROUTER_MIN_SAMPLES, deadline=LLM_DEADLINE, breaker=None, limiter=None, pool=None):
+        self.models = list(models)
+        self.by_name = {model.name: model for model in self.models}
+        self.latency_slo = latency_slo
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.deadline = deadline or None
+        self.breaker = breaker
+        self.limiter = limiter
+        self.pool = pool
+        self.model_stats = {model.name: ModelStats(window_seconds) for model in self.models}
+
+    def _pool(self):
+        return self.pool or get_pool()
+
+    def p95(self, model, kind=TOTAL):
+        return self.model_stats[model.name].percentile(95, kind, self.min_samples)
+
+    def route(self, cv_tokens, prompt_tokens=0):
+        """Pick a model for a CV excerpt of cv_tokens tokens"""
+        eligible = [model for model in self.models if model.accepts(cv_tokens)] or self.models
+        by_cost = sorted(eligible, key=lambda model: model.cost(prompt_tokens, model.max_tokens))
+        model, reason = by_cost[0], "cheapest"
+        if self.latency_slo:
+            for candidate in by_cost:
+                p95 = self.p95(candidate)
+                # Models without enough recent samples get the benefit of the doubt
+                if p95 is None or p95 <= self.latency_slo:
+                    model = candidate
+                    reason = "cheapest" if candidate is by_cost[0] else "slo"
+                    break
+            else:
+                model = min(by_cost, key=lambda candidate: self.p95(candidate))
+                reason = "fastest"
+        hedge = self.by_name.get(model.hedge_model, model) if self.hedge else None
+        metrics.increment("router_requests_total", model=model.name, reason=reason)
+        return Route(model, reason, hedge)
+
+    def _hedge_delay(self, model, kind):
+        latency = self.model_stats[model.name].percentile(self.hedge_percentile, kind, self.min_samples)
+        return self.hedge_delay if latency is None else latency
+
+    def _candidates(self, route, params):
+        models = [route.model] + ([route.hedge] if route.hedge else [])
+        return models, [dict(params, model=model.name, max_tokens=model.max_tokens) for model in models]
+
+    def _launch_recorder(self, models, prompt_tokens):
+        started = {}
+
+        def on_launch(index):
+            started[index] = time.perf_counter()
+            self.model_stats[models[index].name].calls += 1
+            # Every launched call pays for its prompt, including a hedge that loses
+            self._charge(models[index], prompt_tokens, 0)
+            if index:
+                metrics.increment("router_hedges_total", model=models[index].name)
+                if self.limiter:
+                    # Hedges don't wait for the budget, but they spend it
+                    self.limiter.charge(1, prompt_tokens + models[index].max_tokens)
+
+        return started, on_launch
+
+    def _record_win(self, models, started, winner, kind):
+        now = time.perf_counter()
+        for index, launched_at in started.items():
+            # A losing call took at least this long; keeping it keeps the tail honest
+            self.model_stats[models[index].name].observe(kind, now - launched_at)
+        self.model_stats[models[winner].name].wins += 1
+        if winner:
+            metrics.increment("router_hedge_wins_total", model=models[winner].name)
+
+    def _charge(self, model, prompt_tokens, completion_tokens, cached_tokens=0):
+        cost = model.cost(prompt_tokens, completion_tokens, cached_tokens)
+        self.model_stats[model.name].charge(prompt_tokens, completion_tokens, cached_tokens, cost)
+        metrics.increment("llm_cost_usd_total", cost, model=model.name)
+
+    def _settle(self, model, estimated_prompt_tokens, usage, content):
+        # Replace the prompt estimate charged at launch with the reported usage
+        if usage is None:
+            prompt_tokens, cached_tokens, completion_tokens = estimated_prompt_tokens, 0, count_tokens(content)
+        else:
+            prompt_tokens, cached_tokens, completion_tokens = usage_tokens(usage)
+        self._charge(model, prompt_tokens - estimated_prompt_tokens, completion_tokens, cached_tokens)
+        if self.limiter:
+            # The budget was taken for max_tokens; give back what the answer didn't use
+            self.limiter.charge(tokens=prompt_tokens + completion_tokens - estimated_prompt_tokens - model.max_tokens)
+
+    def _admit(self, route, prompt_tokens, session_id):
+        # After the breaker, so an open circuit fails fast instead of queueing for budget.
+        # The wait for budget comes out of the call's deadline; returns what is left of it
+        if self.breaker:
+            self.breaker.before()
+        started = time.monotonic()
+        if self.limiter:
+            max_wait = self.limiter.max_wait if self.deadline is None else min(self.limiter.max_wait, self.deadline)
+            try:
+                self.limiter.acquire(prompt_tokens + route.model.max_tokens, session_id, max_wait=max_wait)
+            except BaseException:
+                if self.breaker:
+                    self.breaker.release()
+                raise
+        if self.deadline is None:
+            return None
+        return max(self.deadline - (time.monotonic() - started), 0.001)
+
+    def _record_error(self, models, started, error):
+        for index in started:
+            self.model_stats[models[index].name].errors += 1
+        if self.breaker:
+            self.breaker.failure(error)
+
+    def complete(self, messages, route, params, session_id=None, prompt_tokens=None, on_usage=None):
+        """Run a completion on the routed model; returns the response
+
+        prompt_tokens is the caller's token estimate of messages (counted
+        here when not given); on_usage(usage) receives the reported usage.
+        """
+        models, candidates = self._candidates(route, params)
+        if prompt_tokens is None:
+            prompt_tokens = sum(count_tokens(message["content"]) for message in messages)
+        started, on_launch = self._launch_recorder(models, prompt_tokens)
+        deadline = self._admit(route, prompt_tokens, session_id)
+        try:
+            if len(candidates) == 1:
+                # Unhedged calls go through complete() so identical requests are coalesced
+                on_launch(0)
+                response = self._pool().complete(
+                    messages, session_id=session_id, deadline=deadline, **candidates[0]
+                )
+                winner = 0
+            else:
+                winner, response = self._pool().race(
+                    messages, candidates, self._hedge_delay(route.model, TOTAL), session_id, on_launch, deadline
+                )
+        except Exception as error:
+            self._record_error(models, started, error)
+            raise
+        except BaseException:
+            if self.breaker:
+                self.breaker.release()
+            raise
+        if self.breaker:
+            self.breaker.success()
+        self._record_win(models, started, winner, TOTAL)
+        usage = getattr(response, "usage", None)
+        self._settle(models[winner], prompt_tokens, usage, response.choices[0].message.content or "")
+        if usage is not None and on_usage:
+            on_usage(usage)
+        return response
+
+    def stream(self, messages, route, params, session_id=None, prompt_tokens=None, on_usage=None):
+        """Yield content deltas from the routed model, racing on the first delta when hedged"""
+        models, candidates = self._candidates(route, params)
+        if prompt_tokens is None:
+            prompt_tokens = sum(count_tokens(message["content"]) for message in messages)
+        started, on_launch = self._launch_recorder(models, prompt_tokens)
+        # Only the winning call runs to the end, so the reported usage is its own
+        usage = []
+        first_deadline = self._admit(route, prompt_tokens, session_id)
+        if len(candidates) == 1:
+            on_launch(0)
+            deltas = ((0, delta) for delta in self._pool().stream(
+                messages, session_id=session_id, on_usage=usage.append, deadline=self.deadline,
+                first_deadline=first_deadline, **candidates[0]
+            ))
+        else:
+            deltas = self._pool().race_stream(
+                messages, candidates, self._hedge_delay(route.model, FIRST_TOKEN), session_id, on_launch,
+                usage.append, self.deadline, first_deadline
+            )
+        winner = None
+        content = []
+        settled = False
+        try:
+            for index, delta in deltas:
+                if winner is None:
+                    winner = index
+                    self._record_win(models, started, winner, FIRST_TOKEN)
+                content.append(delta)
+                yield delta
+            settled = True
+            if self.breaker:
+                self.breaker.success()
+        except Exception as error:
+            settled = True
+            self._record_error(models, started, error)
+            raise
+        finally:
+            if self.breaker and not settled:
+                # The caller stopped reading; the backend was answering if a delta arrived
+                if winner is None:
+                    self.breaker.release()
+                else:
+                    self.breaker.success()
+            deltas.close()
+            if winner is not None:
+                self.model_stats[models[winner].name].observe(TOTAL, time.perf_counter() - started[winner])
+                self._settle(models[winner], prompt_tokens, usage[0] if usage else None, "".join(content))
+                if usage and on_usage:
+                    on_usage(usage[0])
+
+    def stats(self):
+        """Return per-model calls, wins, errors, tokens, cost and p95 latencies"""
+        report = {}
+        for model in self.models:
+            stats = self.model_stats[model.name]
+            report[model.name] = {
+                "calls": stats.calls,
+                "wins": stats.wins,
+                "errors": stats.errors,
+                "prompt_tokens": stats.prompt_tokens,
+                "cached_prompt_tokens": stats.cached_tokens,
+                "completion_tokens": stats.completion_tokens,
+                "cost_usd": round(stats.cost, 6),
+                "p95_seconds": stats.percentile(95, TOTAL, 1),
+                "p95_first_token_seconds": stats.percentile(95, FIRST_TOKEN, 1),
+            }
+        return report
+
+
+@singleton
+def get_router():
+    """Return the process-wide router built from ORACLE_MODELS"""
+    router = ModelRouter(load_models(), breaker=get_breaker(), limiter=get_limiter())
+    metrics.register_collector(lambda: [
+        ("router_latency_p95_seconds", "gauge", {"model": name, "kind": kind}, value)
+        for name, stats in router.stats().items()
+        for kind, value in ((TOTAL, stats["p95_seconds"]), (FIRST_TOKEN, stats["p95_first_token_seconds"]))
+        if value is not None
+    ])
+    return router
+
+
+if __name__ == "__main__":
+    print(json.dumps({
+        "models": [model.as_dict() for model in load_models()],
+        "latency_slo": LATENCY_SLO,
+        "hedge": HEDGE,
+        "hedge_delay": HEDGE_DELAY,
+        "deadline": LLM_DEADLINE,
+    }, indent=2))
@@ -0,0 +1,43 @@
+"""Helpers shared by the pages that run their work in the job queue
+
+The main page (recommendations) and the comparison page submit jobs under
+the caller's durable session id, take readings from its rate limits before
+doing so, poll the job while it runs and let the caller stop waiting on it.
+"""
+import math
+import os
+
+import streamlit as st
+
+from rate_limit import RateLimited, check_session
+
+# Seconds between polls of a running job
+JOB_POLL_INTERVAL = float(os.getenv("ORACLE_JOB_POLL_INTERVAL", "0.5"))
+
+
+def current_session_id():
+    """Return the durable session id (see app.start_session) that jobs attach to and LLM calls are scheduled by
+
+    Unlike the Streamlit runtime's session id it survives reconnects and
+    restarts, so a reloaded page can still cancel the jobs it waits on.
+    """
+    return st.session_state.get('_session_id')
+
+
+def rate_limited(readings=1):
+    """Take readings from the caller's rate limits; False, or warn and return True when over them"""
+    try:
+        check_session(current_session_id(), readings)
+    except RateLimited as e:
+        st.warning(f"🌙 The Oracle needs a moment to gather its strength. Please ask again in "
+                   f"{max(1, math.ceil(e.retry_after))} seconds.")
+        return True
+    return False
+
+
+def cancel_job(queue, state_key):
+    """Button callback: stop waiting for the job whose id is in st.session_state[state_key]"""
+    job_id = st.session_state.pop(state_key, None)
+    if job_id:
+        # Other sessions may share the job; it only stops when none is left waiting
+        queue.cancel(job_id, current_session_id() or "")
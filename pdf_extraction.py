@@ -0,0 +1,153 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+# Extraction configuration
+PARALLEL_PAGE_THRESHOLD = int(os.getenv("PDF_PARALLEL_PAGE_THRESHOLD", "8"))
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "4"))
+MAX_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", str(min(4, os.cpu_count() or 1))))
+CACHE_SIZE = int(os.getenv("PDF_EXTRACTION_CACHE_SIZE", "128"))
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def hash_pdf_bytes(data):
+    """Return the content hash used to memoize extraction results"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+    return _executor
+
+
+def _open_reader(data):
+    # PyPDF2 is only imported once a PDF is actually parsed
+    import PyPDF2
+
+    return PyPDF2.PdfReader(io.BytesIO(data))
+
+
+def _extract_page_range(data, start, stop):
+    """Extract the text of pages [start, stop) from raw PDF bytes"""
+    reader = _open_reader(data)
+    return [reader.pages[index].extract_text() or "" for index in range(start, stop)]
+
+
+def _extract_sequential(reader, char_limit):
+    pages = []
+    length = 0
+    complete = True
+    page_count = len(reader.pages)
+    for index in range(page_count):
+        text = reader.pages[index].extract_text() or ""
+        pages.append(text)
+        length += len(text) + 1
+        if char_limit is not None and length >= char_limit and index < page_count - 1:
+            complete = False
+            break
+    return pages, complete
+
+
+def _extract_parallel(data, page_count, char_limit):
+    # Page ranges are submitted in a sliding window so that a limited
+    # extraction can stop without parsing the rest of the document
+    executor = _get_executor()
+    ranges = [(start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK)]
+    pending = []
+    next_range = 0
+    pages = []
+    length = 0
+
+    while next_range < len(ranges) or pending:
+        while next_range < len(ranges) and len(pending) < MAX_WORKERS:
+            start, stop = ranges[next_range]
+            pending.append(executor.submit(_extract_page_range, data, start, stop))
+            next_range += 1
+
+        chunk = pending.pop(0).result()
+        pages.extend(chunk)
+        length += sum(len(text) + 1 for text in chunk)
+
+        if char_limit is not None and length >= char_limit and (pending or next_range < len(ranges)):
+            for future in pending:
+                future.cancel()
+            return pages, False
+
+    return pages, True
+
+
+def extract_pages(data, char_limit=None, reader=None, parallel=True):
+    """Extract page texts from PDF bytes: (pages, complete)
+
+    Large documents are split across a process pool unless parallel is
+    False. reader is an already opened PdfReader for data, if the caller has
+    one.
+    """
+    reader = reader or _open_reader(data)
+    page_count = len(reader.pages)
+    if parallel and page_count >= PARALLEL_PAGE_THRESHOLD and MAX_WORKERS > 1:
+        return _extract_parallel(data, page_count, char_limit)
+    return _extract_sequential(reader, char_limit)
+
+
+def cached_text(digest, char_limit=None):
+    """Return memoized text for a content hash if it covers char_limit, else None"""
+    with _cache_lock:
+        entry = _cache.get(digest)
+        if entry is not None:
+            text, complete = entry
+            if complete or (char_limit is not None and len(text) >= char_limit):
+                _cache.move_to_end(digest)
+                return text
+    return None
+
+
+def remember_text(digest, text, complete):
+    """Memoize extracted text under a content hash"""
+    with _cache_lock:
+        _cache[digest] = (text, complete)
+        _cache.move_to_end(digest)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def extract_pdf_text(data, char_limit=None):
+    """Extract text from PDF bytes
+
+    Results are memoized by content hash. With char_limit set, extraction
+    stops at the first page boundary past that many characters; pass None to
+    get the full text. Large documents are split across a process pool.
+    """
+    digest = hash_pdf_bytes(data)
+    text = cached_text(digest, char_limit)
+    if text is not None:
+        return text
+
+    pages, complete = extract_pages(data, char_limit)
+    text = "\n".join(pages).strip()
+    remember_text(digest, text, complete)
+    return text
+
+
+def read_pdf_bytes(pdf_file):
+    """Read raw bytes from a path, bytes or file-like PDF source"""
+    if isinstance(pdf_file, (bytes, bytearray)):
+        return bytes(pdf_file)
+    if isinstance(pdf_file, (str, os.PathLike)):
+        with open(pdf_file, "rb") as handle:
+            return handle.read()
+    if hasattr(pdf_file, "getvalue"):
+        return pdf_file.getvalue()
+    pdf_file.seek(0)
+    return pdf_file.read()
@@ -0,0 +1,240 @@
+"""Guarded PDF ingestion for untrusted uploads
+
+An upload is copied in chunks to a spooled temporary file (kept in memory
+up to PDF_SPOOL_MEMORY_BYTES, on disk beyond that) while it is hashed and
+checked against the byte budget. Parsing then runs in a short-lived child
+interpreter with an address-space cap (PDF_PARSE_MEMORY_MB), a page budget and
+a wall-clock budget, so a huge or hostile PDF costs one child process
+instead of bloating the Streamlit worker that every session shares. The
+child extracts one page at a time rather than through the pdf_extraction
+pool: the cap is per process, so pool workers would each get their own, and
+a timeout would have to hunt them down. The child still leads its own
+process group, which is killed whole on timeout. Where there are no rlimits
+(Windows), the child runs without a memory cap and only the other budgets
+apply. Extracted text is memoized by content hash, like pdf_extraction.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+
+import metrics
+from pdf_extraction import _open_reader, cached_text, extract_pages, remember_text
+
+logger = logging.getLogger(__name__)
+
+# Ingestion budgets
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "30"))
+PDF_PARSE_TIMEOUT = float(os.getenv("PDF_PARSE_TIMEOUT", "15"))
+PDF_PARSE_MEMORY_MB = int(os.getenv("PDF_PARSE_MEMORY_MB", "512"))
+PDF_SPOOL_MEMORY_BYTES = int(os.getenv("PDF_SPOOL_MEMORY_BYTES", str(1024 * 1024)))
+# Set to 0 to parse in-process (no memory cap or timeout; page and byte budgets still apply)
+PDF_ISOLATED = os.getenv("PDF_ISOLATED", "1") == "1"
+
+CHUNK_SIZE = 64 * 1024
+# What a parser child that ran out of memory outside Python's MemoryError leaves on stderr
+OUT_OF_MEMORY_MARKERS = ("MemoryError", "Cannot allocate memory", "bad_alloc", "out of memory")
+# Histogram buckets for the parser child's peak RSS, 32 MB to 1 GB
+MEMORY_BUCKETS = tuple(size * 1024 * 1024 for size in (32, 48, 64, 96, 128, 192, 256, 384, 512, 768, 1024))
+
+
+class PDFRejected(ValueError):
+    """Raised when an upload breaks a budget or cannot be parsed; the message is user-facing"""
+
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.reason = reason
+
+
+def _format_size(size):
+    return f"{size / (1024 * 1024):g} MB" if size >= 1024 * 1024 else f"{size / 1024:g} KB"
+
+
+def _reject(message, reason):
+    metrics.increment("pdf_rejections_total", reason=reason)
+    return PDFRejected(message, reason)
+
+
+def spool_upload(pdf_file, max_bytes=PDF_MAX_BYTES):
+    """Copy an upload into a spooled temp file in chunks, enforcing the byte budget
+
+    Returns (spool, sha256 digest). The caller closes the spool.
+    """
+    size = getattr(pdf_file, "size", None)
+    if size is not None and size > max_bytes:
+        raise _reject(f"The PDF is larger than {_format_size(max_bytes)}.", "bytes")
+
+    if hasattr(pdf_file, "seek"):
+        pdf_file.seek(0)
+    spool = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MEMORY_BYTES, prefix="oracle-upload-")
+    digest = hashlib.sha256()
+    total = 0
+    try:
+        while True:
+            chunk = pdf_file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            total += len(chunk)
+            if total > max_bytes:
+                raise _reject(f"The PDF is larger than {_format_size(max_bytes)}.", "bytes")
+            digest.update(chunk)
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    if spool.read(5) != b"%PDF-":
+        spool.close()
+        raise _reject("The file is not a PDF.", "format")
+    spool.seek(0)
+    return spool, digest.hexdigest()
+
+
+def _parse(data, char_limit, max_pages):
+    reader = _open_reader(data)
+    page_count = len(reader.pages)
+    if page_count > max_pages:
+        return "error", ("pages", page_count)
+    pages, complete = extract_pages(data, char_limit, reader, parallel=False)
+    return "ok", ("\n".join(pages).strip(), complete)
+
+
+def _peak_rss_kb():
+    # VmHWM belongs to this process image only (ru_maxrss would include the
+    # parent's pages from before exec); Linux only
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _failure_reason(result):
+    # A child that died without answering: the kernel's OOM killer sends
+    # SIGKILL, and an allocation that fails under the address-space cap
+    # outside Python's MemoryError handling says so on stderr. Anything
+    # else is a crash of the parser itself.
+    stderr = (result.stderr or b"").decode("utf-8", "replace")
+    if result.returncode == -getattr(signal, "SIGKILL", 9) or any(
+            marker in stderr for marker in OUT_OF_MEMORY_MARKERS):
+        return "memory"
+    logger.warning("PDF parser exited with status %s: %s", result.returncode, stderr.strip()[-500:])
+    return "crash"
+
+
+def _kill_group(process):
+    # start_new_session makes the child's pid its process group id; without
+    # process groups (Windows) only the child itself is killed
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+            return
+        except OSError:
+            pass
+    process.kill()
+
+
+def _parse_isolated(spool, char_limit, max_pages, timeout, memory_mb):
+    # A fresh interpreter (not a fork of the Streamlit worker and its memory)
+    # parses a handoff copy of the upload and prints the result as JSON.
+    # Returns (status, value, child peak RSS in KB or None).
+    with tempfile.NamedTemporaryFile(prefix="oracle-upload-", suffix=".pdf") as handoff:
+        spool.seek(0)
+        shutil.copyfileobj(spool, handoff, CHUNK_SIZE)
+        handoff.flush()
+        command = [sys.executable, os.path.abspath(__file__), handoff.name,
+                   str(char_limit or 0), str(max_pages), str(memory_mb)]
+        # The child leads a new session so that a timeout kills it together
+        # with anything it started, not just the direct child
+        with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              start_new_session=True) as process:
+            try:
+                stdout, stderr = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                _kill_group(process)
+                process.communicate()
+                return "error", ("time", None), None
+        result = subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+    answer = None
+    if result.returncode == 0:
+        try:
+            answer = json.loads(result.stdout)
+        except ValueError:
+            pass
+    if not answer:
+        return "error", (_failure_reason(result), None), None
+    status, value, peak_kb = answer
+    if peak_kb:
+        metrics.observe("pdf_parse_peak_rss_bytes", peak_kb * 1024, buckets=MEMORY_BUCKETS)
+    return status, tuple(value), peak_kb
+
+
+def ingest_pdf(pdf_file, char_limit=None, max_bytes=PDF_MAX_BYTES, max_pages=PDF_MAX_PAGES,
+               timeout=PDF_PARSE_TIMEOUT, memory_mb=PDF_PARSE_MEMORY_MB, isolated=PDF_ISOLATED):
+    """Extract text from an uploaded PDF within the byte, page, time and memory budgets
+
+    Raises PDFRejected with a user-facing message when a budget is exceeded
+    or the file cannot be parsed.
+    """
+    with metrics.timer("pdf_ingest"):
+        spool, digest = spool_upload(pdf_file, max_bytes)
+        try:
+            text = cached_text(digest, char_limit)
+            if text is not None:
+                return text
+
+            if isolated:
+                status, value, _ = _parse_isolated(spool, char_limit, max_pages, timeout, memory_mb)
+            else:
+                try:
+                    status, value = _parse(spool.read(), char_limit, max_pages)
+                except Exception as e:
+                    status, value = "error", ("parse", str(e))
+        finally:
+            spool.close()
+
+    if status == "ok":
+        text, complete = value
+        remember_text(digest, text, complete)
+        return text
+
+    reason, detail = value
+    messages = {
+        "pages": f"The PDF has {detail} pages; the Oracle reads at most {max_pages}.",
+        "time": f"The PDF took longer than {timeout:g} seconds to read.",
+        "memory": "The PDF needs too much memory to read.",
+        "parse": "The PDF could not be read.",
+        "crash": "The PDF could not be read.",
+    }
+    raise _reject(messages[reason], reason)
+
+
+if __name__ == "__main__":
+    # Child side of _parse_isolated: python pdf_ingest.py PATH CHAR_LIMIT MAX_PAGES MEMORY_MB
+    path, char_limit, max_pages, memory_mb = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4])
+    try:
+        import resource
+    except ImportError:
+        # No rlimits on Windows: the child is still bounded by the timeout and page budget
+        resource = None
+    if memory_mb and resource is not None:
+        # Cap the address space before touching the PDF
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    try:
+        with open(path, "rb") as stream:
+            outcome = _parse(stream.read(), char_limit or None, max_pages)
+    except MemoryError:
+        outcome = ("error", ("memory", None))
+    except Exception as e:
+        outcome = ("error", ("parse", str(e)))
+    sys.stdout.write(json.dumps(list(outcome) + [_peak_rss_kb()]))
@@ -0,0 +1,184 @@
+"""Versioned prompt templates
+
+A prompt is a static system message (instructions and output format) plus a
+user message template for the per-request values. Keeping everything static
+in front and the variable data last gives every request a byte-identical
+prefix, which providers with prompt caching (OpenAI, vLLM, ...) serve from
+cache instead of re-processing. Templates are compiled once at import, and
+the prefix is tokenized once, so a request only counts its own values.
+
+Every template has a key ("name@version-digest") that changes whenever its
+text changes; result caches use it, so an edited prompt never serves answers
+written for the old one.
+
+    python prompts.py     # list the registered prompts
+"""
+import hashlib
+import json
+import textwrap
+from collections import namedtuple
+from string import Template
+
+import metrics
+from cv_compaction import count_tokens
+from llm_pool import usage_tokens
+
+# A rendered prompt: chat messages plus their token count
+RenderedPrompt = namedtuple("RenderedPrompt", ["template", "messages", "tokens"])
+
+_registry = {}
+
+
+class PromptTemplate:
+    """A static system prefix and a string.Template for the variable user message"""
+
+    def __init__(self, name, version, system, user):
+        self.name = name
+        self.version = version
+        self.system = textwrap.dedent(system).strip()
+        self.user = Template(textwrap.dedent(user).strip())
+        self.prefix_tokens = count_tokens(self.system)
+        digest = hashlib.sha256(json.dumps([self.system, self.user.template]).encode("utf-8")).hexdigest()[:8]
+        self.key = f"{name}@{version}-{digest}"
+
+    def render(self, **values):
+        """Return the chat messages for values (raises KeyError for a missing value)"""
+        user = self.user.substitute(values)
+        messages = [{"role": "system", "content": self.system}, {"role": "user", "content": user}]
+        return RenderedPrompt(self, messages, self.prefix_tokens + count_tokens(user))
+
+
+def register(template):
+    """Add a template to the registry and return it"""
+    versions = _registry.setdefault(template.name, {})
+    if template.version in versions:
+        raise ValueError(f"Prompt {template.name} version {template.version} is already registered")
+    versions[template.version] = template
+    return template
+
+
+def get_prompt(name, version=None):
+    """Return a registered template, the latest version unless one is asked for"""
+    versions = _registry.get(name)
+    if not versions:
+        raise KeyError(f"Unknown prompt '{name}'")
+    if version is None:
+        return versions[max(versions, key=int)]
+    if version not in versions:
+        raise KeyError(f"Prompt '{name}' has no version {version} (has {', '.join(sorted(versions))})")
+    return versions[version]
+
+
+def record_usage(template, usage):
+    """Count a call's reported prompt, cached-prompt and completion tokens under the template key"""
+    if usage is None:
+        return
+    prompt_tokens, cached_tokens, completion_tokens = usage_tokens(usage)
+    metrics.increment("prompt_tokens_total", prompt_tokens, prompt=template.key, type="prompt")
+    metrics.increment("prompt_tokens_total", cached_tokens, prompt=template.key, type="cached_prompt")
+    metrics.increment("prompt_tokens_total", completion_tokens, prompt=template.key, type="completion")
+    metrics.increment("prompt_calls_total", prompt=template.key)
+
+
+# Version 3: the original prompt, with the CV in the middle of the instructions.
+# Kept so ORACLE_PROMPT_VERSION=3 can roll back to it.
+register(PromptTemplate("recommendations", "3", """
+    You are a career advisor analyzing CVs and personality types to recommend suitable job roles.
+""", """
+    Analyze the following CV and personality type to generate 3-5 suitable job recommendations.
+
+    CV Content: $cv_excerpt
+
+    Personality Type: $personality_type
+
+    For each job recommendation, provide:
+    1. Job title
+    2. Brief description of the role
+    3. Suitability score (1-10)
+    4. Suitability level (Excellent/Good/Fair/Poor)
+    5. Estimated salary range
+    6. Growth potential (High/Medium/Low)
+
+    Return as JSON:
+    {
+        "recommendations": [
+            {
+                "title": "Job Title",
+                "description": "Role description",
+                "score": 8.5,
+                "suitability": "Excellent",
+                "salary_range": "$$60,000 - $$80,000",
+                "growth_potential": "High"
+            }
+        ]
+    }
+
+    Make recommendations specific to the CV content and personality type. Focus on roles where the candidate's background and personality would be a good fit.
+"""))
+
+# Version 4: the same instructions as a static prefix. The personality type
+# comes before the CV because its 16 values extend the prefix shared by
+# requests of the same type.
+register(PromptTemplate("recommendations", "4", """
+    You are a career advisor analyzing CVs and personality types to recommend suitable job roles.
+
+    The user sends a personality type and a CV. Generate 3-5 suitable job recommendations.
+
+    For each job recommendation, provide:
+    1. Job title
+    2. Brief description of the role
+    3. Suitability score (1-10)
+    4. Suitability level (Excellent/Good/Fair/Poor)
+    5. Estimated salary range
+    6. Growth potential (High/Medium/Low)
+
+    Return as JSON:
+    {
+        "recommendations": [
+            {
+                "title": "Job Title",
+                "description": "Role description",
+                "score": 8.5,
+                "suitability": "Excellent",
+                "salary_range": "$60,000 - $80,000",
+                "growth_potential": "High"
+            }
+        ]
+    }
+
+    Make recommendations specific to the CV content and personality type. Focus on roles where the candidate's background and personality would be a good fit.
+""", """
+    Personality Type: $personality_type
+
+    CV Content:
+    $cv_excerpt
+"""))
+
+# Role scoring for the CV comparison page. The roles come before the CV, so
+# every CV of one comparison shares the prefix up to its own text.
+register(PromptTemplate("role_scores", "1", """
+    You are a career advisor comparing candidates for a set of job roles.
+
+    The user sends a personality type, a list of job roles and a candidate's CV. Score how well the candidate fits each listed role from 0 to 10, based on their experience, skills and personality type. Score every listed role, using its title exactly as written, and nothing else.
+
+    Return as JSON:
+    {
+        "scores": [
+            {"title": "Job Title", "score": 7.5}
+        ]
+    }
+""", """
+    Personality Type: $personality_type
+
+    Roles:
+    $roles
+
+    CV Content:
+    $cv_excerpt
+"""))
+
+
+if __name__ == "__main__":
+    for name, versions in sorted(_registry.items()):
+        for version, template in sorted(versions.items(), key=lambda item: int(item[0])):
+            print(f"{template.key:<32} static prefix {template.prefix_tokens:>4} tokens")
@@ -0,0 +1,436 @@
+"""Rate limits and quotas for LLM spend
+
+Two layers keep one user from spending everyone's share of the API key:
+
+* Caller limits: every session, client IP and tenant has a token bucket of
+  readings (ORACLE_SESSION_LIMIT, ORACLE_IP_LIMIT, ORACLE_TENANT_LIMIT, as
+  "5/min", "100/h", "1000/day"; empty turns a limit off). check_caller()
+  takes a reading per LLM job (one per candidate of a comparison) from each
+  bucket that applies, or raises RateLimited with the time until the next
+  one, before the work is queued. The session bucket is keyed on the
+  session id, which a client resets by dropping it from the URL, so the IP
+  bucket is what bounds a client: it is on by default and, unless
+  ORACLE_PROXY_HOPS says how many trusted proxies add X-Forwarded-For,
+  keyed on the connection's peer address, which a client can't forge.
+* Upstream budget: every LLM call takes one request and its worst-case
+  tokens (prompt plus max_tokens) from global buckets of ORACLE_GLOBAL_RPM
+  requests and ORACLE_GLOBAL_TPM tokens per minute (0 turns them off); the
+  reported usage is settled afterwards. The defaults are the lowest paid
+  OpenAI tier's limits for gpt-4o-mini, so the Oracle queues before the
+  provider answers 429; set them to the key's own limits. When the budget is spent, acquire()
+  waits in a queue that lets sessions in by turns (a session's second
+  waiting call goes behind every other session's first) and raises
+  RateLimited after ORACLE_RATE_LIMIT_MAX_WAIT seconds.
+
+Buckets, the queue and per-minute usage counters live in one SQLite file
+(RATE_LIMIT_PATH), so every worker process on the host shares them. Each
+admission is a single BEGIN IMMEDIATE transaction. A broken store admits
+everything rather than breaking the Oracle.
+
+    python rate_limit.py [stats [minutes]|clear]   # usage, throttles and budget left
+"""
+import contextlib
+import json
+import logging
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import metrics
+from lazy import singleton
+from session_store import client_info
+
+logger = logging.getLogger(__name__)
+
+# Rate limit configuration
+RATE_LIMIT_PATH = os.getenv(
+    "RATE_LIMIT_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "rate_limits.sqlite3")
+)
+SESSION_LIMIT = os.getenv("ORACLE_SESSION_LIMIT", "5/min")
+IP_LIMIT = os.getenv("ORACLE_IP_LIMIT", "30/min")
+TENANT_LIMIT = os.getenv("ORACLE_TENANT_LIMIT", "")
+TENANT_HEADER = os.getenv("ORACLE_TENANT_HEADER", "X-Tenant-Id")
+# Trusted reverse proxies in front of the app: the client IP is the X-Forwarded-For entry the outermost
+# one added. With 0 the headers are the client's own to forge, so the connection's peer address is used
+PROXY_HOPS = int(os.getenv("ORACLE_PROXY_HOPS", "0"))
+GLOBAL_RPM = int(os.getenv("ORACLE_GLOBAL_RPM", "500"))
+GLOBAL_TPM = int(os.getenv("ORACLE_GLOBAL_TPM", "200000"))
+MAX_WAIT_SECONDS = float(os.getenv("ORACLE_RATE_LIMIT_MAX_WAIT", "30"))
+USAGE_RETENTION_MINUTES = int(os.getenv("ORACLE_USAGE_RETENTION", str(7 * 24 * 60)))
+
+# A waiter that stops refreshing its ticket (its process died) leaves the queue after this many seconds
+STALE_WAITER_SECONDS = 10
+# Longest sleep between two admission attempts
+POLL_SECONDS = 0.25
+
+PERIODS = {"s": 1, "min": 60, "h": 3600, "day": 86400}
+USAGE_NAMES = ("readings", "requests", "tokens", "queued", "throttled_session", "throttled_ip",
+               "throttled_tenant", "throttled_upstream")
+
+
+class RateLimited(Exception):
+    """Over a caller limit or the upstream budget; retry_after is the suggested wait in seconds"""
+
+    def __init__(self, message, scope, retry_after):
+        super().__init__(message)
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class Limit:
+    """A token bucket that holds up to capacity and refills at rate per second"""
+
+    def __init__(self, capacity, rate):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+
+    @classmethod
+    def parse(cls, spec):
+        """Parse "N/period" (period: s, min, h or day; a bare N is per minute); None when off"""
+        spec = (spec or "").strip()
+        if not spec:
+            return None
+        count, _, period = spec.partition("/")
+        seconds = PERIODS.get(period.strip().lower() or "min")
+        if seconds is None:
+            raise ValueError(f"Invalid rate limit {spec!r}: the period must be one of {', '.join(PERIODS)}")
+        count = float(count)
+        return cls(count, count / seconds) if count > 0 else None
+
+    @classmethod
+    def per_minute(cls, count):
+        return cls(count, count / 60) if count > 0 else None
+
+    def __repr__(self):
+        return f"Limit({self.capacity:g}, {self.rate * 60:g}/min)"
+
+
+class RateLimiter:
+    """SQLite-backed caller limits and upstream budget, shared by every worker process on the host"""
+
+    def __init__(self, path=RATE_LIMIT_PATH, session_limit=SESSION_LIMIT, ip_limit=IP_LIMIT,
+                 tenant_limit=TENANT_LIMIT, rpm=GLOBAL_RPM, tpm=GLOBAL_TPM, max_wait=MAX_WAIT_SECONDS,
+                 retention_minutes=USAGE_RETENTION_MINUTES):
+        self.path = path
+        self.caller_limits = {
+            "session": Limit.parse(session_limit),
+            "ip": Limit.parse(ip_limit),
+            "tenant": Limit.parse(tenant_limit),
+        }
+        self.upstream_limits = {"requests": Limit.per_minute(rpm), "tokens": Limit.per_minute(tpm)}
+        self.max_wait = max_wait
+        self.retention_minutes = retention_minutes
+        self._local = threading.local()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    # A bucket without a row is full, so rows go once they have refilled (full_at)
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS buckets (
+                            key TEXT PRIMARY KEY,
+                            level REAL NOT NULL,
+                            updated_at REAL NOT NULL,
+                            full_at REAL NOT NULL
+                        )
+                    """)
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_buckets_full_at ON buckets(full_at)")
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS waiters (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            session_id TEXT,
+                            turn INTEGER NOT NULL,
+                            heartbeat REAL NOT NULL
+                        )
+                    """)
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_waiters_turn ON waiters(turn, id)")
+                    # The turn of the last admitted waiter, and each session's latest turn
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS rounds (id INTEGER PRIMARY KEY CHECK (id = 0), turn INTEGER NOT NULL)"
+                    )
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS turns (session_id TEXT PRIMARY KEY, turn INTEGER NOT NULL)"
+                    )
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS usage (
+                            minute INTEGER NOT NULL,
+                            name TEXT NOT NULL,
+                            value REAL NOT NULL,
+                            PRIMARY KEY (minute, name)
+                        )
+                    """)
+                    self._initialized = True
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _level(self, conn, key, limit, now):
+        row = conn.execute("SELECT level, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return limit.capacity
+        return min(limit.capacity, row[0] + (now - row[1]) * limit.rate)
+
+    def _store(self, conn, key, limit, level, now):
+        full_at = now + max(limit.capacity - level, 0) / limit.rate
+        conn.execute(
+            "INSERT OR REPLACE INTO buckets (key, level, updated_at, full_at) VALUES (?, ?, ?, ?)",
+            (key, level, now, full_at)
+        )
+
+    def _count(self, conn, now, amounts):
+        minute = int(now // 60)
+        for name, amount in amounts.items():
+            if amount:
+                conn.execute(
+                    "INSERT INTO usage (minute, name, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT(minute, name) DO UPDATE SET value = value + excluded.value",
+                    (minute, name, amount)
+                )
+
+    def _prune(self, conn, now):
+        conn.execute("DELETE FROM buckets WHERE full_at < ?", (now,))
+        conn.execute("DELETE FROM usage WHERE minute < ?", (int(now // 60) - self.retention_minutes,))
+
+    def check_caller(self, session_id=None, ip=None, tenant=None, readings=1):
+        """Take readings from the session's, IP's and tenant's buckets, or raise RateLimited
+
+        More readings than a bucket holds are admitted once it is full and
+        leave it in debt, so a large comparison waits out its cost afterwards.
+        """
+        buckets = [
+            (f"{scope}:{value}", scope, self.caller_limits[scope])
+            for scope, value in (("session", session_id), ("ip", ip), ("tenant", tenant))
+            if value and self.caller_limits[scope]
+        ]
+        if not buckets:
+            return
+        try:
+            with self._transaction() as conn:
+                now = time.time()
+                self._prune(conn, now)
+                levels = [(key, scope, limit, self._level(conn, key, limit, now)) for key, scope, limit in buckets]
+                # Nothing is taken unless every bucket has the readings; the wait is the longest refill
+                short = [((min(readings, limit.capacity) - level) / limit.rate, scope)
+                         for _, scope, limit, level in levels if level < min(readings, limit.capacity)]
+                if short:
+                    retry_after, scope = max(short)
+                    self._count(conn, now, {f"throttled_{scope}": 1})
+                else:
+                    for key, _, limit, level in levels:
+                        self._store(conn, key, limit, level - readings, now)
+                    self._count(conn, now, {"readings": readings})
+        except sqlite3.Error as e:
+            logger.warning("Rate limits unavailable, admitting the caller: %s", e)
+            return
+        if short:
+            metrics.increment("rate_limit_throttled_total", scope=scope)
+            raise RateLimited(f"Over the {scope} rate limit, retry in {math.ceil(retry_after)}s", scope, retry_after)
+        metrics.increment("rate_limit_admitted_total", scope="caller")
+
+    def _upstream_buckets(self, requests, tokens):
+        # A call larger than the whole token budget waits for a full bucket instead of forever
+        return [
+            (f"upstream:{kind}", limit, min(amount, limit.capacity))
+            for kind, amount in (("requests", requests), ("tokens", tokens))
+            for limit in [self.upstream_limits[kind]]
+            if limit
+        ]
+
+    def _try_admit(self, conn, buckets, tokens, session_id, ticket, now):
+        """One admission attempt: returns (admitted, seconds to wait, ticket)"""
+        conn.execute("DELETE FROM waiters WHERE heartbeat < ?", (now - STALE_WAITER_SECONDS,))
+        if ticket is not None and not conn.execute(
+                "UPDATE waiters SET heartbeat = ? WHERE id = ?", (now, ticket)).rowcount:
+            # Dropped as stale (the process was paused): queue again
+            ticket = None
+        head = conn.execute("SELECT id, turn FROM waiters ORDER BY turn, id LIMIT 1").fetchone()
+        levels = [(key, limit, amount, self._level(conn, key, limit, now)) for key, limit, amount in buckets]
+        wait = max([(amount - level) / limit.rate for _, limit, amount, level in levels if level < amount],
+                   default=0)
+        first = head is None or head[0] == ticket
+        if first and not wait:
+            for key, limit, amount, level in levels:
+                self._store(conn, key, limit, level - amount, now)
+            if ticket is not None:
+                conn.execute("DELETE FROM waiters WHERE id = ?", (ticket,))
+                conn.execute("INSERT OR REPLACE INTO rounds (id, turn) VALUES (0, ?)", (head[1],))
+                conn.execute("DELETE FROM turns WHERE turn < ?", (head[1],))
+            self._count(conn, now, {"requests": 1, "tokens": tokens})
+            return True, 0, None
+        if ticket is None:
+            # Newcomers join the current round; a session's next call goes one round behind its last
+            current = conn.execute("SELECT turn FROM rounds").fetchone()
+            last = conn.execute("SELECT turn FROM turns WHERE session_id = ?", (session_id or "",)).fetchone()
+            turn = max(current[0] if current else 0, last[0] + 1 if last else 0)
+            conn.execute("INSERT OR REPLACE INTO turns (session_id, turn) VALUES (?, ?)", (session_id or "", turn))
+            ticket = conn.execute(
+                "INSERT INTO waiters (session_id, turn, heartbeat) VALUES (?, ?, ?)", (session_id, turn, now)
+            ).lastrowid
+            self._count(conn, now, {"queued": 1})
+        return False, wait if first else POLL_SECONDS, ticket
+
+    def acquire(self, tokens, session_id=None, max_wait=None):
+        """Wait for one request and tokens of the upstream budget, letting sessions in by turns
+
+        Raises RateLimited when the budget doesn't come within max_wait seconds.
+        """
+        buckets = self._upstream_buckets(1, tokens)
+        if not buckets:
+            return
+        max_wait = self.max_wait if max_wait is None else max_wait
+        started = time.monotonic()
+        ticket = None
+        try:
+            while True:
+                with self._transaction() as conn:
+                    now = time.time()
+                    admitted, wait, ticket = self._try_admit(conn, buckets, tokens, session_id, ticket, now)
+                    waited = time.monotonic() - started
+                    if not admitted and waited >= max_wait:
+                        conn.execute("DELETE FROM waiters WHERE id = ?", (ticket,))
+                        ticket = None
+                        self._count(conn, now, {"throttled_upstream": 1})
+                if admitted:
+                    break
+                if ticket is None:
+                    metrics.increment("rate_limit_throttled_total", scope="upstream")
+                    raise RateLimited(f"Upstream budget exhausted for {waited:.0f}s", "upstream", wait)
+                time.sleep(min(max(wait, 0.01), POLL_SECONDS, max_wait - waited))
+        except sqlite3.Error as e:
+            logger.warning("Upstream budget unavailable, admitting the call: %s", e)
+            return
+        finally:
+            if ticket is not None:
+                # Interrupted while queued; the stale sweep removes it if this fails too
+                with contextlib.suppress(sqlite3.Error):
+                    self._connect().execute("DELETE FROM waiters WHERE id = ?", (ticket,))
+        metrics.increment("rate_limit_admitted_total", scope="upstream")
+        metrics.observe("rate_limit_wait_seconds", time.monotonic() - started)
+
+    def charge(self, requests=0, tokens=0):
+        """Take budget without waiting (hedged calls), or give it back with negative amounts (settled usage)
+
+        The buckets may go below zero; later calls wait until the debt has refilled.
+        """
+        buckets = [
+            (f"upstream:{kind}", limit, amount)
+            for kind, amount in (("requests", requests), ("tokens", tokens))
+            for limit in [self.upstream_limits[kind]]
+            if limit and amount
+        ]
+        if not buckets:
+            return
+        try:
+            with self._transaction() as conn:
+                now = time.time()
+                for key, limit, amount in buckets:
+                    self._store(conn, key, limit, self._level(conn, key, limit, now) - amount, now)
+                self._count(conn, now, {"requests": requests, "tokens": tokens})
+        except sqlite3.Error as e:
+            logger.warning("Upstream budget unavailable: %s", e)
+
+    def stats(self, minutes=60):
+        """Return usage and throttle totals and per-minute peaks of the last minutes, the queue and the budget left"""
+        now = time.time()
+        try:
+            conn = self._connect()
+            rows = conn.execute(
+                "SELECT name, SUM(value), MAX(value) FROM usage WHERE minute > ? GROUP BY name",
+                (int(now // 60) - minutes,)
+            ).fetchall()
+            waiting = conn.execute("SELECT COUNT(*) FROM waiters WHERE heartbeat >= ?",
+                                   (now - STALE_WAITER_SECONDS,)).fetchone()[0]
+            budget = {
+                kind: round(self._level(conn, f"upstream:{kind}", limit, now), 1)
+                for kind, limit in self.upstream_limits.items()
+                if limit
+            }
+        except sqlite3.Error:
+            rows, waiting, budget = [], 0, {}
+
+        totals = {name: (total, peak) for name, total, peak in rows}
+        return {
+            "minutes": minutes,
+            "totals": {name: round(totals.get(name, (0, 0))[0]) for name in USAGE_NAMES},
+            "peak_per_minute": {name: round(totals.get(name, (0, 0))[1]) for name in USAGE_NAMES},
+            "waiting": waiting,
+            "budget_left": budget,
+            "limits": {scope: repr(limit) for scope, limit in
+                       dict(self.caller_limits, **self.upstream_limits).items() if limit},
+        }
+
+    def clear(self):
+        """Refill every bucket and drop the queue and usage counters"""
+        conn = self._connect()
+        conn.execute("DELETE FROM buckets")
+        conn.execute("DELETE FROM waiters")
+        conn.execute("DELETE FROM rounds")
+        conn.execute("DELETE FROM turns")
+        conn.execute("DELETE FROM usage")
+
+
+@singleton
+def get_limiter():
+    """Return the process-wide rate limiter"""
+    limiter = RateLimiter()
+
+    def collect():
+        stats = limiter.stats(minutes=1)
+        return [("rate_limit_waiting", "gauge", {}, stats["waiting"])] + [
+            ("upstream_budget_left", "gauge", {"kind": kind}, level) for kind, level in stats["budget_left"].items()
+        ]
+
+    metrics.register_collector(collect)
+    return limiter
+
+
+def caller_from_headers(headers, remote_ip=None, proxy_hops=PROXY_HOPS):
+    """Return (client IP, tenant) from a session's request headers and peer address; either may be None"""
+    headers = {name.lower(): value for name, value in (headers or {}).items()}
+    if proxy_hops:
+        hops = [hop.strip() for hop in headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        ip = hops[-min(proxy_hops, len(hops))] if hops else headers.get("x-real-ip")
+    else:
+        ip = remote_ip
+    return ip or None, headers.get(TENANT_HEADER.lower()) or None
+
+
+def check_session(session_id, readings=1):
+    """check_caller() for the current Streamlit session, its client IP and tenant"""
+    headers, remote_ip = client_info()
+    ip, tenant = caller_from_headers(headers, remote_ip)
+    get_limiter().check_caller(session_id, ip, tenant, readings)
+
+
+if __name__ == "__main__":
+    # python rate_limit.py [stats [minutes]|clear]
+    limiter = RateLimiter()
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "clear":
+        limiter.clear()
+    print(json.dumps(limiter.stats(int(sys.argv[2]) if len(sys.argv) > 2 else 60), indent=2))
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# Cache configuration
+CACHE_PATH = os.getenv(
+    "RECOMMENDATION_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "recommendations.sqlite3")
+)
+CACHE_TTL_SECONDS = int(os.getenv("RECOMMENDATION_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("RECOMMENDATION_CACHE_MAX_ENTRIES", "5000"))
+
+
+def make_cache_key(cv_text, personality_type, model, prompt_version):
+    """Build a content-addressed key for a recommendation request"""
+    payload = json.dumps([cv_text, personality_type, model, prompt_version], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RecommendationCache:
+    """SQLite-backed recommendation cache with TTL and LRU eviction
+
+    The database file is shared by every Streamlit session and worker process
+    on the host, so hit/miss counters are kept in the database as well.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl_seconds=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS recommendations (
+                            key TEXT PRIMARY KEY,
+                            value TEXT NOT NULL,
+                            created_at REAL NOT NULL,
+                            last_access REAL NOT NULL
+                        )
+                    """)
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_recommendations_last_access ON recommendations(last_access)")
+                    conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+                    self._initialized = True
+        return conn
+
+    def _increment(self, conn, name, amount=1):
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+
+    def get(self, key):
+        """Return cached recommendations for key, or None on a miss"""
+        try:
+            conn = self._connect()
+            now = time.time()
+            row = conn.execute("SELECT value, created_at FROM recommendations WHERE key = ?", (key,)).fetchone()
+
+            if row is None:
+                self._increment(conn, "misses")
+                return None
+
+            value, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM recommendations WHERE key = ?", (key,))
+                self._increment(conn, "expirations")
+                self._increment(conn, "misses")
+                return None
+
+            conn.execute("UPDATE recommendations SET last_access = ? WHERE key = ?", (now, key))
+            self._increment(conn, "hits")
+            return json.loads(value)
+
+        except (sqlite3.Error, ValueError):
+            # A broken cache must never break the Oracle
+            return None
+
+    def set(self, key, value):
+        """Store recommendations under key and evict least recently used entries"""
+        try:
+            conn = self._connect()
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO recommendations (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), now, now)
+                )
+                self._increment(conn, "writes")
+
+                if self.max_entries:
+                    count = conn.execute("SELECT COUNT(*) FROM recommendations").fetchone()[0]
+                    overflow = count - self.max_entries
+                    if overflow > 0:
+                        conn.execute(
+                            "DELETE FROM recommendations WHERE key IN "
+                            "(SELECT key FROM recommendations ORDER BY last_access ASC LIMIT ?)",
+                            (overflow,)
+                        )
+                        self._increment(conn, "evictions", overflow)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        except sqlite3.Error:
+            pass
+
+    def stats(self):
+        """Return cache counters and current size"""
+        try:
+            conn = self._connect()
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            entries = conn.execute("SELECT COUNT(*) FROM recommendations").fetchone()[0]
+        except sqlite3.Error:
+            counters, entries = {}, 0
+
+        stats = {name: counters.get(name, 0) for name in ("hits", "misses", "writes", "evictions", "expirations")}
+        stats["entries"] = entries
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Remove all cached recommendations and reset counters"""
+        conn = self._connect()
+        conn.execute("DELETE FROM recommendations")
+        conn.execute("DELETE FROM counters")
+
+
+if __name__ == "__main__":
+    # python recommendation_cache.py [stats|clear]
+    cache = RecommendationCache()
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "clear":
+        cache.clear()
+    print(json.dumps(cache.stats(), indent=2))
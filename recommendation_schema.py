@@ -0,0 +1,267 @@
+import json
+import re
+
+SUITABILITY_LEVELS = ("Excellent", "Good", "Fair", "Poor")
+GROWTH_LEVELS = ("High", "Medium", "Low")
+
+# JSON schema sent to the model as a structured-output response format
+RECOMMENDATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "recommendations": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string"},
+                    "description": {"type": "string"},
+                    "score": {"type": "number"},
+                    "suitability": {"type": "string", "enum": list(SUITABILITY_LEVELS)},
+                    "salary_range": {"type": "string"},
+                    "growth_potential": {"type": "string", "enum": list(GROWTH_LEVELS)}
+                },
+                "required": ["title", "description", "score", "suitability", "salary_range", "growth_potential"],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["recommendations"],
+    "additionalProperties": False
+}
+
+
+def role_score_schema(titles):
+    """JSON schema of a role-scoring answer, limited to the given role titles"""
+    return {
+        "type": "object",
+        "properties": {
+            "scores": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "title": {"type": "string", "enum": list(titles)},
+                        "score": {"type": "number"}
+                    },
+                    "required": ["title", "score"],
+                    "additionalProperties": False
+                }
+            }
+        },
+        "required": ["scores"],
+        "additionalProperties": False
+    }
+
+
+def response_format(mode, name="job_recommendations", schema=RECOMMENDATION_SCHEMA):
+    """Return the response_format request parameter for a mode, or None
+
+    mode is "json_schema" (structured outputs), "json_object" (JSON mode)
+    or "none" for endpoints that support neither.
+    """
+    if mode == "json_schema":
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": name, "strict": True, "schema": schema}
+        }
+    if mode == "json_object":
+        return {"type": "json_object"}
+    return None
+
+
+class RecommendationParseError(ValueError):
+    """Raised when model output cannot be turned into valid recommendations"""
+
+
+def _string_field(name):
+    def check(value):
+        if not isinstance(value, str) or not value.strip():
+            raise RecommendationParseError(f"'{name}' must be a non-empty string")
+        return value.strip()
+    return check
+
+
+def _score_field(value):
+    if isinstance(value, bool):
+        raise RecommendationParseError("'score' must be a number")
+    if isinstance(value, str):
+        # Accept "8.5" and "8.5/10"
+        match = re.match(r"\s*(\d+(?:\.\d+)?)", value)
+        if not match:
+            raise RecommendationParseError("'score' must be a number")
+        value = match.group(1)
+    try:
+        score = float(value)
+    except (TypeError, ValueError):
+        raise RecommendationParseError("'score' must be a number")
+    if not 0 <= score <= 10:
+        raise RecommendationParseError("'score' must be between 0 and 10")
+    return score
+
+
+def _enum_field(name, choices):
+    lookup = {choice.lower(): choice for choice in choices}
+
+    def check(value):
+        if not isinstance(value, str) or value.strip().lower() not in lookup:
+            raise RecommendationParseError(f"'{name}' must be one of {', '.join(choices)}")
+        return lookup[value.strip().lower()]
+    return check
+
+
+def compile_item_validator(schema=RECOMMENDATION_SCHEMA):
+    """Compile the item schema into a fast validate-and-normalize function"""
+    item_schema = schema["properties"]["recommendations"]["items"]
+    checks = []
+    for name in item_schema["required"]:
+        field = item_schema["properties"][name]
+        if "enum" in field:
+            checks.append((name, _enum_field(name, tuple(field["enum"]))))
+        elif field["type"] == "number":
+            checks.append((name, _score_field))
+        else:
+            checks.append((name, _string_field(name)))
+    checks = tuple(checks)
+
+    def validate(item):
+        if not isinstance(item, dict):
+            raise RecommendationParseError("Each recommendation must be an object")
+        normalized = {}
+        for name, check in checks:
+            if name not in item:
+                raise RecommendationParseError(f"Missing field '{name}'")
+            normalized[name] = check(item[name])
+        return normalized
+
+    return validate
+
+
+validate_item = compile_item_validator()
+
+
+def validate_recommendations(data):
+    """Validate a decoded response and return the normalized recommendation list"""
+    if isinstance(data, dict):
+        data = data.get("recommendations")
+    if not isinstance(data, list) or not data:
+        raise RecommendationParseError("Response has no recommendations")
+    return [validate_item(item) for item in data]
+
+
+_FENCE = re.compile(r"```(?:json)?", re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+
+
+def _close_truncated(text):
+    # Output cut off by max_tokens: drop the dangling partial value and close brackets
+    stack = []
+    in_string = False
+    escaped = False
+    last_complete = 0
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            if len(stack) <= 2:
+                last_complete = index + 1
+    if not stack and not in_string:
+        return text
+
+    # Keep everything up to the last complete recommendation object
+    text = text[:last_complete].rstrip().rstrip(",")
+    stack = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    return text + "".join(reversed(stack))
+
+
+def repair_json(content):
+    """Targeted fixes for common near-JSON model output; returns decoded data"""
+    text = _FENCE.sub("", content).translate(_SMART_QUOTES)
+    start = text.find("{")
+    if start < 0:
+        raise RecommendationParseError("No JSON object in response")
+    end = text.rfind("}") + 1
+    candidate = text[start:end] if end > start else text[start:]
+
+    for attempt in (candidate, _TRAILING_COMMA.sub(r"\1", candidate)):
+        try:
+            return json.loads(attempt)
+        except ValueError:
+            pass
+
+    truncated = _TRAILING_COMMA.sub(r"\1", _close_truncated(text[start:]))
+    try:
+        return json.loads(truncated)
+    except ValueError as e:
+        raise RecommendationParseError(f"Could not repair JSON: {e}")
+
+
+def parse_recommendations(content):
+    """Parse model output into validated recommendations
+
+    Returns (recommendations, repaired) where repaired tells whether the
+    fast path failed and the repair pass was needed.
+    """
+    try:
+        return validate_recommendations(json.loads(content)), False
+    except (ValueError, TypeError):
+        pass
+    return validate_recommendations(repair_json(content or "")), True
+
+
+def parse_role_scores(content, titles):
+    """Parse a role-scoring answer into {title: score} for the given titles it scores
+
+    Items with unknown titles or invalid scores are skipped.
+    """
+    try:
+        data = json.loads(content)
+    except (ValueError, TypeError):
+        data = repair_json(content or "")
+    items = data.get("scores") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        raise RecommendationParseError("Response has no scores")
+    lookup = {title.lower(): title for title in titles}
+    scores = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        title = lookup.get(str(item.get("title", "")).strip().lower())
+        try:
+            score = _score_field(item.get("score"))
+        except RecommendationParseError:
+            continue
+        if title:
+            scores[title] = score
+    if not scores:
+        raise RecommendationParseError("Response scores none of the roles")
+    return scores
@@ -0,0 +1,92 @@
+import json
+
+
+class RecommendationStreamParser:
+    """Incremental parser for streamed recommendation JSON
+
+    Feed it text chunks as they arrive from the model. Every time an object
+    inside the top-level ``recommendations`` array is closed, it is decoded
+    and returned, so callers can render cards before the completion ends.
+    Text before the first ``{`` (preambles, code fences) is ignored.
+    """
+
+    def __init__(self, array_key="recommendations"):
+        self.array_key = array_key
+        self._buffer = []
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+        self._item_start = None
+        self._array_open = False
+        self._last_key = None
+        self._key_start = None
+        self._position = 0
+        self.items = []
+
+    def feed(self, chunk):
+        """Consume a chunk of text and return the objects it completed"""
+        completed = []
+        for char in chunk:
+            self._buffer.append(char)
+            position = self._position
+            self._position += 1
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._last_key = "".join(self._buffer[self._key_start + 1:position])
+                        self._key_start = None
+                continue
+
+            if not self._stack and char != "{":
+                continue
+
+            if char == '"':
+                self._in_string = True
+                # Only strings directly inside the top-level object can name the array
+                if len(self._stack) == 1:
+                    self._key_start = position
+            elif char in "{[":
+                if char == "[" and len(self._stack) == 1 and self._last_key == self.array_key:
+                    self._array_open = True
+                elif char == "{" and self._array_open and len(self._stack) == 2:
+                    self._item_start = position
+                self._stack.append(char)
+            elif char in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if char == "}" and self._item_start is not None and len(self._stack) == 2:
+                    item = self._decode("".join(self._buffer[self._item_start:position + 1]))
+                    self._item_start = None
+                    if item is not None:
+                        self.items.append(item)
+                        completed.append(item)
+                elif char == "]" and self._array_open and len(self._stack) == 1:
+                    self._array_open = False
+
+        # Only the open item needs to stay buffered
+        if self._item_start is None and not self._in_string:
+            self._position = 0
+            self._buffer = []
+        return completed
+
+    def _decode(self, text):
+        try:
+            item = json.loads(text)
+        except ValueError:
+            return None
+        return item if isinstance(item, dict) else None
+
+
+def iter_recommendations(chunks, array_key="recommendations"):
+    """Yield recommendation objects from an iterable of text chunks"""
+    parser = RecommendationStreamParser(array_key)
+    for chunk in chunks:
+        if chunk:
+            yield from parser.feed(chunk)
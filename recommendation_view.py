@@ -0,0 +1,115 @@
+import html
+from collections import namedtuple
+
+# Precomputed, render-ready description of one recommendation
+JobView = namedtuple("JobView", ["index", "title", "card_html", "completed_trials", "actions"])
+
+# (label, button key prefix, target page)
+JobAction = namedtuple("JobAction", ["label", "key", "page"])
+
+CARD_TEMPLATE = """
+<div class="prophecy-card">
+    <h3>🌟 {title}</h3>
+    <p class="prophecy-vision"><strong>Oracle's Vision:</strong> {description}</p>
+    <div class="prophecy-details">
+        <div>
+            <p><strong>Destiny Score:</strong> {score}/10</p>
+            <p class="muted"><strong>Alignment Level:</strong> {suitability}</p>
+        </div>
+        <div>
+            <p><strong>Salary Range:</strong> {salary_range}</p>
+            <p class="muted"><strong>Growth Potential:</strong> {growth_potential}</p>
+        </div>
+    </div>
+</div>
+"""
+
+GAME_COMPLETED_BANNER = """
+<div class="trial-banner trial-banner-game">
+    <h4>✅ Oracle's Trial Completed</h4>
+    <p>You have completed the mystical trials for this role. Click below to view your results.</p>
+</div>
+"""
+
+INTERVIEW_COMPLETED_BANNER = """
+<div class="trial-banner trial-banner-interview">
+    <h4>✅ Professional Interview Completed</h4>
+    <p>You have completed the professional interview for this role. Click below to view your results.</p>
+</div>
+"""
+
+
+def _format_score(score):
+    try:
+        return f"{float(score):.1f}"
+    except (TypeError, ValueError):
+        return html.escape(str(score))
+
+
+def render_card_html(job):
+    """Return the HTML card for a single recommendation"""
+    return CARD_TEMPLATE.format(
+        title=html.escape(str(job.get("title", ""))),
+        description=html.escape(str(job.get("description", ""))),
+        score=_format_score(job.get("score", 0)),
+        suitability=html.escape(str(job.get("suitability", ""))),
+        salary_range=html.escape(str(job.get("salary_range", ""))),
+        growth_potential=html.escape(str(job.get("growth_potential", "")))
+    )
+
+
+def build_job_view(index, job, game_completed, interview_completed):
+    """Build the view-model for one recommendation and its trial state"""
+    title = job.get("title", "")
+    # (banner HTML, results button) for each finished trial
+    completed_trials = []
+
+    if game_completed:
+        completed_trials.append((
+            GAME_COMPLETED_BANNER,
+            JobAction(f"🔮 View Oracle's Revelation for {title}", "view_results", "game")
+        ))
+    if interview_completed:
+        completed_trials.append((
+            INTERVIEW_COMPLETED_BANNER,
+            JobAction(f"🎤 View Interview Results for {title}", "view_interview", "interview")
+        ))
+
+    actions = []
+    if not game_completed:
+        actions.append(JobAction(f"🔮 Immersive Experience for {title}", "start_game", "game"))
+    if not interview_completed:
+        actions.append(JobAction(f"🎤 Mock Interview for {title}", "start_interview", "interview"))
+    actions.append(JobAction(f"🔍 Real-time Jobs for {title}", "start_job_finder", "job_finder"))
+
+    return JobView(index, title, render_card_html(job), tuple(completed_trials), tuple(actions))
+
+
+def completion_flags(state, count):
+    """Return the (game, interview) completion flags of the first count roles"""
+    return tuple(
+        (bool(state.get(f"game_completed_{i}")), bool(state.get(f"interview_completed_{i}")))
+        for i in range(count)
+    )
+
+
+def get_recommendation_view(state):
+    """Return the memoized view-model for state.job_recommendations
+
+    The view is kept in state and only rebuilt when the recommendation list
+    is replaced or a trial completion flag changes.
+    """
+    recommendations = state.get("job_recommendations") or []
+    flags = completion_flags(state, len(recommendations))
+
+    cached = state.get("_recommendation_view")
+    # Holding on to the list in the cache keeps the identity check reliable
+    if cached is not None and cached[0] is recommendations and cached[1] == flags:
+        return cached[2]
+
+    view = tuple(
+        build_job_view(i, job, game_completed, interview_completed)
+        for i, (job, (game_completed, interview_completed)) in enumerate(zip(recommendations, flags))
+    )
+    state["_recommendation_view"] = (recommendations, flags, view)
+    return view
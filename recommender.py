@@ -0,0 +1,330 @@
+import functools
+import logging
+import os
+from collections import deque
+
+from dotenv import load_dotenv
+
+import metrics
+from circuit_breaker import CircuitOpenError
+from cv_compaction import CV_TOKEN_BUDGET, compact_cv, count_tokens
+from job_queue import get_queue
+from lazy import load_attr, singleton
+from model_router import get_router
+from prompts import get_prompt, record_usage
+from rate_limit import RateLimited
+from recommendation_cache import RecommendationCache, make_cache_key
+from recommendation_schema import (RecommendationParseError, parse_recommendations, response_format,
+                                   validate_item)
+from recommendation_stream import iter_recommendations
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Recommendation settings. Requests are routed per CV (see model_router.py);
+# MODEL_NAME is the default model and part of the cache key, so every routed
+# model shares cached answers.
+MODEL_NAME = "gpt-4o-mini"
+# Prompt template from prompts.py (latest version unless ORACLE_PROMPT_VERSION
+# pins one); its key changes with the prompt text and is part of the cache key
+RECOMMENDATION_PROMPT = get_prompt("recommendations", os.getenv("ORACLE_PROMPT_VERSION") or None)
+PROMPT_VERSION = RECOMMENDATION_PROMPT.key
+# Characters extracted from an uploaded CV; the prompt gets a compacted,
+# token-budgeted version of this text (see cv_compaction.py)
+CV_CHAR_LIMIT = int(os.getenv("CV_CHAR_LIMIT", "20000"))
+# "json_schema" (structured outputs), "json_object" (JSON mode) or "none"
+RESPONSE_FORMAT = os.getenv("ORACLE_RESPONSE_FORMAT", "json_schema")
+# Extra LLM calls allowed when the output cannot be parsed or repaired
+PARSE_RETRIES = int(os.getenv("ORACLE_PARSE_RETRIES", "1"))
+# The prompt asks for 3-5 recommendations; used to report job progress
+EXPECTED_RECOMMENDATIONS = 5
+# Requests the degraded-mode share is measured over
+DEGRADED_WINDOW = int(os.getenv("ORACLE_DEGRADED_WINDOW", "200"))
+# Job messages of a reading served from the role index while the LLM is
+# unavailable, and of a streamed reading the LLM broke off
+DEGRADED_MESSAGE = "The Oracle's sight is clouded, so this reading comes from its index."
+PARTIAL_MESSAGE = "The Oracle's vision faded before it had revealed every path."
+# on_degraded() reasons
+INDEX = "index"
+PARTIAL = "partial"
+
+# Persistent recommendation cache shared across sessions and processes
+recommendation_cache = RecommendationCache()
+metrics.register_collector(lambda: [
+    (f"recommendation_cache_{name}", "gauge", {}, value) if name in ("entries", "hit_ratio")
+    else (f"recommendation_cache_{name}_total", "counter", {}, value)
+    for name, value in recommendation_cache.stats().items()
+])
+
+# Modes of the latest requests: "llm", "cache", "degraded" (role index), "static"
+# or "partial" (a stream the LLM broke off)
+_recent_modes = deque(maxlen=DEGRADED_WINDOW)
+metrics.register_collector(lambda: [
+    ("recommendation_degraded_share", "gauge", {},
+     sum(mode in ("degraded", "static", "partial") for mode in _recent_modes) / len(_recent_modes))
+] if _recent_modes else [])
+
+FALLBACK_RECOMMENDATIONS = [
+    {
+        "title": "Software Developer",
+        "description": "Develop and maintain software applications using modern programming languages and frameworks.",
+        "score": 7.5,
+        "suitability": "Good",
+        "salary_range": "$70,000 - $100,000",
+        "growth_potential": "High"
+    },
+    {
+        "title": "Data Analyst",
+        "description": "Analyze data to help organizations make informed business decisions and improve processes.",
+        "score": 7.0,
+        "suitability": "Good",
+        "salary_range": "$60,000 - $85,000",
+        "growth_potential": "High"
+    },
+    {
+        "title": "Project Manager",
+        "description": "Lead and coordinate projects, ensuring they are completed on time and within budget.",
+        "score": 6.5,
+        "suitability": "Fair",
+        "salary_range": "$75,000 - $110,000",
+        "growth_potential": "Medium"
+    }
+]
+
+
+def render_recommendation_prompt(cv_excerpt, personality_type):
+    """Render the recommendation prompt (messages and token count)"""
+    return RECOMMENDATION_PROMPT.render(cv_excerpt=cv_excerpt, personality_type=personality_type)
+
+
+def build_recommendation_messages(cv_excerpt, personality_type):
+    """Build the chat messages for a recommendation request"""
+    return render_recommendation_prompt(cv_excerpt, personality_type).messages
+
+
+def prepare_cv_excerpt(cv_text, token_budget=CV_TOKEN_BUDGET):
+    """Return the cleaned, token-budgeted CV text that goes into the prompt"""
+    compacted = compact_cv(cv_text, token_budget)
+    metrics.increment("cv_prompt_tokens_total", compacted.tokens)
+    metrics.increment("cv_tokens_saved_total", max(compacted.original_tokens - compacted.tokens, 0))
+    return compacted.text
+
+
+def request_params(model=MODEL_NAME, max_tokens=800):
+    """Return the chat completion parameters for recommendation requests"""
+    params = {"model": model, "max_tokens": max_tokens, "temperature": 0.7}
+    format_param = response_format(RESPONSE_FORMAT)
+    if format_param:
+        params["response_format"] = format_param
+    return params
+
+
+def _prepare_request(cv_text, personality_type):
+    """Return (rendered prompt, cache_key, cached recommendations or None, route)"""
+    with metrics.timer("prompt_build"):
+        cv_excerpt = prepare_cv_excerpt(cv_text)
+        prompt = render_recommendation_prompt(cv_excerpt, personality_type)
+    cache_key = make_cache_key(cv_excerpt, personality_type, MODEL_NAME, PROMPT_VERSION)
+    with metrics.timer("cache_lookup"):
+        cached = recommendation_cache.get(cache_key)
+    metrics.increment("recommendation_cache_lookups_total", result="miss" if cached is None else "hit")
+    route = None
+    if cached is None:
+        route = get_router().route(count_tokens(cv_excerpt))
+    return prompt, cache_key, cached, route
+
+
+def _record_mode(mode):
+    metrics.increment("recommendation_requests_total", mode=mode)
+    _recent_modes.append(mode)
+
+
+def degraded_recommendations(cv_text, personality_type):
+    """Recommendations computed locally from the role index, or the static list if that fails too"""
+    try:
+        recommendations = load_attr("role_index", "rank_roles")(cv_text, personality_type)
+    except Exception as e:
+        logger.warning("Falling back to static recommendations: %s", e)
+        metrics.increment("recommendation_fallbacks_total")
+        _record_mode("static")
+        return FALLBACK_RECOMMENDATIONS
+    _record_mode("degraded")
+    return recommendations
+
+
+def _degrade(error):
+    # An open circuit or a spent upstream budget is expected under load; don't log every request
+    if isinstance(error, (CircuitOpenError, RateLimited)):
+        logger.debug("Serving degraded recommendations: %s", error)
+    else:
+        logger.warning("Serving degraded recommendations: %s", error)
+
+
+def _parse(content):
+    """Parse model output, counting fast-path, repaired and failed parses"""
+    try:
+        with metrics.timer("json_parse"):
+            recommendations, repaired = parse_recommendations(content)
+    except RecommendationParseError:
+        metrics.increment("recommendation_parse_total", outcome="failed")
+        raise
+    metrics.increment("recommendation_parse_total", outcome="repaired" if repaired else "fast_path")
+    return recommendations
+
+
+def request_job_recommendations(cv_text, personality_type, session_id=None):
+    """Ask the Oracle for job recommendations, raising on any failure"""
+    
+    prompt, cache_key, cached, route = _prepare_request(cv_text, personality_type)
+    if cached is not None:
+        _record_mode("cache")
+        return cached
+    
+    attempt = 0
+    while True:
+        metrics.increment("recommendation_llm_calls_total")
+        response = get_router().complete(
+            prompt.messages, route, request_params(), session_id=session_id,
+            prompt_tokens=prompt.tokens, on_usage=functools.partial(record_usage, prompt.template)
+        )
+        try:
+            recommendations = _parse(response.choices[0].message.content)
+            break
+        except RecommendationParseError:
+            # Only re-query once the repair pass has also failed
+            if attempt >= PARSE_RETRIES:
+                raise
+            attempt += 1
+            metrics.increment("recommendation_requery_total")
+    
+    recommendation_cache.set(cache_key, recommendations)
+    _record_mode("llm")
+    return recommendations
+
+
+def generate_job_recommendations(cv_text, personality_type, session_id=None, on_degraded=None):
+    """Generate job recommendations based on CV and personality type
+
+    When the LLM fails (or its circuit is open) the recommendations come from
+    the local role index, and on_degraded(INDEX) is called.
+    """
+    try:
+        with metrics.timer("recommendation_request"):
+            return request_job_recommendations(cv_text, personality_type, session_id)
+    
+    except Exception as e:
+        _degrade(e)
+        if on_degraded:
+            on_degraded(INDEX)
+        return degraded_recommendations(cv_text, personality_type)
+
+
+def stream_job_recommendations(cv_text, personality_type, session_id=None, on_degraded=None):
+    """Yield job recommendations one by one as the Oracle streams them
+
+    When the LLM fails before the first card, the rest come from the role
+    index and on_degraded(INDEX) is called; when it fails after some cards,
+    those are kept (but not cached) and on_degraded(PARTIAL) is called.
+    """
+    
+    prompt, cache_key, cached, route = _prepare_request(cv_text, personality_type)
+    if cached is not None:
+        _record_mode("cache")
+        yield from cached
+        return
+    
+    recommendations = []
+    content = []
+    try:
+        metrics.increment("recommendation_llm_calls_total")
+        chunks = get_router().stream(
+            prompt.messages,
+            route,
+            request_params(),
+            session_id=session_id,
+            prompt_tokens=prompt.tokens,
+            on_usage=functools.partial(record_usage, prompt.template)
+        )
+        
+        def collect(chunks):
+            for chunk in chunks:
+                content.append(chunk)
+                yield chunk
+        
+        for job in iter_recommendations(collect(chunks)):
+            try:
+                job = validate_item(job)
+            except RecommendationParseError:
+                metrics.increment("recommendation_invalid_items_total")
+                continue
+            recommendations.append(job)
+            yield job
+        
+        if recommendations:
+            metrics.increment("recommendation_parse_total", outcome="fast_path")
+        else:
+            # Nothing usable streamed; try the repair pass on the whole output
+            recommendations = _parse("".join(content))
+            yield from recommendations
+        recommendation_cache.set(cache_key, recommendations)
+        _record_mode("llm")
+    
+    except Exception as e:
+        # Degrade to the role index, unless some cards were already revealed
+        _degrade(e)
+        if not recommendations:
+            if on_degraded:
+                on_degraded(INDEX)
+            yield from degraded_recommendations(cv_text, personality_type)
+        else:
+            _record_mode("partial")
+            if on_degraded:
+                on_degraded(PARTIAL)
+
+
+def run_recommendation_job(payload, job):
+    """Job queue handler: generate recommendations, publishing streamed cards as progress"""
+    cv_text = payload["cv_text"]
+    personality_type = payload["personality_type"]
+    session_id = payload.get("session_id")
+    # A flagged job tells the app what kind of fallback it got and is not
+    # shared with later identical submissions, which try the LLM again
+    def degraded(reason):
+        job.mark_degraded(reason)
+        job.progress(0.95, DEGRADED_MESSAGE if reason == INDEX else PARTIAL_MESSAGE)
+    
+    if not payload.get("stream", True):
+        return generate_job_recommendations(cv_text, personality_type, session_id, degraded)
+    
+    recommendations = []
+    was_degraded = []
+    stream = stream_job_recommendations(cv_text, personality_type, session_id, was_degraded.append)
+    try:
+        with metrics.timer("recommendation_stream"):
+            for job_item in stream:
+                recommendations.append(job_item)
+                job.progress(
+                    min(len(recommendations) / EXPECTED_RECOMMENDATIONS, 0.95),
+                    f"The Oracle has revealed {len(recommendations)} of its prophecies...",
+                    partial=recommendations
+                )
+                job.check_cancelled()
+    finally:
+        stream.close()
+    if was_degraded:
+        degraded(was_degraded[0])
+    return recommendations
+
+
+@singleton
+def recommendation_queue():
+    """Job queue that runs recommendation requests off the script thread
+
+    Built once per process: the app script re-executes on every rerun, so
+    a queue defined there would register its handler again each time.
+    """
+    queue = get_queue()
+    queue.register("recommendations", run_recommendation_job)
+    return queue
@@ -0,0 +1,420 @@
+"""Session result export and downloadable reports
+
+A session's results (personality, recommendations and trial outcomes) are
+collected into one dict and serialized in a small versioned format:
+
+    b"ORCR" + version byte + session_store.encode_value(results)
+
+Reports are rendered from that dict as HTML (string.Template, parsed once at
+import) or PDF (a minimal writer using the built-in Helvetica font), on the
+job queue rather than the script thread. Rendered reports are cached on disk
+by content digest, so identical results are rendered once.
+
+    python reports.py export --out results.jsonl     # every stored session, one JSON line each
+    python reports.py export --out results.orcr --binary
+    python reports.py render SESSION_ID --format pdf --out report.pdf
+
+The commands read the session store the app writes to, so they need the
+app's SESSION_STORE=sqlite or SESSION_STORE=redis settings; the default
+memory store lives inside the app process and cannot be exported.
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import struct
+import sys
+import textwrap
+import zlib
+from string import Template
+
+import metrics
+from job_queue import get_queue
+from lazy import singleton
+from session_store import SESSION_STORE, MemoryBackend, decode_value, encode_value, get_backend, load_session
+
+# Report configuration
+REPORT_CACHE_DIR = os.getenv(
+    "REPORT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "reports")
+)
+REPORT_CACHE_MAX_FILES = int(os.getenv("REPORT_CACHE_MAX_FILES", "2000"))
+
+MAGIC = b"ORCR"
+FORMAT_VERSION = 1
+# Bump when the templates or the PDF layout change, so cached reports are re-rendered
+RENDER_VERSION = "1"
+REPORT_FORMATS = ("html", "pdf")
+MIME_TYPES = {"html": "text/html", "pdf": "application/pdf"}
+
+
+class ReportFormatError(ValueError):
+    """Raised when a blob is not a report this version can read"""
+
+
+def _trial_results(data, index):
+    # Trial pages key their data by role index; JSON turns int keys into strings
+    if not isinstance(data, dict):
+        return None
+    return data.get(index, data.get(str(index)))
+
+
+def collect_results(state):
+    """Collect the results of a session from its state mapping
+
+    Only content goes in, so sessions with identical results share a digest
+    (one rendering job, one cached report); exports add the session id.
+    """
+    recommendations = state.get("job_recommendations") or []
+    roles = []
+    for index, job in enumerate(recommendations):
+        role = dict(job)
+        role["game_completed"] = bool(state.get(f"game_completed_{index}"))
+        role["interview_completed"] = bool(state.get(f"interview_completed_{index}"))
+        role["game_results"] = _trial_results(state.get("game_data"), index)
+        role["interview_results"] = _trial_results(state.get("interview_data"), index)
+        roles.append(role)
+    results = {
+        "personality_type": state.get("personality_type"),
+        "recommendation_source": state.get("recommendation_source"),
+        "roles": roles,
+    }
+    # Round-trip through JSON so digests and renders only see JSON types
+    return json.loads(json.dumps(results, ensure_ascii=False, default=str))
+
+
+def encode_report(results):
+    """Serialize results in the versioned export format"""
+    return MAGIC + bytes([FORMAT_VERSION]) + encode_value(results)
+
+
+def decode_report(blob):
+    """Inverse of encode_report"""
+    blob = bytes(blob)
+    if blob[:4] != MAGIC:
+        raise ReportFormatError("Not an Oracle report")
+    if blob[4] > FORMAT_VERSION:
+        raise ReportFormatError(f"Report format version {blob[4]} is newer than {FORMAT_VERSION}")
+    return decode_value(blob[5:])
+
+
+def report_digest(results):
+    """Content digest of results, shared by every rendering of them (and every session with them)"""
+    content = {key: value for key, value in results.items() if key != "session_id"}
+    payload = json.dumps([RENDER_VERSION, content], ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# HTML templates, parsed once
+PAGE_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>CareerOracle Report</title>
+<style>
+body { font-family: Helvetica, Arial, sans-serif; color: #343a40; max-width: 48rem; margin: 2rem auto; line-height: 1.5; }
+h1 { color: #495057; margin-bottom: 0; }
+.subtitle { color: #6c757d; margin-top: 0.25rem; }
+.role { border: 1px solid #dee2e6; border-radius: 12px; padding: 1rem 1.5rem; margin: 1.5rem 0; }
+.role h2 { margin: 0 0 0.5rem; color: #5a4fcf; }
+.facts { display: grid; grid-template-columns: 1fr 1fr; gap: 0.25rem 2rem; }
+.trial { background: #f8f9fa; border-radius: 8px; padding: 0.5rem 1rem; margin-top: 0.75rem; }
+table { border-collapse: collapse; } td { padding: 0.1rem 1rem 0.1rem 0; vertical-align: top; }
+</style>
+</head>
+<body>
+<h1>🔮 CareerOracle Report</h1>
+<p class="subtitle">Personality type: $personality_type · $source</p>
+$roles
+</body>
+</html>
+""")
+
+ROLE_TEMPLATE = Template("""<section class="role">
+<h2>$number. $title</h2>
+<p>$description</p>
+<div class="facts">
+<div><strong>Destiny Score:</strong> $score/10</div>
+<div><strong>Salary Range:</strong> $salary_range</div>
+<div><strong>Alignment Level:</strong> $suitability</div>
+<div><strong>Growth Potential:</strong> $growth_potential</div>
+</div>
+$trials
+</section>
+""")
+
+TRIAL_TEMPLATE = Template("""<div class="trial">
+<strong>$name:</strong> $status
+$details
+</div>
+""")
+
+TRIAL_NAMES = (("game", "Immersive Experience"), ("interview", "Mock Interview"))
+SOURCE_LABELS = {"oracle": "Oracle's reading", "index": "First glimpse from the role index"}
+
+
+def _score(value):
+    try:
+        return f"{float(value):.1f}"
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _details(data):
+    """Scalar fields of a trial's results as (label, text) pairs"""
+    if not isinstance(data, dict):
+        return []
+    return [
+        (str(key).replace("_", " ").capitalize(), _score(value) if isinstance(value, float) else str(value))
+        for key, value in data.items()
+        if isinstance(value, (str, int, float, bool)) and not str(key).startswith("_")
+    ]
+
+
+def _trials(role):
+    """(name, status, details) for each trial of a role"""
+    return [
+        (name, "Completed" if role.get(f"{key}_completed") else "Not taken", _details(role.get(f"{key}_results")))
+        for key, name in TRIAL_NAMES
+    ]
+
+
+def render_html(results):
+    """Render results as a standalone HTML page"""
+    escape = html.escape
+    roles = []
+    for number, role in enumerate(results.get("roles") or [], 1):
+        trials = "".join(
+            TRIAL_TEMPLATE.substitute(
+                name=escape(name),
+                status=escape(status),
+                details=("<table>" + "".join(
+                    f"<tr><td>{escape(label)}</td><td>{escape(text)}</td></tr>" for label, text in details
+                ) + "</table>") if details else ""
+            )
+            for name, status, details in _trials(role)
+        )
+        roles.append(ROLE_TEMPLATE.substitute(
+            number=number,
+            title=escape(str(role.get("title", ""))),
+            description=escape(str(role.get("description", ""))),
+            score=escape(_score(role.get("score", 0))),
+            salary_range=escape(str(role.get("salary_range", ""))),
+            suitability=escape(str(role.get("suitability", ""))),
+            growth_potential=escape(str(role.get("growth_potential", ""))),
+            trials=trials,
+        ))
+    return PAGE_TEMPLATE.substitute(
+        personality_type=escape(str(results.get("personality_type") or "Unknown")),
+        source=escape(SOURCE_LABELS.get(results.get("recommendation_source"), "Recommendations")),
+        roles="".join(roles) or "<p>No recommendations yet.</p>",
+    ).encode("utf-8")
+
+
+# PDF layout: US Letter, 11pt Helvetica
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+MARGIN = 56
+LINE_HEIGHT = 15
+WRAP_COLUMNS = 92
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LINE_HEIGHT
+
+
+def _report_lines(results):
+    """The report as (font, text) lines; font is "F1" (regular) or "F2" (bold)"""
+    lines = [("F2", "CareerOracle Report"),
+             ("F1", f"Personality type: {results.get('personality_type') or 'Unknown'}"),
+             ("F1", SOURCE_LABELS.get(results.get("recommendation_source"), "Recommendations")),
+             ("F1", "")]
+    for number, role in enumerate(results.get("roles") or [], 1):
+        lines.append(("F2", f"{number}. {role.get('title', '')}"))
+        lines.extend(("F1", text) for text in textwrap.wrap(str(role.get("description", "")), WRAP_COLUMNS))
+        lines.append(("F1", f"Destiny Score: {_score(role.get('score', 0))}/10    "
+                            f"Alignment Level: {role.get('suitability', '')}"))
+        lines.append(("F1", f"Salary Range: {role.get('salary_range', '')}    "
+                            f"Growth Potential: {role.get('growth_potential', '')}"))
+        for name, status, details in _trials(role):
+            lines.append(("F1", f"{name}: {status}"))
+            for label, text in details:
+                lines.extend(("F1", "    " + part) for part in textwrap.wrap(f"{label}: {text}", WRAP_COLUMNS - 4))
+        lines.append(("F1", ""))
+    return lines
+
+
+def _pdf_text(text):
+    # The standard fonts only cover Latin-1; anything else becomes "?"
+    encoded = text.encode("latin-1", errors="replace")
+    return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def render_pdf(results):
+    """Render results as a PDF document"""
+    lines = _report_lines(results)
+    pages = [lines[start:start + LINES_PER_PAGE] for start in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+    # Objects: 1 catalog, 2 page tree, 3-4 fonts, then a page and its content stream per page
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % (5 + 2 * i) for i in range(len(pages)))
+        + b"] /Count %d >>" % len(pages),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    for number, page in enumerate(pages):
+        content = [b"BT", b"%d TL" % LINE_HEIGHT, b"%d %d Td" % (MARGIN, PAGE_HEIGHT - MARGIN)]
+        for font, text in page:
+            content.append(b"/%s %d Tf (%s) Tj T*" % (font.encode("ascii"), 13 if font == "F2" else 11, _pdf_text(text)))
+        content.append(b"ET")
+        stream = zlib.compress(b"\n".join(content), 6)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>" % (PAGE_WIDTH, PAGE_HEIGHT, 6 + 2 * number))
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+RENDERERS = {"html": render_html, "pdf": render_pdf}
+
+
+def _cache_path(digest, fmt):
+    return os.path.join(REPORT_CACHE_DIR, f"{digest}.{fmt}")
+
+
+def cached_report(digest, fmt):
+    """Return the cached rendering of a digest, or None"""
+    try:
+        with open(_cache_path(digest, fmt), "rb") as report:
+            return report.read()
+    except OSError:
+        return None
+
+
+def _store(digest, fmt, data):
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    path = _cache_path(digest, fmt)
+    # Write then rename, so readers in other processes never see half a file
+    partial = f"{path}.{os.getpid()}.tmp"
+    with open(partial, "wb") as report:
+        report.write(data)
+    os.replace(partial, path)
+    entries = os.listdir(REPORT_CACHE_DIR)
+    if len(entries) > REPORT_CACHE_MAX_FILES:
+        # Drop the least recently written reports
+        entries.sort(key=lambda name: os.path.getmtime(os.path.join(REPORT_CACHE_DIR, name)))
+        for name in entries[:len(entries) - REPORT_CACHE_MAX_FILES]:
+            try:
+                os.remove(os.path.join(REPORT_CACHE_DIR, name))
+            except OSError:
+                pass
+
+
+def build_report(results, fmt, digest=None):
+    """Return results rendered as fmt, from the cache when possible"""
+    digest = digest or report_digest(results)
+    data = cached_report(digest, fmt)
+    metrics.increment("report_cache_lookups_total", format=fmt, result="miss" if data is None else "hit")
+    if data is None:
+        with metrics.timer("report_render", format=fmt):
+            data = RENDERERS[fmt](results)
+        _store(digest, fmt, data)
+    return data
+
+
+def run_report_job(payload, job):
+    """Job queue handler: render and cache every requested format of a report"""
+    results = payload["results"]
+    formats = payload.get("formats") or REPORT_FORMATS
+    digest = report_digest(results)
+    sizes = {}
+    for done, fmt in enumerate(formats):
+        job.check_cancelled()
+        sizes[fmt] = len(build_report(results, fmt, digest))
+        job.progress((done + 1) / len(formats), f"Rendered the {fmt.upper()} report")
+    return {"digest": digest, "sizes": sizes}
+
+
+@singleton
+def report_queue():
+    """Job queue that renders reports off the script thread, built once per process"""
+    queue = get_queue()
+    queue.register("reports", run_report_job)
+    return queue
+
+
+def iter_session_results(backend=None):
+    """Yield the results of every session in the session store"""
+    backend = backend or get_backend()
+    if backend is None:
+        return
+    for session_id in backend.session_ids():
+        state = load_session(session_id, backend)
+        if state.get("job_recommendations"):
+            yield dict(session_id=session_id, **collect_results(state))
+
+
+def export_results(path, backend=None, binary=False):
+    """Write every stored session's results to path; returns the number of sessions
+
+    JSON Lines by default; with binary=True, a sequence of length-prefixed
+    encode_report() records (see read_export()).
+    """
+    count = 0
+    with open(path, "wb") as out:
+        for results in iter_session_results(backend):
+            if binary:
+                record = encode_report(results)
+                out.write(struct.pack(">I", len(record)) + record)
+            else:
+                out.write(json.dumps(results, ensure_ascii=False).encode("utf-8") + b"\n")
+            count += 1
+    return count
+
+
+def read_export(path):
+    """Yield the results stored in a binary export"""
+    with open(path, "rb") as export:
+        while True:
+            header = export.read(4)
+            if not header:
+                return
+            (length,) = struct.unpack(">I", header)
+            yield decode_report(export.read(length))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export session results and render Oracle reports.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Export every stored session")
+    export.add_argument("--out", required=True)
+    export.add_argument("--binary", action="store_true", help="Length-prefixed versioned records instead of JSONL")
+    render = commands.add_parser("render", help="Render one stored session")
+    render.add_argument("session_id")
+    render.add_argument("--format", choices=REPORT_FORMATS, default="pdf")
+    render.add_argument("--out", required=True)
+    args = parser.parse_args(argv)
+
+    backend = get_backend()
+    if backend is None or isinstance(backend, MemoryBackend):
+        # A memory store belongs to the app process; this one would read an empty store of its own
+        sys.exit(f"SESSION_STORE={SESSION_STORE} keeps no sessions this command can read; "
+                 f"run it with the app's SESSION_STORE=sqlite or SESSION_STORE=redis settings")
+    if args.command == "export":
+        print(json.dumps({"sessions": export_results(args.out, backend, args.binary), "out": args.out}))
+        return
+    state = load_session(args.session_id, backend)
+    if not state:
+        sys.exit(f"No stored session '{args.session_id}'")
+    with open(args.out, "wb") as out:
+        out.write(build_report(collect_results(state), args.format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""Local role index for instant recommendations
+
+A catalog of role profiles is turned offline into hashed TF-IDF keyword
+vectors plus an MBTI affinity table (16 types x roles). Ranking an uploaded
+CV is then one matrix-vector product in NumPy, so a first set of
+recommendations shows in milliseconds; the LLM prophecy refines it.
+
+    python role_index.py build              # write role_index.npz
+    python role_index.py rank cv.txt "INTJ - The Architect"
+
+The index is rebuilt in memory when the file is missing or was built from
+an older catalog.
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import zlib
+
+import numpy as np
+
+import metrics
+from cv_compaction import clean_cv_text
+from lazy import singleton
+
+# Index configuration
+INDEX_PATH = os.getenv(
+    "ROLE_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "role_index.npz")
+)
+HASH_DIM = 1 << 14
+# Weight of the CV keyword match vs. the personality affinity in the score
+KEYWORD_WEIGHT = float(os.getenv("ROLE_INDEX_KEYWORD_WEIGHT", "0.7"))
+# Cosine similarity that counts as a full keyword match (a typical CV's best role is 0.06-0.1)
+FULL_MATCH = float(os.getenv("ROLE_INDEX_FULL_MATCH", "0.1"))
+# Lowest score labelled "Excellent"
+EXCELLENT_SCORE = 8
+# Highest score the index gives, always below EXCELLENT_SCORE: a keyword heuristic shouldn't claim
+# "Excellent" the way the LLM does
+MAX_SCORE = min(float(os.getenv("ROLE_INDEX_MAX_SCORE", "7.9")), EXCELLENT_SCORE - 0.1)
+
+MBTI_TYPES = ("INTJ", "INTP", "ENTJ", "ENTP", "INFJ", "INFP", "ENFJ", "ENFP",
+              "ISTJ", "ISFJ", "ESTJ", "ESFJ", "ISTP", "ISFP", "ESTP", "ESFP")
+
+# (title, family, salary range, growth potential, MBTI leaning, keywords, description)
+# MBTI leaning is (E, N, F, P) in [-1, 1]: +1 favours E/N/F/P, -1 favours I/S/T/J.
+ROLE_CATALOG = (
+    ("Software Engineer", "Technology", "$80,000 - $140,000", "High", (-0.4, 0.5, -0.6, 0.1),
+     "software engineer developer python java javascript typescript backend frontend api git code testing cloud aws",
+     "Design, build and maintain reliable software systems with a team of engineers."),
+    ("Site Reliability Engineer", "Technology", "$95,000 - $150,000", "High", (-0.5, 0.0, -0.7, -0.4),
+     "devops sre kubernetes docker linux monitoring on-call incident reliability infrastructure terraform aws",
+     "Keep production systems fast and available through automation, monitoring and incident response."),
+    ("Security Analyst", "Technology", "$75,000 - $125,000", "High", (-0.6, 0.1, -0.7, -0.5),
+     "security cybersecurity threat vulnerability penetration testing siem compliance risk network firewall",
+     "Protect systems and data by detecting threats, hardening infrastructure and responding to incidents."),
+    ("Solutions Architect", "Technology", "$110,000 - $170,000", "High", (0.2, 0.7, -0.6, -0.2),
+     "architecture solutions architect cloud aws azure integration design stakeholders enterprise systems",
+     "Translate business needs into technical designs and guide teams through complex implementations."),
+    ("Data Analyst", "Data", "$60,000 - $90,000", "High", (-0.5, -0.1, -0.6, -0.4),
+     "data analyst sql excel tableau power bi dashboards reporting analysis kpi visualization statistics",
+     "Turn data into reports and dashboards that help teams make better decisions."),
+    ("Data Scientist", "Data", "$95,000 - $150,000", "High", (-0.6, 0.7, -0.7, 0.2),
+     "data scientist machine learning python statistics modeling experimentation a/b testing pandas research",
+     "Build models and run experiments that uncover patterns and predict outcomes."),
+    ("Machine Learning Engineer", "Data", "$110,000 - $170,000", "High", (-0.6, 0.6, -0.8, 0.0),
+     "machine learning engineer deep learning pytorch tensorflow mlops deployment models python gpu",
+     "Take machine learning models from prototype to production at scale."),
+    ("UX Designer", "Design", "$70,000 - $115,000", "High", (0.0, 0.6, 0.5, 0.5),
+     "ux designer user experience figma wireframes prototyping usability research interaction design",
+     "Shape how products feel by researching users and designing intuitive experiences."),
+    ("Graphic Designer", "Design", "$45,000 - $75,000", "Medium", (-0.2, 0.5, 0.5, 0.7),
+     "graphic designer visual design branding adobe photoshop illustrator typography layout creative",
+     "Create visual identities, layouts and assets that communicate ideas clearly."),
+    ("UX Researcher", "Design", "$80,000 - $125,000", "High", (-0.3, 0.6, 0.4, 0.2),
+     "ux research user interviews usability testing surveys insights personas qualitative research",
+     "Understand users through interviews and studies, and turn insights into product direction."),
+    ("Product Manager", "Product", "$95,000 - $150,000", "High", (0.6, 0.6, -0.2, -0.2),
+     "product manager roadmap stakeholders strategy requirements agile backlog customers prioritization launch",
+     "Decide what to build and why, aligning customers, engineering and business goals."),
+    ("Project Manager", "Product", "$75,000 - $110,000", "Medium", (0.4, -0.4, -0.2, -0.8),
+     "project manager project management planning budget schedule risk stakeholders delivery pmp agile scrum",
+     "Lead projects to completion on time and within budget."),
+    ("Business Analyst", "Business", "$65,000 - $100,000", "Medium", (-0.1, -0.2, -0.5, -0.6),
+     "business analyst requirements process mapping stakeholders documentation sql analysis workflow",
+     "Bridge business and technology by analysing processes and defining requirements."),
+    ("Management Consultant", "Business", "$90,000 - $160,000", "High", (0.7, 0.6, -0.5, -0.3),
+     "consultant consulting strategy client presentations analysis transformation recommendations frameworks",
+     "Advise organisations on strategy and transformation through structured analysis."),
+    ("Operations Manager", "Business", "$70,000 - $110,000", "Medium", (0.5, -0.6, -0.4, -0.8),
+     "operations manager logistics process improvement lean six sigma supply chain efficiency team leadership",
+     "Run day-to-day operations and continuously improve how the organisation works."),
+    ("Entrepreneur", "Business", "$0 - $250,000", "High", (0.8, 0.7, -0.2, 0.8),
+     "founder entrepreneur startup business development fundraising growth sales strategy risk",
+     "Build a venture from an idea, taking on risk for the chance to create something new."),
+    ("Financial Analyst", "Finance", "$65,000 - $100,000", "Medium", (-0.5, -0.4, -0.7, -0.7),
+     "financial analyst finance modeling forecasting budgeting excel valuation accounting reporting variance",
+     "Model, forecast and report on financial performance to guide investment decisions."),
+    ("Accountant", "Finance", "$55,000 - $85,000", "Medium", (-0.6, -0.8, -0.5, -0.9),
+     "accountant accounting bookkeeping tax audit ledger reconciliation ifrs gaap cpa payroll",
+     "Keep financial records accurate, compliant and audit-ready."),
+    ("Marketing Specialist", "Marketing", "$55,000 - $85,000", "Medium", (0.7, 0.4, 0.3, 0.4),
+     "marketing campaigns social media content seo email brand digital marketing analytics",
+     "Plan and run campaigns that grow awareness and bring in customers."),
+    ("Content Strategist", "Marketing", "$60,000 - $95,000", "Medium", (0.0, 0.7, 0.5, 0.4),
+     "content writing editorial copywriting storytelling seo blog strategy communication",
+     "Tell the organisation's story through well-planned, well-written content."),
+    ("Sales Manager", "Sales", "$70,000 - $130,000", "High", (0.9, -0.2, 0.0, 0.1),
+     "sales manager quota pipeline negotiation crm clients revenue account management business development",
+     "Lead a sales team to build client relationships and hit revenue targets."),
+    ("Customer Success Manager", "Sales", "$60,000 - $95,000", "Medium", (0.7, -0.1, 0.7, -0.1),
+     "customer success onboarding retention relationships support accounts renewals satisfaction",
+     "Help customers get value from the product and keep them for the long term."),
+    ("Human Resources Manager", "People", "$65,000 - $105,000", "Medium", (0.6, 0.0, 0.7, -0.5),
+     "human resources hr recruiting talent employee relations onboarding policy training culture",
+     "Attract, develop and support the people who make the organisation work."),
+    ("Recruiter", "People", "$50,000 - $85,000", "Medium", (0.9, 0.0, 0.5, 0.2),
+     "recruiter recruitment sourcing interviewing talent acquisition candidates hiring networking",
+     "Find and hire the right people, from first contact to signed offer."),
+    ("Teacher", "Education", "$45,000 - $70,000", "Medium", (0.5, 0.0, 0.7, -0.4),
+     "teacher teaching classroom curriculum lesson planning students education mentoring assessment",
+     "Help students learn and grow through well-planned, engaging lessons."),
+    ("Instructional Designer", "Education", "$60,000 - $90,000", "Medium", (-0.2, 0.5, 0.4, -0.2),
+     "instructional design e-learning training curriculum learning management lms courses workshops",
+     "Design courses and training that make learning effective and engaging."),
+    ("Registered Nurse", "Healthcare", "$65,000 - $95,000", "High", (0.2, -0.7, 0.8, -0.6),
+     "nurse nursing patient care clinical hospital medication healthcare triage compassion",
+     "Provide hands-on patient care and support in clinical settings."),
+    ("Counselor", "Healthcare", "$45,000 - $75,000", "Medium", (-0.3, 0.5, 0.9, 0.0),
+     "counselor counselling therapy mental health psychology support wellbeing empathy listening",
+     "Support people through personal challenges with empathy and evidence-based practice."),
+    ("Physician", "Healthcare", "$180,000 - $300,000", "Medium", (-0.1, 0.1, 0.0, -0.6),
+     "physician doctor medicine diagnosis clinical patients treatment medical residency",
+     "Diagnose and treat patients using medical expertise and sound judgement."),
+    ("Mechanical Engineer", "Engineering", "$70,000 - $110,000", "Medium", (-0.5, -0.2, -0.7, -0.4),
+     "mechanical engineer cad solidworks design manufacturing prototyping thermodynamics testing",
+     "Design and test mechanical systems, from concept to manufacturing."),
+    ("Civil Engineer", "Engineering", "$70,000 - $105,000", "Medium", (-0.3, -0.5, -0.6, -0.7),
+     "civil engineer construction structural infrastructure autocad site planning regulations",
+     "Plan and oversee the building of infrastructure that communities depend on."),
+    ("Research Scientist", "Science", "$75,000 - $130,000", "Medium", (-0.8, 0.8, -0.6, 0.3),
+     "research scientist laboratory experiments publications phd analysis hypothesis grants",
+     "Advance knowledge through rigorous experiments, analysis and publication."),
+    ("Lawyer", "Legal", "$90,000 - $180,000", "Medium", (0.3, 0.2, -0.7, -0.6),
+     "lawyer legal law litigation contracts compliance counsel negotiation regulations",
+     "Advise clients and represent their interests in legal matters."),
+    ("Event Planner", "Hospitality", "$45,000 - $75,000", "Medium", (0.9, -0.3, 0.4, -0.3),
+     "event planning events coordination vendors logistics hospitality budgets weddings conferences",
+     "Plan and run events where every detail comes together on the day."),
+    ("Chef", "Hospitality", "$40,000 - $75,000", "Medium", (0.1, -0.4, 0.2, 0.6),
+     "chef cooking kitchen culinary menu food restaurant hospitality",
+     "Create dishes and run a kitchen that delivers consistently great food."),
+    ("Social Worker", "Social Services", "$45,000 - $70,000", "Medium", (0.3, 0.2, 0.9, -0.2),
+     "social worker community case management advocacy families welfare support services",
+     "Support individuals and families through difficult circumstances and connect them to services."),
+    ("Journalist", "Media", "$45,000 - $80,000", "Medium", (0.4, 0.6, 0.2, 0.7),
+     "journalist reporting writing news interviews editing media investigation storytelling",
+     "Investigate and tell stories that inform the public."),
+    ("Video Producer", "Media", "$50,000 - $90,000", "Medium", (0.2, 0.5, 0.3, 0.8),
+     "video producer filming editing premiere production storytelling content camera",
+     "Plan, shoot and edit video that captures attention and tells a story."),
+    ("Electrician", "Skilled Trades", "$50,000 - $85,000", "Medium", (-0.4, -0.9, -0.5, 0.2),
+     "electrician electrical wiring installation maintenance safety troubleshooting apprenticeship",
+     "Install and repair electrical systems safely and to code."),
+    ("Paramedic", "Emergency Services", "$45,000 - $70,000", "Medium", (0.4, -0.8, 0.2, 0.6),
+     "paramedic emergency medical response ambulance first aid trauma patient care",
+     "Respond to emergencies and provide urgent care under pressure."),
+)
+
+ROLE_TITLES = tuple(role[0] for role in ROLE_CATALOG)
+
+_TOKENS = re.compile(r"[a-z][a-z0-9+#/.-]*[a-z0-9+#]|[a-z]")
+
+
+def catalog_version(catalog=ROLE_CATALOG):
+    """Content hash of the catalog, stored in the index to detect stale files"""
+    return hashlib.sha256(json.dumps(catalog).encode("utf-8")).hexdigest()[:16]
+
+
+def tokenize(text):
+    """Lowercase word unigrams and bigrams"""
+    words = _TOKENS.findall(text.lower())
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+def hash_counts(tokens):
+    """Term counts of tokens in a HASH_DIM feature-hashed vector"""
+    if not tokens:
+        return np.zeros(HASH_DIM, dtype=np.float32)
+    indices = np.fromiter((zlib.crc32(token.encode("utf-8")) & (HASH_DIM - 1) for token in tokens),
+                          dtype=np.int64, count=len(tokens))
+    return np.bincount(indices, minlength=HASH_DIM).astype(np.float32)
+
+
+def _mbti_vector(personality_type):
+    code = (personality_type or "")[:4].upper()
+    if code not in MBTI_TYPES:
+        return None
+    return np.array([1 if code[0] == "E" else -1, 1 if code[1] == "N" else -1,
+                     1 if code[2] == "F" else -1, 1 if code[3] == "P" else -1], dtype=np.float32)
+
+
+def build_index(catalog=ROLE_CATALOG):
+    """Build the keyword matrix, IDF weights and MBTI affinity table"""
+    counts = np.stack([
+        hash_counts(tokenize(f"{title} {title} {family} {keywords} {keywords} {description}"))
+        for title, family, _, _, _, keywords, description in catalog
+    ])
+    document_frequency = (counts > 0).sum(axis=0)
+    idf = np.log((1 + len(catalog)) / (1 + document_frequency)).astype(np.float32) + 1
+    vectors = np.log1p(counts) * idf
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    # Affinity in [0, 1] for each of the 16 types and every role
+    leanings = np.array([role[4] for role in catalog], dtype=np.float32)
+    types = np.stack([_mbti_vector(code) for code in MBTI_TYPES])
+    affinity = (1 + types @ leanings.T / 4) / 2
+
+    return {
+        "vectors": vectors.astype(np.float32),
+        "idf": idf,
+        "affinity": affinity.astype(np.float32),
+        "version": np.array(catalog_version(catalog)),
+    }
+
+
+def save_index(index, path=INDEX_PATH):
+    np.savez_compressed(path, **index)
+
+
+def load_index(path=INDEX_PATH):
+    """Load the prebuilt index, or build it when missing or stale"""
+    try:
+        with np.load(path) as data:
+            if str(data["version"]) == catalog_version():
+                return {name: data[name] for name in data.files}
+    except (OSError, KeyError, ValueError):
+        pass
+    return build_index()
+
+
+@singleton
+def get_index():
+    """Return the role index, loaded on first use"""
+    return load_index()
+
+
+def _suitability(score):
+    if score >= EXCELLENT_SCORE:
+        return "Excellent"
+    if score >= 6.5:
+        return "Good"
+    if score >= 5:
+        return "Fair"
+    return "Poor"
+
+
+def _display_score(score):
+    # [0, 1] -> 4..MAX_SCORE, the low end of the LLM's scale
+    return round(float(4 + (MAX_SCORE - 4) * score), 1)
+
+
+def _role_scores(cv_texts, personality_type, index):
+    # Scores in [0, 1] of every catalog role (columns) for each CV (rows)
+    vectors = np.stack([np.log1p(hash_counts(tokenize(clean_cv_text(text or "")))) for text in cv_texts]) * index["idf"]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    similarity = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0) @ index["vectors"].T
+    # Relative to each CV's best match, so a long CV isn't penalised for diluting its keywords,
+    # but never below FULL_MATCH: a CV that barely matches any role (or is empty) scores low
+    best = np.maximum(similarity.max(axis=1, keepdims=True), FULL_MATCH)
+    keyword_score = similarity / best
+
+    mbti = _mbti_vector(personality_type)
+    if mbti is None:
+        return keyword_score
+    affinity = index["affinity"][MBTI_TYPES.index((personality_type or "")[:4].upper())]
+    return KEYWORD_WEIGHT * keyword_score + (1 - KEYWORD_WEIGHT) * affinity
+
+
+def rank_roles(cv_text, personality_type, limit=5):
+    """Return up to limit recommendations for a CV, best first, one per role family
+
+    The result has the same shape as the LLM recommendations.
+    """
+    with metrics.timer("role_index_rank"):
+        scores = _role_scores([cv_text], personality_type, get_index())[0]
+
+        recommendations = []
+        families = set()
+        for role in np.argsort(-scores, kind="stable"):
+            title, family, salary_range, growth, _, _, description = ROLE_CATALOG[role]
+            if family in families:
+                continue
+            families.add(family)
+            score = _display_score(scores[role])
+            recommendations.append({
+                "title": title,
+                "description": description,
+                "score": score,
+                "suitability": _suitability(score),
+                "salary_range": salary_range,
+                "growth_potential": growth,
+            })
+            if len(recommendations) == limit:
+                break
+    metrics.increment("role_index_rankings_total")
+    return recommendations
+
+
+def score_roles(cv_texts, personality_type, titles):
+    """Score catalog roles for many CVs at once: one {title: score} dict per CV
+
+    Scores use rank_roles' scale (4 to MAX_SCORE); titles must be in ROLE_CATALOG.
+    """
+    columns = [ROLE_TITLES.index(title) for title in titles]
+    with metrics.timer("role_index_score"):
+        scores = _role_scores(cv_texts, personality_type, get_index())[:, columns] if cv_texts else []
+    return [{title: _display_score(score) for title, score in zip(titles, row)} for row in scores]
+
+
+if __name__ == "__main__":
+    # python role_index.py build | rank CV_TEXT_FILE PERSONALITY_TYPE
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if command == "build":
+        started = time.perf_counter()
+        save_index(build_index())
+        print(f"Wrote {INDEX_PATH} ({len(ROLE_CATALOG)} roles) in {(time.perf_counter() - started) * 1000:.1f} ms")
+    elif command == "rank":
+        with open(sys.argv[2], encoding="utf-8") as cv_file:
+            cv_text = cv_file.read()
+        started = time.perf_counter()
+        ranked = rank_roles(cv_text, sys.argv[3] if len(sys.argv) > 3 else None)
+        print(json.dumps(ranked, indent=2))
+        print(f"Ranked in {(time.perf_counter() - started) * 1000:.2f} ms", file=sys.stderr)
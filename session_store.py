@@ -0,0 +1,487 @@
+"""Externalized session state
+
+Streamlit keeps st.session_state in the memory of one server process, so a
+restart or a load balancer sending a user to another replica loses it. The
+store keeps the persistent subset of a session under a session id carried
+in the URL (?sid=...):
+
+    SESSION_STORE=memory   per-process store (default; survives browser reconnects)
+    SESSION_STORE=sqlite   file shared by every process on the host (SESSION_STORE_PATH)
+    SESSION_STORE=redis    shared by every replica (SESSION_STORE_URL, requires redis-py)
+    SESSION_STORE=none     disabled
+
+Values are stored per key as compact JSON, zlib-compressed above a size
+threshold. Keys are loaded only when a page asks for them and written back
+only when their content changed.
+
+The ?sid= link holds the CV text of a session, so it is signed with
+SESSION_SECRET (by default a random secret in .cache/session_secret,
+shared by the processes of one host; set the same value on every replica)
+and bound to the client's User-Agent (SESSION_BINDING: "user-agent", "ip",
+"user-agent,ip" or "none"). A link opened by another browser, or without
+a valid signature, starts a new session. The link is still a bearer
+token within its binding: anyone who gets it and uses the same browser
+(and IP, if bound) can open the session until it expires (SESSION_TTL).
+
+    python session_store.py purge    # delete expired sessions (sqlite)
+"""
+import fnmatch
+import hashlib
+import hmac
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import secrets
+import time
+import zlib
+
+import metrics
+from lazy import singleton
+
+logger = logging.getLogger(__name__)
+
+# Store configuration
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_STORE_PATH = os.getenv(
+    "SESSION_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "sessions.sqlite3")
+)
+SESSION_STORE_URL = os.getenv("SESSION_STORE_URL", "redis://localhost:6379/0")
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL", str(7 * 24 * 3600)))
+COMPRESS_THRESHOLD = int(os.getenv("SESSION_COMPRESS_THRESHOLD", "512"))
+SESSION_SECRET = os.getenv("SESSION_SECRET", "")
+SESSION_SECRET_PATH = os.path.join(os.path.dirname(SESSION_STORE_PATH), "session_secret")
+SESSION_BINDING = [part.strip() for part in os.getenv("SESSION_BINDING", "user-agent").split(",")
+                   if part.strip() not in ("", "none")]
+# Seconds between two sweeps of expired sessions in the memory backend
+MEMORY_SWEEP_INTERVAL = 60
+
+# Session state keys that are persisted ("*" matches any suffix). Widget keys
+# other than selectboxes can't be assigned, and "_" keys are derived caches.
+PERSISTED_KEYS = (
+    "current_page", "selected_role_index", "personality_type", "personality_selector",
+    "cv_text", "cv_file_id", "job_recommendations", "recommendation_source",
+    "recommendation_job", "game_data", "interview_data",
+    "game_completed_*", "interview_completed_*", "comparison_*",
+)
+
+# Bookkeeping kept in st.session_state (not persisted): session id, content
+# digests of the stored keys and stored keys that haven't been loaded yet
+TRACKING_KEY = "_session_store"
+
+_RAW = b"\x00"
+_ZLIB = b"\x01"
+
+
+def _dump(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _pack(raw):
+    if len(raw) >= COMPRESS_THRESHOLD:
+        return _ZLIB + zlib.compress(raw, 6)
+    return _RAW + raw
+
+
+def _unpack(blob):
+    blob = bytes(blob)
+    return zlib.decompress(blob[1:]) if blob[:1] == _ZLIB else blob[1:]
+
+
+def encode_value(value):
+    """Serialize a value as compact JSON, compressed when large"""
+    return _pack(_dump(value))
+
+
+def decode_value(blob):
+    """Inverse of encode_value"""
+    return json.loads(_unpack(blob).decode("utf-8"))
+
+
+def matches(key, patterns):
+    """Return True if key matches one of the PERSISTED_KEYS-style patterns"""
+    return any(fnmatch.fnmatchcase(key, pattern) for pattern in patterns)
+
+
+class MemoryBackend:
+    """Process-local backend; also the stand-in for the shared backends in tests"""
+
+    def __init__(self, ttl_seconds=SESSION_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+
+    def _live(self, session_id):
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        if self.ttl_seconds and time.time() - entry["touched"] > self.ttl_seconds:
+            del self._sessions[session_id]
+            return None
+        return entry
+
+    def session_ids(self):
+        with self._lock:
+            return [session_id for session_id in list(self._sessions) if self._live(session_id)]
+
+    def keys(self, session_id):
+        with self._lock:
+            entry = self._live(session_id)
+            return list(entry["values"]) if entry else []
+
+    def get(self, session_id, key):
+        with self._lock:
+            entry = self._live(session_id)
+            return entry["values"].get(key) if entry else None
+
+    def set_many(self, session_id, values):
+        with self._lock:
+            entry = self._live(session_id)
+            if entry is None:
+                entry = self._sessions[session_id] = {"values": {}, "touched": 0.0}
+            entry["values"].update(values)
+            entry["touched"] = now = time.time()
+            # Sessions nobody reads again would otherwise stay in memory for good
+            if now - self._last_sweep > MEMORY_SWEEP_INTERVAL:
+                self._last_sweep = now
+                self._purge_expired()
+
+    def _purge_expired(self):
+        # _live() drops the expired ones
+        expired = [session_id for session_id in list(self._sessions) if self._live(session_id) is None]
+        return len(expired)
+
+    def purge_expired(self):
+        """Delete expired sessions and return how many were removed"""
+        with self._lock:
+            return self._purge_expired()
+
+    def delete(self, session_id, keys):
+        with self._lock:
+            entry = self._live(session_id)
+            if entry:
+                for key in keys:
+                    entry["values"].pop(key, None)
+
+    def clear(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteBackend:
+    """Backend in a SQLite file shared by every process on the host"""
+
+    def __init__(self, path=SESSION_STORE_PATH, ttl_seconds=SESSION_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS session_state (
+                            session_id TEXT NOT NULL,
+                            key TEXT NOT NULL,
+                            value BLOB NOT NULL,
+                            updated_at REAL NOT NULL,
+                            PRIMARY KEY (session_id, key)
+                        )
+                    """)
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_session_state_updated_at ON session_state(updated_at)")
+                    self._initialized = True
+        return conn
+
+    def _cutoff(self):
+        return time.time() - self.ttl_seconds if self.ttl_seconds else 0
+
+    def session_ids(self):
+        rows = self._connect().execute(
+            "SELECT DISTINCT session_id FROM session_state WHERE updated_at >= ?", (self._cutoff(),)
+        ).fetchall()
+        return [session_id for (session_id,) in rows]
+
+    def keys(self, session_id):
+        rows = self._connect().execute(
+            "SELECT key FROM session_state WHERE session_id = ? AND updated_at >= ?", (session_id, self._cutoff())
+        ).fetchall()
+        return [key for (key,) in rows]
+
+    def get(self, session_id, key):
+        row = self._connect().execute(
+            "SELECT value FROM session_state WHERE session_id = ? AND key = ? AND updated_at >= ?",
+            (session_id, key, self._cutoff())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_many(self, session_id, values):
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO session_state (session_id, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                [(session_id, key, sqlite3.Binary(blob), now) for key, blob in values.items()]
+            )
+            # Any write keeps the whole session alive
+            conn.execute("UPDATE session_state SET updated_at = ? WHERE session_id = ?", (now, session_id))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, session_id, keys):
+        self._connect().executemany(
+            "DELETE FROM session_state WHERE session_id = ? AND key = ?", [(session_id, key) for key in keys]
+        )
+
+    def clear(self, session_id):
+        self._connect().execute("DELETE FROM session_state WHERE session_id = ?", (session_id,))
+
+    def purge_expired(self):
+        """Delete expired sessions and return the number of removed rows"""
+        return self._connect().execute("DELETE FROM session_state WHERE updated_at < ?", (self._cutoff(),)).rowcount
+
+
+class RedisBackend:
+    """Backend in Redis (or any server speaking its protocol), one hash per session
+
+    client can be any object with the redis-py hash/pipeline API, such as a
+    fakeredis instance.
+    """
+
+    def __init__(self, url=SESSION_STORE_URL, ttl_seconds=SESSION_TTL_SECONDS, client=None, prefix="oracle:session:"):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def _name(self, session_id):
+        return self.prefix + session_id
+
+    def session_ids(self):
+        for name in self.client.scan_iter(match=self.prefix + "*"):
+            name = name.decode("utf-8") if isinstance(name, bytes) else name
+            yield name[len(self.prefix):]
+
+    def keys(self, session_id):
+        return [key.decode("utf-8") if isinstance(key, bytes) else key
+                for key in self.client.hkeys(self._name(session_id))]
+
+    def get(self, session_id, key):
+        return self.client.hget(self._name(session_id), key)
+
+    def set_many(self, session_id, values):
+        name = self._name(session_id)
+        pipeline = self.client.pipeline()
+        pipeline.hset(name, mapping=values)
+        if self.ttl_seconds:
+            pipeline.expire(name, self.ttl_seconds)
+        pipeline.execute()
+
+    def delete(self, session_id, keys):
+        if keys:
+            self.client.hdel(self._name(session_id), *keys)
+
+    def clear(self, session_id):
+        self.client.delete(self._name(session_id))
+
+
+@singleton
+def get_backend():
+    """Return the configured backend, or None when SESSION_STORE=none"""
+    if SESSION_STORE == "none":
+        return None
+    if SESSION_STORE == "sqlite":
+        return SQLiteBackend()
+    if SESSION_STORE == "redis":
+        return RedisBackend()
+    if SESSION_STORE != "memory":
+        logger.warning("Unknown SESSION_STORE '%s', using memory", SESSION_STORE)
+    return MemoryBackend()
+
+
+@singleton
+def _secret():
+    if SESSION_SECRET:
+        return SESSION_SECRET.encode("utf-8")
+    os.makedirs(os.path.dirname(SESSION_SECRET_PATH), exist_ok=True)
+    try:
+        # The first process on the host creates the secret, readable by its user only
+        descriptor = os.open(SESSION_SECRET_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    else:
+        with os.fdopen(descriptor, "w") as secret_file:
+            secret_file.write(secrets.token_hex(32))
+    with open(SESSION_SECRET_PATH, encoding="utf-8") as secret_file:
+        return secret_file.read().strip().encode("utf-8")
+
+
+def client_info():
+    """Return (request headers, peer IP) of the current Streamlit session's connection, or ({}, None)"""
+    try:
+        from streamlit import runtime
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx()
+        request = runtime.get_instance().get_client(ctx.session_id).request
+        return dict(request.headers), request.remote_ip
+    except Exception:
+        return {}, None
+
+
+def client_binding(headers, ip, binding=SESSION_BINDING):
+    """The parts of a client a session link is bound to, as one string"""
+    headers = {name.lower(): value for name, value in (headers or {}).items()}
+    parts = {"user-agent": headers.get("user-agent", ""), "ip": ip or ""}
+    return "\n".join(parts.get(part, "") for part in binding)
+
+
+def _signature(session_id, client):
+    message = f"{session_id}\n{client}".encode("utf-8")
+    return hmac.new(_secret(), message, hashlib.sha256).hexdigest()[:32]
+
+
+def sign_session_id(session_id, client=""):
+    """Return the ?sid= token of a session: its id and a signature binding it to client"""
+    return f"{session_id}.{_signature(session_id, client)}"
+
+
+def verify_session_token(token, client=""):
+    """Return the session id of a ?sid= token signed for client, or None"""
+    session_id, _, signature = (token or "").partition(".")
+    if not session_id or not hmac.compare_digest(signature, _signature(session_id, client)):
+        if token:
+            metrics.increment("session_links_rejected_total")
+        return None
+    return session_id
+
+
+def _digest(raw):
+    return hashlib.blake2b(raw, digest_size=16).digest()
+
+
+def _tracking(state, session_id):
+    tracking = state.get(TRACKING_KEY)
+    if tracking is None or tracking["id"] != session_id:
+        tracking = {"id": session_id, "digests": {}, "unloaded": None}
+        state[TRACKING_KEY] = tracking
+    return tracking
+
+
+def restore_session_state(state, session_id, keys=PERSISTED_KEYS, backend=None):
+    """Load stored keys matching the keys patterns into state
+
+    Keys already in state are left alone, and stored keys outside the
+    patterns stay unloaded (and are not overwritten) until a later call asks
+    for them. Returns the names of the keys loaded.
+    """
+    backend = backend or get_backend()
+    if backend is None or not session_id:
+        return []
+    tracking = _tracking(state, session_id)
+    loaded = []
+    try:
+        with metrics.timer("session_restore"):
+            if tracking["unloaded"] is None:
+                tracking["unloaded"] = {key for key in backend.keys(session_id) if matches(key, PERSISTED_KEYS)}
+            for key in sorted(tracking["unloaded"]):
+                if not matches(key, keys):
+                    continue
+                tracking["unloaded"].discard(key)
+                if key in state:
+                    continue
+                blob = backend.get(session_id, key)
+                if blob is None:
+                    continue
+                raw = _unpack(blob)
+                state[key] = json.loads(raw.decode("utf-8"))
+                tracking["digests"][key] = _digest(raw)
+                loaded.append(key)
+    except Exception as e:
+        # An unavailable store must never break the Oracle; the session just isn't restored
+        logger.warning("Session state restore failed: %s", e)
+    metrics.increment("session_store_loads_total", len(loaded))
+    return loaded
+
+
+def load_session(session_id, backend=None):
+    """Return every stored key of a session as a dict (for exports; the app uses restore_session_state)"""
+    backend = backend or get_backend()
+    if backend is None:
+        return {}
+    state = {}
+    for key in backend.keys(session_id):
+        blob = backend.get(session_id, key)
+        if blob is not None:
+            state[key] = decode_value(blob)
+    return state
+
+
+def persist_session_state(state, session_id, backend=None):
+    """Write changed persistent keys of state back to the store
+
+    Returns the names of the keys written.
+    """
+    backend = backend or get_backend()
+    if backend is None or not session_id:
+        return []
+    tracking = _tracking(state, session_id)
+    unloaded = tracking["unloaded"] or set()
+    digests = tracking["digests"]
+    changed = {}
+    new_digests = {}
+    try:
+        with metrics.timer("session_persist"):
+            present = set()
+            for key in list(state.keys()):
+                if key.startswith("_") or key in unloaded or not matches(key, PERSISTED_KEYS):
+                    continue
+                present.add(key)
+                raw = _dump(state[key])
+                digest = _digest(raw)
+                if digests.get(key) != digest:
+                    # Only changed keys pay for compression and the round trip
+                    changed[key] = _pack(raw)
+                    new_digests[key] = digest
+            removed = [key for key in digests if key not in present]
+            if changed:
+                backend.set_many(session_id, changed)
+            if removed:
+                backend.delete(session_id, removed)
+    except Exception as e:
+        logger.warning("Session state persist failed: %s", e)
+        return []
+    digests.update(new_digests)
+    for key in removed:
+        digests.pop(key, None)
+    metrics.increment("session_store_writes_total", len(changed))
+    return list(changed)
+
+
+if __name__ == "__main__":
+    # python session_store.py purge
+    command = sys.argv[1] if len(sys.argv) > 1 else "purge"
+    if command == "purge" and SESSION_STORE == "sqlite":
+        print(json.dumps({"purged": SQLiteBackend().purge_expired()}))
+    else:
+        print(f"Nothing to do for '{command}' with SESSION_STORE={SESSION_STORE}")
@@ -0,0 +1,88 @@
+import types
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from llm_pool import DeadlineExceeded
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A manual monotonic clock for the breaker module"""
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def fail(breaker, count=1, error=None):
+    for _ in range(count):
+        breaker.before()
+        breaker.failure(error or DeadlineExceeded("timed out"))
+
+
+def test_opens_after_consecutive_upstream_failures(clock):
+    breaker = CircuitBreaker("test", failures=3, reset_seconds=30)
+    fail(breaker, 2)
+    assert breaker.state == CLOSED
+    fail(breaker)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker("test", failures=3)
+    fail(breaker, 2)
+    breaker.before()
+    breaker.success()
+    fail(breaker, 2)
+    assert breaker.state == CLOSED
+
+
+def test_rejected_requests_say_nothing_about_the_backend(clock):
+    breaker = CircuitBreaker("test", failures=2)
+    fail(breaker, 5, error=ValueError("bad request"))
+    assert breaker.state == CLOSED
+    assert breaker.consecutive_failures == 0
+
+
+def test_half_open_probe_success_closes(clock):
+    breaker = CircuitBreaker("test", failures=1, reset_seconds=30, probes=1)
+    fail(breaker)
+    clock[0] += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+    clock[0] += 1
+    breaker.before()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+    breaker.success()
+    assert breaker.state == CLOSED
+    breaker.before()
+
+
+def test_half_open_probe_failure_opens_again(clock):
+    breaker = CircuitBreaker("test", failures=3, reset_seconds=30)
+    fail(breaker, 3)
+    clock[0] += 30
+    fail(breaker)
+    assert breaker.state == OPEN
+    assert breaker.stats()["opened"] == 2
+    # The reset period starts over from the failed probe
+    clock[0] += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+
+
+def test_released_probe_lets_the_next_call_probe(clock):
+    breaker = CircuitBreaker("test", failures=1, reset_seconds=30, probes=1)
+    fail(breaker)
+    clock[0] += 30
+    breaker.before()
+    breaker.release()
+    breaker.before()
+    assert breaker.state == HALF_OPEN
@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+from job_queue import CANCELLED, DONE, FAILED, RUNNING, JobQueue
+
+
+def wait_for(queue, job_id, statuses=(DONE, FAILED, CANCELLED), timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        assert time.monotonic() < deadline, f"job stuck in {job['status']}"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(path=str(tmp_path / "jobs.sqlite3"), workers=2, result_ttl=60)
+    yield queue
+    queue._executor.shutdown(wait=True)
+
+
+@pytest.fixture
+def gate():
+    """An event the handlers wait on, so a test decides when jobs finish"""
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def register_echo(queue, gate, calls):
+    def handler(payload, job):
+        calls.append(payload)
+        job.progress(0.5, "halfway", partial=[payload["value"]])
+        while not gate.wait(0.01):
+            job.check_cancelled()
+        if payload.get("degraded"):
+            job.mark_degraded("index")
+        return {"value": payload["value"]}
+
+    queue.register("echo", handler)
+
+
+def test_identical_submissions_share_one_job(queue, gate):
+    calls = []
+    register_echo(queue, gate, calls)
+    first = queue.submit("echo", {"value": 1}, dedup_key="k", session_id="a")
+    second = queue.submit("echo", {"value": 1}, dedup_key="k", session_id="b")
+    assert first == second
+    other = queue.submit("echo", {"value": 2}, dedup_key="other")
+    assert other != first
+    gate.set()
+    assert wait_for(queue, first)["result"] == {"value": 1}
+    # A finished job is still shared within the result TTL
+    assert queue.submit("echo", {"value": 1}, dedup_key="k") == first
+    assert len(calls) == 2
+
+
+def test_progress_and_partial_results_are_visible(queue, gate):
+    register_echo(queue, gate, [])
+    job_id = queue.submit("echo", {"value": 3})
+    job = wait_for(queue, job_id, statuses=(RUNNING,))
+    deadline = time.monotonic() + 5
+    while job["partial"] is None and time.monotonic() < deadline:
+        job = queue.get(job_id)
+    assert (job["progress"], job["message"], job["partial"]) == (0.5, "halfway", [3])
+    gate.set()
+    assert wait_for(queue, job_id)["progress"] == 1.0
+
+
+def test_results_expire_after_the_ttl(tmp_path, gate):
+    queue = JobQueue(path=str(tmp_path / "jobs.sqlite3"), workers=1, result_ttl=0.2)
+    register_echo(queue, gate, [])
+    gate.set()
+    first = queue.submit("echo", {"value": 1}, dedup_key="k")
+    wait_for(queue, first)
+    time.sleep(0.3)
+    assert queue.submit("echo", {"value": 1}, dedup_key="k") != first
+    assert queue.purge() == 1
+    assert queue.get(first) is None
+    queue._executor.shutdown(wait=True)
+
+
+def test_degraded_results_are_returned_but_never_reused(queue, gate):
+    register_echo(queue, gate, [])
+    gate.set()
+    first = queue.submit("echo", {"value": 1, "degraded": True}, dedup_key="k")
+    job = wait_for(queue, first)
+    assert (job["status"], job["degraded"], job["result"]) == (DONE, "index", {"value": 1})
+    assert queue.submit("echo", {"value": 1, "degraded": True}, dedup_key="k") != first
+
+
+def test_cancel_detaches_a_session_until_the_last_one_leaves(queue, gate):
+    register_echo(queue, gate, [])
+    job_id = queue.submit("echo", {"value": 1}, dedup_key="k", session_id="a")
+    queue.submit("echo", {"value": 1}, dedup_key="k", session_id="b")
+    assert queue.cancel(job_id, "a") is False
+    assert queue.get(job_id)["status"] != CANCELLED
+    assert queue.cancel(job_id, "b") is True
+    assert wait_for(queue, job_id)["status"] == CANCELLED
+    # A cancelled job isn't shared: asking again starts over
+    assert queue.submit("echo", {"value": 1}, dedup_key="k", session_id="a") != job_id
+
+
+def test_cancel_without_a_session_stops_the_job(queue, gate):
+    register_echo(queue, gate, [])
+    job_id = queue.submit("echo", {"value": 1}, dedup_key="k", session_id="a")
+    assert queue.cancel(job_id) is True
+    assert wait_for(queue, job_id)["status"] == CANCELLED
+
+
+def test_failed_jobs_report_the_error(queue):
+    def handler(payload, job):
+        raise RuntimeError("boom")
+
+    queue.register("broken", handler)
+    job = wait_for(queue, queue.submit("broken", {}))
+    assert (job["status"], job["error"]) == (FAILED, "boom")
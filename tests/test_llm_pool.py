@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from llm_pool import DeadlineExceeded, FairLimiter, LLMPool
+
+
+def test_fair_limiter_hands_slots_to_sessions_in_turn():
+    async def scenario():
+        limiter = FairLimiter(1)
+        order = []
+        await limiter.acquire("holder")
+
+        async def call(session_id, name):
+            await limiter.acquire(session_id)
+            order.append(name)
+            await asyncio.sleep(0)
+            limiter.release()
+
+        tasks = [asyncio.ensure_future(call("a", f"a{index}")) for index in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(call("b", "b0")))
+        await asyncio.sleep(0)
+        assert limiter.queued == 4
+        limiter.release()
+        await asyncio.gather(*tasks)
+        assert limiter.active == 0
+        return order
+
+    assert asyncio.run(scenario()) == ["a0", "b0", "a1", "a2"]
+
+
+def test_fair_limiter_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        limiter = FairLimiter(1)
+        await limiter.acquire("a")
+        waiter = asyncio.ensure_future(limiter.acquire("b"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert limiter.queued == 0
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(scenario())
+
+
+class FakeCompletions:
+    """Stands in for client.chat.completions: answers after delay, counting calls and cancellations"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = 0
+
+    async def create(self, **params):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return {"answer": params["messages"][0]["content"]}
+
+
+@pytest.fixture
+def make_pool(monkeypatch):
+    # The real client is built (then replaced) when the pool's loop starts
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    def make(delay, max_concurrency=2):
+        pool = LLMPool(max_concurrency=max_concurrency, max_retries=0)
+        pool._ensure_loop()
+        completions = FakeCompletions(delay)
+        pool._client = type("Client", (), {"chat": type("Chat", (), {"completions": completions})()})()
+        return pool, completions
+    return make
+
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def test_identical_requests_share_one_upstream_call(make_pool):
+    pool, completions = make_pool(delay=0.2)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool.complete(MESSAGES, model="m")))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [{"answer": "hello"}] * 3
+    assert completions.calls == 1
+    assert pool.counters["coalesced"] == 2
+
+
+def test_abandoned_call_is_cancelled_and_frees_its_slot(make_pool):
+    pool, completions = make_pool(delay=5)
+    with pytest.raises(DeadlineExceeded):
+        pool.complete(MESSAGES, deadline=0.05, model="m")
+    wait_until(lambda: completions.cancelled == 1)
+    assert pool.stats()["in_flight"] == 0
+    assert pool._inflight == {}
+
+
+def test_shared_call_outlives_a_caller_that_gives_up(make_pool):
+    pool, completions = make_pool(delay=0.3)
+    results = []
+    patient = threading.Thread(target=lambda: results.append(pool.complete(MESSAGES, deadline=5, model="m")))
+    patient.start()
+    wait_until(lambda: completions.calls == 1)
+    with pytest.raises(DeadlineExceeded):
+        pool.complete(MESSAGES, deadline=0.05, model="m")
+    patient.join()
+    assert results == [{"answer": "hello"}]
+    assert completions.calls == 1
+    assert completions.cancelled == 0
+
+
+def test_request_after_cancellation_starts_a_new_call(make_pool):
+    pool, completions = make_pool(delay=0.2)
+    with pytest.raises(DeadlineExceeded):
+        pool.complete(MESSAGES, deadline=0.02, model="m")
+    assert pool.complete(MESSAGES, deadline=5, model="m") == {"answer": "hello"}
+    assert completions.calls == 2
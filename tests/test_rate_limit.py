@@ -0,0 +1,126 @@
+import types
+
+import pytest
+
+import rate_limit
+from rate_limit import Limit, RateLimited, RateLimiter, caller_from_headers
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A manual clock for the rate limit module; sleeping advances it"""
+    now = [1_000_000.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    monkeypatch.setattr(rate_limit, "time", types.SimpleNamespace(time=lambda: now[0], monotonic=lambda: now[0],
+                                                                  sleep=sleep))
+    return now
+
+
+def make_limiter(tmp_path, **limits):
+    settings = dict(session_limit="", ip_limit="", tenant_limit="", rpm=0, tpm=0, max_wait=30)
+    settings.update(limits)
+    return RateLimiter(path=str(tmp_path / "rate_limits.sqlite3"), **settings)
+
+
+@pytest.mark.parametrize("spec, capacity, per_second", [
+    ("5/min", 5, 5 / 60), ("10/s", 10, 10), ("100/h", 100, 100 / 3600), ("1000/day", 1000, 1000 / 86400),
+    ("30", 30, 0.5),
+])
+def test_parse_limits(spec, capacity, per_second):
+    limit = Limit.parse(spec)
+    assert (limit.capacity, limit.rate) == (capacity, pytest.approx(per_second))
+
+
+@pytest.mark.parametrize("spec", ["", "  ", "0/min", None])
+def test_empty_or_zero_limit_is_off(spec):
+    assert Limit.parse(spec) is None
+
+
+def test_invalid_period_is_rejected():
+    with pytest.raises(ValueError):
+        Limit.parse("5/week")
+
+
+def test_bucket_refills_at_its_rate(tmp_path, clock):
+    limiter = make_limiter(tmp_path, session_limit="3/min")
+    for _ in range(3):
+        limiter.check_caller("s1")
+    with pytest.raises(RateLimited) as raised:
+        limiter.check_caller("s1")
+    assert raised.value.scope == "session"
+    assert raised.value.retry_after == pytest.approx(20)
+    # Other sessions have buckets of their own
+    limiter.check_caller("s2")
+    clock[0] += 19
+    with pytest.raises(RateLimited) as raised:
+        limiter.check_caller("s1")
+    assert raised.value.retry_after == pytest.approx(1)
+    clock[0] += 1
+    limiter.check_caller("s1")
+
+
+def test_a_throttled_caller_takes_nothing(tmp_path, clock):
+    limiter = make_limiter(tmp_path, session_limit="10/min", ip_limit="2/min")
+    limiter.check_caller("s1", ip="10.0.0.1")
+    limiter.check_caller("s2", ip="10.0.0.1")
+    with pytest.raises(RateLimited) as raised:
+        limiter.check_caller("s3", ip="10.0.0.1")
+    assert raised.value.scope == "ip"
+    assert limiter.stats()["totals"]["readings"] == 2
+    assert limiter.stats()["totals"]["throttled_ip"] == 1
+
+
+def test_large_charge_waits_for_a_full_bucket_then_leaves_debt(tmp_path, clock):
+    limiter = make_limiter(tmp_path, session_limit="5/min")
+    limiter.check_caller("s1")
+    with pytest.raises(RateLimited) as raised:
+        limiter.check_caller("s1", readings=12)
+    assert raised.value.retry_after == pytest.approx(12)
+    clock[0] += 12
+    limiter.check_caller("s1", readings=12)
+    with pytest.raises(RateLimited) as raised:
+        limiter.check_caller("s1")
+    # 5 - 12 = -7 readings: 8 readings to refill at 5 per minute
+    assert raised.value.retry_after == pytest.approx(96)
+
+
+def test_upstream_budget_waits_for_refill(tmp_path, clock):
+    limiter = make_limiter(tmp_path, rpm=60)
+    for _ in range(60):
+        limiter.acquire(100, "s1")
+    started = clock[0]
+    limiter.acquire(100, "s1")
+    assert clock[0] - started == pytest.approx(1, abs=0.3)
+
+
+def test_upstream_budget_gives_up_after_max_wait(tmp_path, clock):
+    limiter = make_limiter(tmp_path, rpm=60, tpm=1000)
+    limiter.acquire(1000, "s1")
+    with pytest.raises(RateLimited) as raised:
+        limiter.acquire(500, "s1", max_wait=10)
+    assert raised.value.scope == "upstream"
+    assert limiter.stats()["totals"]["throttled_upstream"] == 1
+    assert limiter.stats()["waiting"] == 0
+
+
+def test_settled_usage_is_given_back(tmp_path, clock):
+    limiter = make_limiter(tmp_path, tpm=1000)
+    limiter.acquire(900, "s1")
+    assert limiter.stats()["budget_left"]["tokens"] == pytest.approx(100)
+    limiter.charge(tokens=-600)
+    assert limiter.stats()["budget_left"]["tokens"] == pytest.approx(700)
+    limiter.acquire(700, "s1")
+
+
+def test_client_ip_ignores_forwarded_headers_without_trusted_proxies():
+    headers = {"X-Forwarded-For": "6.6.6.6", "X-Real-IP": "7.7.7.7", "X-Tenant-Id": "acme"}
+    assert caller_from_headers(headers, "10.1.2.3", proxy_hops=0) == ("10.1.2.3", "acme")
+
+
+def test_client_ip_from_the_entry_the_outermost_trusted_proxy_added():
+    headers = {"X-Forwarded-For": "6.6.6.6, 203.0.113.5, 10.0.0.2"}
+    assert caller_from_headers(headers, "10.0.0.1", proxy_hops=2)[0] == "203.0.113.5"
+    assert caller_from_headers(headers, "10.0.0.1", proxy_hops=1)[0] == "10.0.0.2"
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from recommendation_stream import RecommendationStreamParser, iter_recommendations
+
+CARDS = [
+    {"title": "Data Analyst", "description": "Turns {data} into \"insight\" [fast]", "score": 8.5,
+     "tags": ["sql", {"nested": "}"}]},
+    {"title": "UX Designer", "description": "Back\\slash and unicode é", "score": 7},
+]
+DOCUMENT = json.dumps({"intro": "recommendations", "recommendations": CARDS, "note": {"recommendations": [{"x": 1}]}})
+
+
+def chunked(text, size):
+    return [text[start:start + size] for start in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16, len(DOCUMENT)])
+def test_cards_survive_any_chunk_boundary(size):
+    assert list(iter_recommendations(chunked(DOCUMENT, size))) == CARDS
+
+
+def test_cards_are_returned_as_soon_as_they_close():
+    parser = RecommendationStreamParser()
+    first_end = DOCUMENT.index("}]}") + 3
+    assert parser.feed(DOCUMENT[:first_end - 1]) == []
+    assert parser.feed(DOCUMENT[first_end - 1:first_end]) == [CARDS[0]]
+    assert parser.feed(DOCUMENT[first_end:]) == [CARDS[1]]
+    assert parser.items == CARDS
+
+
+def test_preamble_and_code_fence_are_ignored():
+    text = "Here you go:\n```json\n" + DOCUMENT + "\n```"
+    assert list(iter_recommendations(chunked(text, 5))) == CARDS
+
+
+def test_invalid_card_is_skipped():
+    text = '{"recommendations": [{"title": "A", "score": 01}, {"title": "B"}]}'
+    assert list(iter_recommendations(chunked(text, 4))) == [{"title": "B"}]
+
+
+def test_other_array_key():
+    text = json.dumps({"recommendations": [{"title": "A"}], "scores": [{"title": "B", "score": 5}]})
+    assert list(iter_recommendations(chunked(text, 3), array_key="scores")) == [{"title": "B", "score": 5}]
+
+
+def test_unfinished_stream_keeps_completed_cards_only():
+    cut = DOCUMENT[:DOCUMENT.index('"UX Designer"')]
+    assert list(iter_recommendations(chunked(cut, 6))) == [CARDS[0]]
@@ -0,0 +1,157 @@
+"""Warm-up for new worker processes
+
+A fresh process pays for the recommendation path's imports (the OpenAI
+SDK, NumPy), the tokenizer, the role index, the SQLite stores and the
+first TLS handshakes with the LLM provider on the first requests it
+serves. warm_up() does that work up front, one timed step at a time. A
+step that fails is logged and skipped; the app still works without it,
+only slower on first use. The trial pages and the Google Cloud SDKs stay
+lazy (they load when a user opens those pages) unless
+ORACLE_WARMUP_MODULES lists them.
+
+Until warm-up has finished, /readyz on the probe server (see metrics.py)
+answers 503, so a load balancer only sends users to warm workers. Start
+the app through this module to warm up while Streamlit starts:
+
+    python warmup.py run [streamlit options]   # streamlit run app.py, warmed up
+    python warmup.py                           # warm up once and print the step timings
+"""
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from dotenv import load_dotenv
+
+import metrics
+from lazy import singleton
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Warm-up configuration: modules of the recommendation path. Missing modules
+# are skipped; PyPDF2 only matters with PDF_ISOLATED=0.
+WARMUP_MODULES = [name.strip() for name in os.getenv(
+    "ORACLE_WARMUP_MODULES", "openai,httpx,numpy,PyPDF2"
+).split(",") if name.strip()]
+WARMUP_CONNECTIONS = int(os.getenv("ORACLE_WARMUP_CONNECTIONS", "2"))
+WARMUP_CONNECT_TIMEOUT = float(os.getenv("ORACLE_WARMUP_CONNECT_TIMEOUT", "10"))
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+_start_lock = threading.Lock()
+_started = []
+
+
+def _import_modules():
+    imported = []
+    for name in WARMUP_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logger.info("Warm-up skipped module %s: %s", name, e)
+            continue
+        imported.append(name)
+    return imported
+
+
+def _load_tokenizer():
+    import recommender
+
+    # Loads the tiktoken encoding and renders the static prompt prefix once
+    return recommender.render_recommendation_prompt("warm-up", "INTJ - The Architect").tokens
+
+
+def _load_role_index():
+    from role_index import get_index
+
+    return len(get_index()["vectors"])
+
+
+def _open_stores():
+    import recommender
+    from rate_limit import get_limiter
+    from session_store import load_session
+
+    # Creates the SQLite tables (and the cache files in the page cache) before the first session
+    recommender.recommendation_cache.get("warm-up")
+    load_session("warm-up")
+    get_limiter().stats(minutes=1)
+    return True
+
+
+def _open_llm_connections():
+    from llm_pool import get_pool
+
+    if not os.getenv("OPENAI_API_KEY"):
+        return "skipped: no OPENAI_API_KEY"
+    return get_pool().connect(WARMUP_CONNECTIONS, WARMUP_CONNECT_TIMEOUT)
+
+
+# (name, step) in run order; each step returns a short summary for the report
+STEPS = [
+    ("imports", _import_modules),
+    ("tokenizer", _load_tokenizer),
+    ("role_index", _load_role_index),
+    ("stores", _open_stores),
+    ("llm_connections", _open_llm_connections),
+]
+
+
+@singleton
+def warm_up():
+    """Run the warm-up steps once per process; returns {step: {"seconds", "result" or "error"}}"""
+    report = {}
+    started = time.perf_counter()
+    for name, step in STEPS:
+        step_started = time.perf_counter()
+        try:
+            with metrics.timer("warmup", step=name):
+                outcome = {"result": step()}
+        except Exception as e:
+            logger.warning("Warm-up step %s failed: %s", name, e)
+            outcome = {"error": str(e)}
+        report[name] = dict(outcome, seconds=round(time.perf_counter() - step_started, 4))
+    report["total_seconds"] = round(time.perf_counter() - started, 4)
+    logger.info("Warm-up finished in %.2fs", report["total_seconds"])
+    return report
+
+
+def is_ready():
+    """True once warm-up has finished"""
+    return warm_up.is_initialized()
+
+
+def start():
+    """Start warm-up on a background thread (once per process); /readyz waits for it"""
+    with _start_lock:
+        if _started:
+            return
+        _started.append(True)
+    metrics.register_readiness_check(is_ready)
+    metrics.register_collector(lambda: [("ready", "gauge", {}, int(is_ready()))])
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+
+def run_streamlit(args):
+    """streamlit run app.py [args] in this process, warming up while the server starts"""
+    metrics.start_metrics_server()
+    start()
+    from streamlit.web import cli
+
+    sys.argv = ["streamlit", "run", APP_PATH] + list(args)
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    # app.py's "import warmup" must find this module, not run a second copy of it
+    sys.modules.setdefault("warmup", sys.modules[__name__])
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:2] == ["run"]:
+        run_streamlit(sys.argv[2:])
+    print(json.dumps(warm_up(), indent=2))